@@ -1,26 +1,42 @@
 """obscraper: scrape posts from the overcomingbias blog."""
 import logging
 
+from obscraper._archive import Archive, ArchiveWriter
+from obscraper._assemble import PostFailure
 from obscraper._exceptions import AttributeNotFoundError, InvalidResponseError
 from obscraper._extract_post import POST_LONG_URL_PATTERN, name_to_url, url_to_name
+from obscraper._graph import LinkGraph
+from obscraper._index import SearchIndex
 from obscraper._post import Post
 from obscraper._scrape import (
     clear_cache,
+    crawl_posts,
     get_all_posts,
     get_comment_counts,
     get_edit_dates,
+    get_failed_posts,
     get_post_by_name,
     get_post_by_url,
     get_posts_by_edit_date,
     get_posts_by_names,
+    get_posts_by_numbers,
     get_posts_by_urls,
     get_vote_counts,
+    iter_posts_by_names,
+    open_post_stream,
 )
-from obscraper._serialize import PostDecoder, PostEncoder
+from obscraper._serialize import PostDecoder, PostEncoder, dumps_posts, iter_posts
+from obscraper._session import Session
+from obscraper._store import SQLiteStore
+from obscraper._sync import SyncReport, sync
+from obscraper._table import PostTable
 
 __all__ = [
     "Post",
+    "Session",
     "get_posts_by_names",
+    "iter_posts_by_names",
+    "open_post_stream",
     "get_vote_counts",
     "get_comment_counts",
     "get_edit_dates",
@@ -28,12 +44,26 @@ __all__ = [
     "get_post_by_name",
     "get_post_by_url",
     "get_posts_by_urls",
+    "get_posts_by_numbers",
     "get_posts_by_edit_date",
+    "crawl_posts",
+    "sync",
+    "SyncReport",
+    "Archive",
+    "ArchiveWriter",
+    "PostTable",
+    "SQLiteStore",
+    "SearchIndex",
+    "LinkGraph",
+    "get_failed_posts",
+    "PostFailure",
     "clear_cache",
     "url_to_name",
     "name_to_url",
     "PostEncoder",
     "PostDecoder",
+    "dumps_posts",
+    "iter_posts",
     "InvalidResponseError",
     "AttributeNotFoundError",
     "OB_POST_URL_PATTERN",
@@ -1,12 +1,29 @@
 """Entry-point for the obscraper command line interface."""
 import argparse
 import datetime
+import gzip
+import itertools
 import json
+import os
 import sys
+import zlib
 
 import dateutil.parser
 
-from obscraper import _scrape, _serialize
+from obscraper import (
+    _archive,
+    _download,
+    _extract_post,
+    _post,
+    _ratelimit,
+    _scrape,
+    _serialize,
+    _session,
+    _store,
+)
+
+# Number of posts written to an SQLite store in each transaction
+STORE_BATCH_SIZE = 100
 
 
 class _CustomHelpFormatter(argparse.HelpFormatter):
@@ -42,12 +59,25 @@ def _main_parser():
     def parse_date_with_utc_as_default(date):
         return dateutil.parser.parse(date).astimezone(datetime.timezone.utc)
 
+    def positive_int(value):
+        number = int(value)
+        if number < 1:
+            raise argparse.ArgumentTypeError(f"expected positive integer, got {value}")
+        return number
+
+    def rate_or_none(value):
+        rate = float(value)
+        if rate < 0:
+            raise argparse.ArgumentTypeError(f"expected non-negative rate, got {value}")
+        return rate if rate > 0 else None
+
     parser = argparse.ArgumentParser(
         prog="python -m obscraper",
         description=description,
         formatter_class=_CustomHelpFormatter,
     )
-    group = parser.add_mutually_exclusive_group(required=True)
+    # Required unless --retry-failed is given (checked in `main`)
+    group = parser.add_mutually_exclusive_group()
     group.add_argument(
         "-u", "--urls", nargs="+", help="get posts by URLs", metavar="url"
     )
@@ -60,8 +90,93 @@ def _main_parser():
         type=parse_date_with_utc_as_default,
     )
     group.add_argument("-a", "--all", action="store_true", help="get all posts")
+    group.add_argument(
+        "-c",
+        "--crawl",
+        action="store_true",
+        help=(
+            "get all posts, following links between posts to find posts which"
+            " are not listed in the sitemap"
+        ),
+    )
+    parser.add_argument(
+        "-o",
+        "--outfile",
+        default="posts.json",
+        help=(
+            "output file path (JSON is compressed with gzip if it ends in .gz, and"
+            " paths ending in .sqlite or .db are SQLite databases)"
+        ),
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "jsonl", "archive", "sqlite"],
+        help=(
+            "output file format: a JSON list written at the end, JSON Lines"
+            " written as posts are downloaded, an archive (see obscraper.Archive)"
+            " written as posts are downloaded, or an SQLite database (see"
+            " obscraper.SQLiteStore) updated as posts are downloaded"
+            " (default: sqlite if the output file is a database, otherwise json)"
+        ),
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "continue an interrupted run, skipping posts already written to the"
+            " output file (requires --format jsonl)"
+        ),
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help=(
+            "only get posts which could not be retrieved by a previous run, as"
+            " recorded in the output file (requires --format jsonl)"
+        ),
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        default=_download.DEFAULT_MAX_CONCURRENCY,
+        type=positive_int,
+        help="maximum number of requests in flight at once",
+        metavar="n",
+    )
+    for endpoint, description in [
+        ("post", "post pages"),
+        ("vote", "the vote count API"),
+        ("comment", "the comment count API"),
+    ]:
+        parser.add_argument(
+            f"--{endpoint}-concurrency",
+            default=_download.DEFAULT_ENDPOINT_CONCURRENCY[endpoint],
+            type=positive_int,
+            help=f"maximum number of requests in flight at once to {description}",
+            metavar="n",
+        )
+    parser.add_argument(
+        "--rate-limit",
+        default=_ratelimit.DEFAULT_RATE_LIMIT,
+        type=rate_or_none,
+        help="maximum requests per second to each host (0 for no limit)",
+        metavar="r",
+    )
     parser.add_argument(
-        "-o", "--outfile", default="posts.json", help="output file path"
+        "--cache-dir",
+        help="directory in which to cache downloaded pages between runs",
+        metavar="dir",
+    )
+    parser.add_argument(
+        "--fields",
+        nargs="+",
+        choices=_post.FIELDS,
+        help="only get these post attributes (the name is always included)",
+        metavar="field",
+    )
+    parser.add_argument(
+        "--parallel-parse",
+        action="store_true",
+        help="parse pages in a pool of processes, one per core",
     )
     return parser
 
@@ -81,38 +196,286 @@ def main(cli_args, prog=None):
     if prog is not None:
         parser.prog = prog
     args = parser.parse_args(cli_args)
+    if not (args.urls or args.dates or args.all or args.crawl or args.retry_failed):
+        parser.error(
+            "one of the arguments -u/--urls -d/--dates -a/--all -c/--crawl is required"
+        )
+    if args.format is None:
+        is_database = args.outfile.endswith(_store.SQLITE_EXTENSIONS)
+        args.format = "sqlite" if is_database else "json"
+    continuing = args.resume or args.retry_failed
+    if continuing and args.format != "jsonl":
+        parser.error("--resume and --retry-failed require --format jsonl")
+    if continuing and args.crawl:
+        parser.error("--resume and --retry-failed can't be used with --crawl")
+    session = _session.Session(
+        max_concurrency=args.max_concurrency,
+        endpoint_concurrency={
+            "post": args.post_concurrency,
+            "vote": args.vote_concurrency,
+            "comment": args.comment_concurrency,
+        },
+        rate_limit=args.rate_limit,
+        cache_dir=args.cache_dir,
+        parse_executor="process" if args.parallel_parse else None,
+    )
+
+    # Check which posts were written by previous runs
+    try:
+        progress = recover_jsonl(args.outfile) if continuing else {}
+    except ValueError as error:
+        parser.error(str(error))
 
     # Keep file open the whole time - avoids write errors after lots of
     # expensive downloads
-    with open(file=args.outfile, mode="w", encoding="utf-8") as outfile_writer:
+    if args.format == "archive":
+        outfile = _archive.ArchiveWriter(args.outfile)
+    elif args.format == "sqlite":
+        outfile = _store.SQLiteStore(args.outfile)
+    else:
+        outfile = open_outfile(args.outfile, append=continuing)
+    with outfile as outfile_writer:
         # Running the main program
-        if isinstance(args.urls, list) and len(args.urls) > 0:
-            print("Getting posts by their URLs...")
-            posts = _scrape.get_posts_by_urls(args.urls)
-        elif args.dates is not None:
-            print(
-                (
-                    "Getting posts edited between"
-                    f" {args.dates[0]} and {args.dates[1]}..."
-                )
-            )
-            posts = _scrape.get_posts_by_edit_date(*args.dates)
-        elif args.all:
-            print("Getting all posts...")
-            posts = _scrape.get_all_posts()
-
-        # Postprocessing
-        output = [{"url": url, "post": p} for url, p in posts.items()]
-
-        # Writing to file
-        print(f"Writing posts to {args.outfile}...")
-        json.dump(output, outfile_writer, cls=_serialize.PostEncoder, indent=4)
+        with session:
+            if args.format in ["jsonl", "archive", "sqlite"]:
+                if args.crawl:
+                    print("Crawling all posts...")
+                    posts = _scrape.crawl_posts(session=session, fields=args.fields)
+                else:
+                    if continuing:
+                        names = get_remaining_names(args, session, progress)
+                    else:
+                        names = get_names(args, session)
+                    posts = _scrape.iter_posts_by_names(
+                        names, session=session, fields=args.fields
+                    )
+                print(f"Writing posts to {args.outfile} as they are downloaded...")
+                if args.format == "jsonl":
+                    write_jsonl(posts, outfile_writer)
+                elif args.format == "sqlite":
+                    write_store(posts, outfile_writer)
+                else:
+                    for name, post in posts:
+                        outfile_writer.add(name, post)
+            else:
+                posts = get_posts(args, session)
+
+        if args.format == "json":
+            # Postprocessing
+            output = [{"url": url, "post": p} for url, p in posts.items()]
+
+            # Writing to file
+            print(f"Writing posts to {args.outfile}...")
+            json.dump(output, outfile_writer, cls=_serialize.PostEncoder, indent=4)
 
     print("Posts successfully written to file.")
 
     parser.exit()
 
 
+def open_outfile(path, append=False):
+    """Open the output file for writing, compressed with gzip if it ends in ".gz"."""
+    mode = "a" if append else "w"
+    if path.endswith(".gz"):
+        return gzip.open(path, mode=mode + "t", encoding="utf-8")
+    return open(file=path, mode=mode, encoding="utf-8")
+
+
+def recover_jsonl(path):
+    """Check which posts have been written to a JSON Lines output file.
+
+    An incomplete last line (or compressed data) left by an interrupted run is
+    removed, so that the file can be appended to. Plain files are truncated in
+    place, and compressed files are only rewritten if their end is corrupt.
+
+    Parameters
+    ----------
+    path : str
+        Path of the output file. If it doesn't exist, nothing is done.
+
+    Returns
+    -------
+    Dict[str, bool]
+        Dictionary whose keys are the URLs of posts in the file, and whose values
+        are whether each post was retrieved (i.e. is not null). If a URL appears
+        more than once, its last line is used.
+
+    Raises
+    ------
+    ValueError
+        If a line before the end of the file is corrupt. The file is left as it is.
+    """
+    if not os.path.exists(path):
+        return {}
+    progress = {}
+    if not path.endswith(".gz"):
+        with open(path, mode="r+b") as file:
+            # Offset of the end of the last complete line
+            end = 0
+            line_count = 0
+            for line in file:
+                if not read_jsonl_record(line, progress):
+                    if file.read(1):
+                        raise_corrupt_line(path, line_count)
+                    file.truncate(end)
+                    break
+                end += len(line)
+                line_count += 1
+        return progress
+
+    line_count = 0
+    with gzip.open(path, mode="rb") as reader:
+        try:
+            for line in reader:
+                if not read_jsonl_record(line, progress):
+                    break
+                line_count += 1
+            else:
+                return progress
+        except (EOFError, OSError, zlib.error):
+            pass  # compressed data was cut off
+        else:
+            # A corrupt line is only dropped if nothing follows it
+            try:
+                mid_file = bool(reader.read(1))
+            except (EOFError, OSError, zlib.error):
+                mid_file = True
+            if mid_file:
+                raise_corrupt_line(path, line_count)
+    # Copy the complete lines to a new file with the same extension, so it's
+    # compressed in the same way
+    directory, file_name = os.path.split(path)
+    temp_path = os.path.join(directory, f".resume-{file_name}")
+    with gzip.open(path, mode="rb") as reader, gzip.open(temp_path, "wb") as writer:
+        writer.writelines(itertools.islice(reader, line_count))
+    os.replace(temp_path, path)
+    return progress
+
+
+def raise_corrupt_line(path, line_count):
+    """Raise an error for a corrupt line in the middle of a JSON Lines file."""
+    raise ValueError(
+        f"line {line_count + 1} of {path} is corrupt, but isn't the last line; "
+        "fix or remove it to resume"
+    )
+
+
+def read_jsonl_record(line, progress):
+    """Add a JSON Lines output record to `progress`, if it is complete.
+
+    Returns False if the line is incomplete, or isn't valid JSON.
+    """
+    if not line.endswith(b"\n"):
+        return False
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return False
+    progress[record["url"]] = record["post"] is not None
+    return True
+
+
+def get_remaining_names(args, session, progress):
+    """Get the names of the posts which a resumed run should get.
+
+    With ``--retry-failed``, these are the posts which could not be retrieved by
+    previous runs (out of those selected by the other arguments, if any).
+    Otherwise they are the selected posts which haven't been retrieved yet.
+    """
+    if args.retry_failed:
+        print(f"Retrying posts which could not be retrieved in {args.outfile}...")
+        names = [
+            _extract_post.url_to_name(url)
+            for url, retrieved in progress.items()
+            if not retrieved
+        ]
+        if args.urls or args.dates or args.all:
+            selected_names = set(get_names(args, session))
+            names = [name for name in names if name in selected_names]
+        return names
+    names = get_names(args, session)
+    remaining_names = [
+        name for name in names if not progress.get(_extract_post.name_to_url(name))
+    ]
+    print(f"Skipping {len(names) - len(remaining_names)} posts already written...")
+    return remaining_names
+
+
+def get_posts(args, session):
+    """Get the posts selected by the command line arguments, keyed by URL."""
+    if isinstance(args.urls, list) and len(args.urls) > 0:
+        print("Getting posts by their URLs...")
+        return _scrape.get_posts_by_urls(args.urls, session=session, fields=args.fields)
+    if args.dates is not None:
+        print(f"Getting posts edited between {args.dates[0]} and {args.dates[1]}...")
+        return _scrape.get_posts_by_edit_date(
+            *args.dates, session=session, fields=args.fields
+        )
+    if args.crawl:
+        print("Crawling all posts...")
+        posts = _scrape.crawl_posts(session=session, fields=args.fields)
+        return {_extract_post.name_to_url(name): post for name, post in posts}
+    print("Getting all posts...")
+    return _scrape.get_all_posts(session=session, fields=args.fields)
+
+
+def get_names(args, session):
+    """Get the names of the posts selected by the command line arguments."""
+    if isinstance(args.urls, list) and len(args.urls) > 0:
+        print("Getting posts by their URLs...")
+        return [_extract_post.url_to_name(url) for url in args.urls]
+    if args.dates is not None:
+        print(f"Getting posts edited between {args.dates[0]} and {args.dates[1]}...")
+        return _scrape.get_names_by_edit_date(*args.dates, session=session)
+    print("Getting all posts...")
+    return list(_scrape.get_edit_dates(session=session))
+
+
+def write_jsonl(posts, outfile_writer):
+    """Write posts to a file as JSON Lines, as they are yielded.
+
+    Each line is a JSON object with the post URL and the post (or null), as in the
+    JSON format. The file is flushed after each line, so posts already written are
+    kept if the program is interrupted.
+
+    Parameters
+    ----------
+    posts : Iterable[Tuple[str, obscraper.Post | None]]
+        Tuples of post names and posts.
+    outfile_writer : TextIO
+        The output file.
+    """
+    for name, post in posts:
+        record = {"url": _extract_post.name_to_url(name), "post": post}
+        outfile_writer.write(_serialize.dumps_posts(record) + "\n")
+        outfile_writer.flush()
+
+
+def write_store(posts, store, batch_size=STORE_BATCH_SIZE):
+    """Write posts to an SQLite store, in batches as they are yielded.
+
+    Each batch is written in a single transaction, so posts already written are
+    kept if the program is interrupted. Posts which are already stored are
+    replaced.
+
+    Parameters
+    ----------
+    posts : Iterable[Tuple[str, obscraper.Post | None]]
+        Tuples of post names and posts.
+    store : obscraper.SQLiteStore
+        The store.
+    batch_size : int, optional
+        Number of posts written in each transaction.
+    """
+    batch = {}
+    for name, post in posts:
+        batch[name] = post
+        if len(batch) >= batch_size:
+            store.update(batch)
+            batch = {}
+    store.update(batch)
+
+
 def entrypoint():
     """Entry point for the obscraper command line interface."""
     main(sys.argv[1:])
@@ -0,0 +1,299 @@
+"""Store posts in a compact binary file, which supports fast random access.
+
+An archive file consists of:
+
+- A header, containing `MAGIC`.
+- One record per post. Each record has a fixed-size header (see `RECORD_HEADER`)
+  giving the length of its data, the post number and the length of the post name,
+  followed by the post name and the post serialized as JSON and compressed with
+  zlib.
+- Two hash tables, which map post names and post numbers to record offsets. Each
+  slot holds a 64-bit key (a hash of the name, or the number) and the offset of
+  the record (or 0 if the slot is empty). Collisions are resolved by linear
+  probing.
+- A trailer (see `TRAILER`), giving the number of posts and the positions and
+  sizes of the hash tables.
+
+Since the tables are read directly from the (memory-mapped) file, opening an
+archive takes constant time, and looking up a post only reads and decodes that
+post's record.
+
+This interface is internal - implementation details may change.
+"""
+
+import collections.abc
+import hashlib
+import json
+import mmap
+import struct
+import zlib
+
+from obscraper import _serialize
+
+MAGIC = b"OBARCHV1"
+
+# Data length, post number, name length
+RECORD_HEADER = struct.Struct("<IIH")
+# Key, record offset
+SLOT = struct.Struct("<QQ")
+# Magic, number of posts, name table offset, name table size, number table offset,
+# number table size
+TRAILER = struct.Struct("<8sQQQQQ")
+
+# Maximum fraction of hash table slots which are used
+MAX_LOAD_FACTOR = 0.5
+
+
+class Archive(collections.abc.Mapping):
+    """A read-only archive of posts, which maps post names to posts.
+
+    Posts are decoded when they are accessed, so opening an archive is fast
+    however many posts it contains. Archives are written by
+    :class:`obscraper.ArchiveWriter` (or the command line interface with
+    ``--format archive``).
+
+    Archives are best used as context managers::
+
+        with obscraper.Archive("posts.obarchive") as archive:
+            post = archive["2010/09/jobs-explain-lots"]
+
+    Parameters
+    ----------
+    path : str | os.PathLike
+        Path of the archive file.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a (complete) archive.
+
+    Notes
+    -----
+    Posts which could not be retrieved are stored as None.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            try:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                raise ValueError(f"{path} is not an obscraper archive") from None
+        try:
+            if len(self._map) < len(MAGIC) + TRAILER.size:
+                raise ValueError(f"{path} is not an obscraper archive")
+            trailer = TRAILER.unpack_from(self._map, len(self._map) - TRAILER.size)
+            if self._map[: len(MAGIC)] != MAGIC or trailer[0] != MAGIC:
+                raise ValueError(
+                    f"{path} is not an obscraper archive, or was not closed properly"
+                )
+        except ValueError:
+            self._map.close()
+            raise
+        (
+            _,
+            self._count,
+            self._name_table,
+            self._name_slots,
+            self._number_table,
+            self._number_slots,
+        ) = trailer
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the archive file."""
+        self._map.close()
+
+    def __getitem__(self, name):
+        offset = self._find_name(name)
+        if offset is None:
+            raise KeyError(name)
+        return self._read_post(offset)
+
+    def __contains__(self, name):
+        return isinstance(name, str) and self._find_name(name) is not None
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """Iterate over post names, in the order they were added."""
+        offset = len(MAGIC)
+        while offset < self._name_table:
+            length, _, name_length = RECORD_HEADER.unpack_from(self._map, offset)
+            name_start = offset + RECORD_HEADER.size
+            name = self._map[name_start : name_start + name_length].decode("utf-8")
+            # Skip posts which were replaced by a later record
+            if self._find_name(name) == offset:
+                yield name
+            offset = name_start + name_length + length
+
+    def get_by_number(self, number):
+        """Get a post by its number.
+
+        Parameters
+        ----------
+        number : int
+            A post number, e.g. 18402.
+
+        Returns
+        -------
+        obscraper.Post
+            The post with the given number.
+
+        Raises
+        ------
+        KeyError
+            If there is no post with the given number in the archive.
+        """
+        for offset in self._probe(
+            self._number_table, self._number_slots, number_key(number)
+        ):
+            if RECORD_HEADER.unpack_from(self._map, offset)[1] == number:
+                return self._read_post(offset)
+        raise KeyError(number)
+
+    def _find_name(self, name):
+        """Get the offset of the record for a post name, or None."""
+        encoded_name = name.encode("utf-8")
+        for offset in self._probe(
+            self._name_table, self._name_slots, name_key(encoded_name)
+        ):
+            _, _, name_length = RECORD_HEADER.unpack_from(self._map, offset)
+            name_start = offset + RECORD_HEADER.size
+            if self._map[name_start : name_start + name_length] == encoded_name:
+                return offset
+        return None
+
+    def _probe(self, table, slots, key):
+        """Yield offsets of records whose keys match `key` in a hash table."""
+        if slots == 0:
+            return
+        index = key & (slots - 1)
+        while True:
+            slot_key, offset = SLOT.unpack_from(self._map, table + index * SLOT.size)
+            if offset == 0:
+                return
+            if slot_key == key:
+                yield offset
+            index = (index + 1) & (slots - 1)
+
+    def _read_post(self, offset):
+        length, _, name_length = RECORD_HEADER.unpack_from(self._map, offset)
+        data_start = offset + RECORD_HEADER.size + name_length
+        data = zlib.decompress(self._map[data_start : data_start + length])
+        return json.loads(data, cls=_serialize.PostDecoder)
+
+
+class ArchiveWriter:
+    """Write posts to an archive file.
+
+    Posts are written as they are added, and the index is written when the
+    writer is closed. Writers are best used as context managers, so that the
+    archive is complete even if an error occurs::
+
+        with obscraper.ArchiveWriter("posts.obarchive") as writer:
+            for name, post in obscraper.iter_posts_by_names(names):
+                writer.add(name, post)
+
+    Parameters
+    ----------
+    path : str | os.PathLike
+        Path of the archive file. Any existing file is overwritten.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "wb")  # pylint: disable=consider-using-with
+        self._file.write(MAGIC)
+        self._offset = len(MAGIC)
+        # Offset of the latest record for each name, and number of each record
+        self._name_offsets = {}
+        self._numbers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, name, post):
+        """Add a post to the archive.
+
+        Parameters
+        ----------
+        name : str
+            The name of the post.
+        post : obscraper.Post | None
+            The post, or None if it could not be retrieved. If a post with the
+            same name was already added, it is replaced.
+        """
+        encoded_name = name.encode("utf-8")
+        data = zlib.compress(_serialize.dumps_posts(post).encode("utf-8"))
+        number = 0 if post is None or post.number is None else post.number
+        self._file.write(RECORD_HEADER.pack(len(data), number, len(encoded_name)))
+        self._file.write(encoded_name)
+        self._file.write(data)
+        old_offset = self._name_offsets.pop(encoded_name, None)
+        self._numbers.pop(old_offset, None)
+        self._name_offsets[encoded_name] = self._offset
+        if number:
+            self._numbers[self._offset] = number
+        self._offset += RECORD_HEADER.size + len(encoded_name) + len(data)
+
+    def close(self):
+        """Write the index, and close the archive file.
+
+        Does nothing if the writer is already closed.
+        """
+        if self._file.closed:
+            return
+        name_table = self._offset
+        name_slots = self._write_table(
+            (name_key(name), offset) for name, offset in self._name_offsets.items()
+        )
+        number_table = self._offset
+        number_slots = self._write_table(
+            (number_key(number), offset) for offset, number in self._numbers.items()
+        )
+        self._file.write(
+            TRAILER.pack(
+                MAGIC,
+                len(self._name_offsets),
+                name_table,
+                name_slots,
+                number_table,
+                number_slots,
+            )
+        )
+        self._file.close()
+
+    def _write_table(self, items):
+        """Write a hash table of (key, offset) pairs, returning its size."""
+        items = list(items)
+        slots = 1
+        while slots * MAX_LOAD_FACTOR < len(items):
+            slots *= 2
+        table = [(0, 0)] * slots
+        for key, offset in items:
+            index = key & (slots - 1)
+            while table[index][1] != 0:
+                index = (index + 1) & (slots - 1)
+            table[index] = (key, offset)
+        self._file.write(b"".join(SLOT.pack(*slot) for slot in table))
+        self._offset += slots * SLOT.size
+        return slots
+
+
+def name_key(encoded_name):
+    """Hash a (UTF-8 encoded) post name to a 64-bit key."""
+    digest = hashlib.blake2b(encoded_name, digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def number_key(number):
+    """Hash a post number to a 64-bit key."""
+    return name_key(number.to_bytes(8, "little"))
@@ -5,6 +5,8 @@ This module exists mainly to cache results of responses.
 This interface is internal - implementation details may change.
 """
 
+import dataclasses
+import datetime
 import functools
 import threading
 import time
@@ -12,12 +14,44 @@ import time
 import cachetools
 import cachetools.func
 import cachetools.keys
+import httpx
+import trio
 
-from obscraper import _download, _tidy
+from obscraper import _download, _exceptions, _numbers, _post, _tidy
 
 # Name used to update the vote auth code
 VOTE_AUTH_UPDATE_NAME = "2011/12/life-is-good"
 
+# Time (in seconds) to wait for concurrent requests to join a batch
+BATCH_WINDOW = 0.05
+
+# Time (in seconds) for which failed post pages are not requested again
+FAILURE_TTL = 600
+
+# Kinds of failure, and the exceptions raised again for them
+FAILURE_EXCEPTIONS = {
+    "not_found": _exceptions.InvalidResponseError,
+    "invalid_response": _exceptions.InvalidResponseError,
+    "attribute_not_found": _exceptions.AttributeNotFoundError,
+}
+
+
+class _Flight:
+    """A call which is in progress, whose result is shared by concurrent callers."""
+
+    def __init__(self):
+        self.done = trio.Event()
+        self.value = None
+        self.error = None
+        self.abandoned = False
+
+    async def wait(self):
+        """Wait for the result of the call, re-raising any exception."""
+        await self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
 
 def async_assembly_cache(maxsize, ttl, timer=time.monotonic, getsizeof=None):
     """Custom TTL cache for the `assemble` functions.
@@ -26,6 +60,11 @@ def async_assembly_cache(maxsize, ttl, timer=time.monotonic, getsizeof=None):
     `cache_clear` method, and ignoring the `async_client` argument. This lets it
     store results across sessions.
 
+    It also de-duplicates concurrent calls: if a call with the same arguments is
+    already in progress (in the same trio run), later callers wait for its result
+    rather than calling the function again. If the call raises an exception, it is
+    raised in every waiting caller.
+
     And it's asynchronous.
     """
 
@@ -35,6 +74,8 @@ def async_assembly_cache(maxsize, ttl, timer=time.monotonic, getsizeof=None):
             maxsize=maxsize, ttl=ttl, timer=timer, getsizeof=getsizeof
         )
         lock = threading.Lock()
+        # Calls in progress, keyed by trio run and cache key
+        flights = {}
 
         # Define wrapper
         # Inpsired by https://github.com/tkem/cachetools/issues/92
@@ -43,16 +84,41 @@ def async_assembly_cache(maxsize, ttl, timer=time.monotonic, getsizeof=None):
             # Hash key ignores `async_client`, so that results are
             # cached across sessions.
             key = cachetools.keys.hashkey(*args, **kwargs)
+            flight_key = (trio.lowlevel.current_trio_token(), key)
+            while True:
+                with lock:
+                    try:
+                        return cache[key]
+                    except KeyError:
+                        pass
+                    flight = flights.get(flight_key)
+                    if flight is None:
+                        flight = flights[flight_key] = _Flight()
+                        break
+                await flight.done.wait()
+                if not flight.abandoned:
+                    return await flight.wait()
+                # The call was cancelled - try again
+
             try:
+                val = await func(async_client, *args, **kwargs)
+            except Exception as error:
+                flight.error = error
+                raise
+            except BaseException:
+                flight.abandoned = True
+                raise
+            else:
+                flight.value = val
+            finally:
                 with lock:
-                    return cache[key]
-            except KeyError:
-                pass
-            val = await func(async_client, *args, **kwargs)
+                    del flights[flight_key]
+                flight.done.set()
+
             # in case of a race, prefer the item already in the cache
             try:
                 with lock:
-                    return cache.setdefault(key, val)
+                    val = cache.setdefault(key, val)
             except ValueError:
                 pass  # value too large
             return val
@@ -62,50 +128,362 @@ def async_assembly_cache(maxsize, ttl, timer=time.monotonic, getsizeof=None):
             with lock:
                 cache.clear()
 
+        # Define methods to access cache entries directly
+        def cache_lookup(*args, **kwargs):
+            with lock:
+                return cache[cachetools.keys.hashkey(*args, **kwargs)]
+
+        def cache_store(value, *args, **kwargs):
+            try:
+                with lock:
+                    cache[cachetools.keys.hashkey(*args, **kwargs)] = value
+            except ValueError:
+                pass  # value too large
+
         wrapper.cache_clear = cache_clear
+        wrapper.cache_lookup = cache_lookup
+        wrapper.cache_store = cache_store
 
         return wrapper
 
     return custom_cache
 
 
+class _Batch:
+    """A batch of items which will be requested together."""
+
+    def __init__(self):
+        self.items = {}  # used as an ordered set
+        self.full = trio.Event()
+        self.done = trio.Event()
+        self.results = None
+        self.error = None
+        self.abandoned = False
+
+
+class _Batcher:
+    """Combine concurrent requests for single items into batched requests.
+
+    The first caller to submit an item starts a new batch, and waits up to
+    `window` seconds (or until the batch is full) for other callers to add items.
+    It then requests the whole batch using `assemble_batch`, and shares the results.
+
+    Parameters
+    ----------
+    assemble_batch : callable
+        Async function which takes an ``httpx.AsyncClient`` and a list of items, and
+        returns a dict mapping each item to its result.
+    max_size : int
+        Maximum number of items in a batch.
+    window : float, optional
+        Maximum time (in seconds) to wait for other items to join a batch.
+    """
+
+    def __init__(self, assemble_batch, max_size, window=BATCH_WINDOW):
+        self.assemble_batch = assemble_batch
+        self.max_size = max_size
+        self.window = window
+        self._lock = threading.Lock()
+        # Batches which are accepting items, keyed by trio run
+        self._open_batches = {}
+
+    async def submit(self, async_client, item):
+        """Get the result for a single item, as part of a batch."""
+        run = trio.lowlevel.current_trio_token()
+        while True:
+            with self._lock:
+                batch = self._open_batches.get(run)
+                is_leader = batch is None
+                if is_leader:
+                    batch = self._open_batches[run] = _Batch()
+                batch.items[item] = None
+                if len(batch.items) >= self.max_size:
+                    del self._open_batches[run]
+                    batch.full.set()
+
+            if is_leader:
+                await self._request_batch(async_client, run, batch)
+            else:
+                await batch.done.wait()
+
+            if not batch.abandoned:
+                break
+            # The batch was cancelled - try again
+
+        if batch.error is not None:
+            raise batch.error
+        try:
+            return batch.results[item]
+        except KeyError:
+            raise _exceptions.InvalidResponseError(f"No result for {item}.") from None
+
+    async def _request_batch(self, async_client, run, batch):
+        try:
+            with trio.move_on_after(self.window):
+                await batch.full.wait()
+            with self._lock:
+                if self._open_batches.get(run) is batch:
+                    del self._open_batches[run]
+            batch.results = await self.assemble_batch(async_client, list(batch.items))
+        except Exception as error:  # pylint: disable=broad-except
+            batch.error = error
+        except BaseException:
+            batch.abandoned = True
+            raise
+        finally:
+            with self._lock:
+                if self._open_batches.get(run) is batch:
+                    del self._open_batches[run]
+            batch.done.set()
+
+
+@dataclasses.dataclass(frozen=True)
+class PostFailure:
+    """A post page which could not be retrieved, and why.
+
+    Attributes
+    ----------
+    kind : str
+        The kind of failure: "not_found" (the page responded with "404 Not Found"
+        or "410 Gone"), "invalid_response" (the page was not a valid post) or
+        "attribute_not_found" (a post attribute could not be extracted from the
+        page).
+    message : str
+        The error message.
+    failed_at : datetime.datetime
+        When the failure happened (timezone aware, in UTC).
+    """
+
+    kind: str
+    message: str
+    failed_at: datetime.datetime
+
+    def exception(self):
+        """Get an exception (of the type originally raised) for the failure."""
+        return FAILURE_EXCEPTIONS[self.kind](self.message)
+
+
+class _FailureCache:
+    """A TTL cache of recent failures, so that failed requests are not repeated.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of failures stored.
+    ttl : float
+        Time (in seconds) for which each failure is stored.
+    """
+
+    def __init__(self, maxsize, ttl, timer=time.monotonic):
+        self._cache = cachetools.TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get the recent failure for a key, or None if there isn't one."""
+        with self._lock:
+            return self._cache.get(key)
+
+    def record(self, key, error):
+        """Store an exception as a failure, unless it is likely to be temporary."""
+        kind = failure_kind(error)
+        if kind is None:
+            return
+        failure = PostFailure(
+            kind, str(error), datetime.datetime.now(datetime.timezone.utc)
+        )
+        with self._lock:
+            self._cache[key] = failure
+
+    def items(self):
+        """Get a dict of the unexpired failures."""
+        with self._lock:
+            self._cache.expire()
+            return dict(self._cache.items())
+
+    def clear(self):
+        """Remove all failures."""
+        with self._lock:
+            self._cache.clear()
+
+
+def failure_kind(error):
+    """Get the kind of failure which an exception represents.
+
+    Only definitive failures are cached: pages which are gone, and pages which
+    can't be parsed as posts. None is returned for any other error status (e.g.
+    "503 Service Unavailable" or being rate limited), which is likely to be
+    temporary, so the page is requested again next time.
+    """
+    if isinstance(error, _exceptions.AttributeNotFoundError):
+        return "attribute_not_found"
+    if isinstance(error.__cause__, httpx.HTTPStatusError):
+        status_code = error.__cause__.response.status_code
+        return "not_found" if status_code in (404, 410) else None
+    return "invalid_response"
+
+
+# Recent failures of `assemble_post`, keyed by post name
+post_failures = _FailureCache(maxsize=5000, ttl=FAILURE_TTL)
+
+
 @async_assembly_cache(maxsize=5000, ttl=3600)
-async def assemble_post(async_client, name, votes=True, comments=True, edit_dates=True):
-    """Download and tidy a post."""
-    raw_response = await _download.download_post(async_client, name)
-    post = _tidy.tidy_post(raw_response)
+async def assemble_post(async_client, name, fields=None):
+    """Download and tidy a post.
+
+    If `fields` (a tuple of post attribute names) is given, other attributes
+    (except the name) are None, and the vote count, comment count, edit dates and
+    post content are only downloaded or extracted if they are needed.
+
+    If the post page failed recently (within `FAILURE_TTL` seconds), it is not
+    requested again - the original error is raised again instead (see
+    `post_failures`).
+    """
+
+    def wanted(*attributes):
+        return fields is None or any(field in fields for field in attributes)
 
-    if votes:
+    failure = post_failures.get(name)
+    if failure is not None:
+        raise failure.exception()
+    try:
+        raw_response = await _download.download_post(async_client, name)
+        post = await _tidy.async_tidy_post(
+            raw_response, skip_content=not wanted(*_post.CONTENT_FIELDS)
+        )
+    except (
+        _exceptions.InvalidResponseError,
+        _exceptions.AttributeNotFoundError,
+    ) as error:
+        post_failures.record(name, error)
+        raise
+
+    if wanted("votes"):
         post.votes = await assemble_vote_count(async_client, post.number)
 
-    if comments:
+    if wanted("comments"):
         post.comments = await assemble_comment_count(async_client, post.disqus_id)
 
-    if edit_dates:
+    if wanted("edit_date"):
         edit_dates = await assemble_edit_dates(async_client)
-        post.edit_date = edit_dates[post.name]
+        # Posts which aren't listed in the sitemap (e.g. found by crawling) have none
+        post.edit_date = edit_dates.get(post.name)
+
+    if fields is not None:
+        for field in _post.FIELDS:
+            if field != "name" and field not in fields:
+                setattr(post, field, None)
 
     return post
 
 
+@async_assembly_cache(maxsize=5000, ttl=3600)
+async def assemble_post_name(async_client, number):
+    """Get the name of a post from its number.
+
+    The number index is checked first, so a request (for the redirect from the
+    post's short URL) is only made if the number is not known.
+    """
+    number_index = _numbers.get_number_index()
+    name = number_index.get_name(number)
+    if name is None:
+        raw_response = await _download.download_post_redirect(async_client, number)
+        name = _tidy.tidy_post_redirect(raw_response)
+        number_index.add(number, name)
+    return name
+
+
 @async_assembly_cache(maxsize=5000, ttl=3600)
 async def assemble_vote_count(async_client, number):
-    """Download and tidy a vote count."""
-    vote_auth = await assemble_vote_auth(async_client)
-    raw_response = await _download.download_vote_count(async_client, number, vote_auth)
-    tidy_item = _tidy.tidy_vote_count(raw_response)
-    return tidy_item
+    """Download and tidy a vote count.
+
+    Concurrent calls are combined into batched requests.
+    """
+    return await _vote_count_batcher.submit(async_client, number)
+
+
+async def assemble_vote_counts(async_client, numbers):
+    """Download and tidy vote counts for many posts, in batches.
+
+    Cached vote counts are reused, and new vote counts are added to the
+    `assemble_vote_count` cache.
+    """
+    vote_auth = None
+
+    async def assemble_batch(batch):
+        nonlocal vote_auth
+        if vote_auth is None:
+            vote_auth = await assemble_vote_auth(async_client)
+        raw_response = await _download.download_vote_counts(
+            async_client, batch, vote_auth
+        )
+        return _tidy.tidy_vote_counts(raw_response, batch)
+
+    return await _assemble_in_batches(
+        assemble_vote_count, numbers, _download.VOTE_BATCH_SIZE, assemble_batch
+    )
 
 
 @async_assembly_cache(maxsize=5000, ttl=3600)
 async def assemble_comment_count(async_client, disqus_id):
-    """Download and tidy a comment count."""
+    """Download and tidy a comment count.
+
+    Concurrent calls are combined into batched requests.
+    """
     if disqus_id is None:
         return None
 
-    raw_response = await _download.download_comment_count(async_client, disqus_id)
-    tidy_item = _tidy.tidy_comment_count(raw_response)
-    return tidy_item
+    return await _comment_count_batcher.submit(async_client, disqus_id)
+
+
+async def assemble_comment_counts(async_client, disqus_ids):
+    """Download and tidy comment counts for many posts, in batches.
+
+    Cached comment counts are reused, and new comment counts are added to the
+    `assemble_comment_count` cache. The comment count is None for posts which are
+    not found.
+    """
+
+    async def assemble_batch(batch):
+        raw_response = await _download.download_comment_counts(async_client, batch)
+        return _tidy.tidy_comment_counts(raw_response, batch)
+
+    return await _assemble_in_batches(
+        assemble_comment_count,
+        [disqus_id for disqus_id in disqus_ids if disqus_id is not None],
+        _download.COMMENT_BATCH_SIZE,
+        assemble_batch,
+    )
+
+
+async def _assemble_in_batches(cached_func, items, batch_size, assemble_batch):
+    """Assemble results for many items, reusing the cache of `cached_func`.
+
+    Items missing from the cache are split into batches of `batch_size`, and
+    `assemble_batch` (an async function which takes a batch and returns a dict of
+    results) is called for each batch concurrently. New results are added to the
+    cache.
+    """
+    results = {}
+    missing = []
+    for item in dict.fromkeys(items):
+        try:
+            results[item] = cached_func.cache_lookup(item)
+        except KeyError:
+            missing.append(item)
+
+    async def assemble_and_store(batch):
+        for item, result in (await assemble_batch(batch)).items():
+            cached_func.cache_store(result, item)
+            results[item] = result
+
+    async with trio.open_nursery() as nursery:
+        for start in range(0, len(missing), batch_size):
+            nursery.start_soon(assemble_and_store, missing[start : start + batch_size])
+    return results
+
+
+_vote_count_batcher = _Batcher(assemble_vote_counts, _download.VOTE_BATCH_SIZE)
+_comment_count_batcher = _Batcher(assemble_comment_counts, _download.COMMENT_BATCH_SIZE)
 
 
 @async_assembly_cache(maxsize=1, ttl=300)
@@ -2,12 +2,13 @@
 
 This interface is internal - implementation details may change.
 """
+import contextlib
 import functools
 
 import httpx
 import trio
 
-from obscraper import _exceptions
+from obscraper import _exceptions, _httpcache, _ratelimit
 from obscraper._extract_post import name_to_url
 
 INCREASE_FACTOR = 2
@@ -19,10 +20,113 @@ VOTE_API_URL = (
 )
 COMMENT_API_URL = "https://overcoming-bias.disqus.com/count-data.js"
 EDIT_DATES_URL = "https://www.overcomingbias.com/post.xml"
+POST_SHORT_URL = "https://www.overcomingbias.com/?p={number}"
+
+# Maximum number of vote counts requested at once, and their separator in the query
+VOTE_BATCH_SIZE = 100
+VOTE_BATCH_SEPARATOR = "|"
+
+# Maximum number of comment counts requested at once
+COMMENT_BATCH_SIZE = 50
+
+# Default limits on the number of concurrent requests, in total and per endpoint
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_ENDPOINT_CONCURRENCY = {"post": 32, "vote": 16, "comment": 16}
+
+_concurrency_limiters = trio.lowlevel.RunVar("concurrency_limiters")
+
+
+def make_concurrency_limits(
+    max_concurrency=DEFAULT_MAX_CONCURRENCY, endpoint_concurrency=None
+):
+    """Validate concurrency limits and fill in defaults.
+
+    Parameters
+    ----------
+    max_concurrency : int, optional
+        Maximum number of concurrent requests across all endpoints.
+    endpoint_concurrency : Dict[str, int], optional
+        Maximum number of concurrent requests to each endpoint. Keys are endpoint
+        names ("post", "vote" or "comment"). Missing endpoints use the defaults.
+
+    Returns
+    -------
+    Dict[str, int]
+        The concurrency limits. The key "total" gives the overall limit, and the other
+        keys give the limit for each endpoint.
+
+    Raises
+    ------
+    ValueError
+        If an endpoint name is not recognised, or a limit is not a positive integer.
+    """
+    if endpoint_concurrency is None:
+        endpoint_concurrency = {}
+    for endpoint in endpoint_concurrency.keys():
+        if endpoint not in DEFAULT_ENDPOINT_CONCURRENCY:
+            raise ValueError(f"unknown endpoint {endpoint}")
+    limits = {
+        "total": max_concurrency,
+        **DEFAULT_ENDPOINT_CONCURRENCY,
+        **endpoint_concurrency,
+    }
+    for endpoint, limit in limits.items():
+        if not isinstance(limit, int) or limit < 1:
+            raise ValueError(
+                f"expected {endpoint} concurrency to be positive int, got {limit}"
+            )
+    return limits
+
+
+def set_concurrency_limits(limits):
+    """Set concurrency limits for requests made in the current trio run.
+
+    Parameters
+    ----------
+    limits : Dict[str, int]
+        Concurrency limits, as returned by `make_concurrency_limits`.
+    """
+    limiters = {key: trio.CapacityLimiter(limit) for key, limit in limits.items()}
+    _concurrency_limiters.set(limiters)
+
+
+@contextlib.asynccontextmanager
+async def concurrency_limit(endpoint=None):
+    """Hold a slot for one request to an endpoint, waiting if none are free.
+
+    If no limits have been set in the current trio run, the defaults are used.
+    """
+    try:
+        limiters = _concurrency_limiters.get()
+    except LookupError:
+        set_concurrency_limits(make_concurrency_limits())
+        limiters = _concurrency_limiters.get()
+
+    async with contextlib.AsyncExitStack() as stack:
+        # Wait on the endpoint first, so congested endpoints don't use up total slots
+        if endpoint is not None:
+            await stack.enter_async_context(limiters[endpoint])
+        await stack.enter_async_context(limiters["total"])
+        yield
+
 
+@contextlib.asynccontextmanager
+async def throttle(endpoint, url):
+    """Wait until a request to `url` can be sent, respecting all limits.
 
-def async_retry(start_delay):
-    """Either return a 2xx response, try again, or raise an error."""
+    The request must be sent inside the context, which holds a concurrency slot for
+    the endpoint (see `concurrency_limit`) and a rate limit token for the host.
+    """
+    async with concurrency_limit(endpoint):
+        await _ratelimit.get_rate_limiter().acquire(httpx.URL(url).host)
+        yield
+
+
+def async_retry(start_delay, redirects=False):
+    """Either return a 2xx response, try again, or raise an error.
+
+    If `redirects` is True, redirect (3xx) responses are also returned.
+    """
 
     def decorator(func):
         @functools.wraps(func)
@@ -37,9 +141,18 @@ def async_retry(start_delay):
                 except (KeyError, TypeError):
                     delay = delay * INCREASE_FACTOR
                 if delay > MAX_DELAY:
-                    raise _exceptions.InvalidResponseError("Exceeded max timeout.")
-                await trio.sleep(delay)
-
+                    try:
+                        response.raise_for_status()
+                    except httpx.HTTPStatusError as err:
+                        raise _exceptions.InvalidResponseError(
+                            "Exceeded max timeout."
+                        ) from err
+                # Pause all requests to the host, not just this one
+                rate_limiter = _ratelimit.get_rate_limiter()
+                await rate_limiter.pause(response.url.host, delay)
+
+            if redirects and response.is_redirect:
+                return response
             try:
                 response.raise_for_status()
             except httpx.HTTPStatusError as err:
@@ -56,31 +169,46 @@ async def download_post(async_client, name):
     """Download a post by its name."""
     headers = get_default_headers()
     url = name_to_url(name)
-    response = await async_client.get(url, headers=headers)
+    async with throttle("post", url):
+        response = await _httpcache.cached_get(async_client, url, headers)
+    return response
+
+
+@async_retry(start_delay=0.04, redirects=True)
+async def download_post_redirect(async_client, number):
+    """Request a post by its number, without following the redirect to its page."""
+    headers = get_default_headers()
+    url = POST_SHORT_URL.format(number=number)
+    async with throttle("post", url):
+        response = await async_client.head(url, headers=headers, follow_redirects=False)
     return response
 
 
 @async_retry(start_delay=0.04)
-async def download_vote_count(async_client, number, vote_auth):
-    """Download vote count for a post."""
+async def download_vote_counts(async_client, numbers, vote_auth):
+    """Download vote counts for several posts in one request."""
     headers = get_default_headers()
     headers.update({"x-requested-with": "XMLHttpRequest"})
     params = {
         "_ajax_nonce": vote_auth,
         "vote_type": "cache",
         "vote_domain": "a",
-        "votes": f"atr.{number}",
+        "votes": VOTE_BATCH_SEPARATOR.join(f"atr.{number}" for number in numbers),
     }
-    response = await async_client.post(VOTE_API_URL, headers=headers, params=params)
+    async with throttle("vote", VOTE_API_URL):
+        response = await async_client.post(VOTE_API_URL, headers=headers, params=params)
     return response
 
 
 @async_retry(start_delay=0.001)
-async def download_comment_count(async_client, disqus_id):
-    """Download comment count for a post."""
+async def download_comment_counts(async_client, disqus_ids):
+    """Download comment counts for several posts in one request."""
     headers = get_default_headers()
-    params = {"1": disqus_id}
-    response = await async_client.post(COMMENT_API_URL, headers=headers, params=params)
+    params = {str(n): disqus_id for n, disqus_id in enumerate(disqus_ids, start=1)}
+    async with throttle("comment", COMMENT_API_URL):
+        response = await async_client.post(
+            COMMENT_API_URL, headers=headers, params=params
+        )
     return response
 
 
@@ -88,7 +216,8 @@ async def download_comment_count(async_client, disqus_id):
 async def download_edit_dates(async_client):
     """Download list of posts and edit dates."""
     headers = get_default_headers()
-    response = await async_client.get(EDIT_DATES_URL, headers=headers)
+    async with throttle(None, EDIT_DATES_URL):
+        response = await _httpcache.cached_get(async_client, EDIT_DATES_URL, headers)
     return response
 
 
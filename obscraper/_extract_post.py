@@ -362,7 +362,11 @@ def extract_meta_header(post_html):
     """Extract metadata header from a post."""
     match = post_html.find(has_post_in_id)
     raise_attribute_not_found_error_if_none(match, "metadata")
-    raw_headers = match["class"]
+    return parse_meta_header(match["class"])
+
+
+def parse_meta_header(raw_headers):
+    """Parse the classes of a post's metadata header into a dict of lists."""
     headers = [header.split(sep="-", maxsplit=1) for header in raw_headers]
     keys = [header[0] for header in headers]
     values = [header[1] if len(header) == 2 else None for header in headers]
@@ -4,18 +4,17 @@ Also perform exception handling and logging.
 """
 
 import logging
+import math
 from functools import partial
 
-import httpx
 import trio
 
-from obscraper import _assemble, _exceptions
+from obscraper import _assemble, _exceptions, _extract_post, _numbers
 
 logger = logging.getLogger(__name__)
 
-# Default timeout for requests (in seconds)
-# See https://www.python-httpx.org/advanced/#timeout-configuration
-DEFAULT_TIMEOUT = 20.0
+# Default maximum number of posts being fetched by `stream_posts` at once
+DEFAULT_MAX_IN_FLIGHT = 64
 
 
 async def fetch(results, label, func, obj_type=None):
@@ -40,6 +39,32 @@ async def fetch(results, label, func, obj_type=None):
         The type of object returned by the function call. Used for
         logging.
     """
+    obj = await fetch_one(label, func, obj_type)
+
+    assert label not in results.keys()
+
+    results[label] = obj
+
+
+async def fetch_one(label, func, obj_type=None):
+    """Fetch a single result, returning None if it could not be retrieved.
+
+    Parameters
+    ----------
+    label : str
+        A label for the result. Used for logging.
+    func : callable
+        An async function whose return value should be returned.
+    obj_type : str, optional
+        The type of object returned by the function call. Used for
+        logging.
+
+    Returns
+    -------
+    Any
+        The return value of `func`, or None if an `InvalidResponseError` or
+        `AttributeNotFoundError` was raised.
+    """
     log_info = {"label": label, "obj": obj_type}
 
     try:
@@ -56,55 +81,190 @@ async def fetch(results, label, func, obj_type=None):
             "AttributeNotFoundError raised when grabbing %(obj)s %(label)s", log_info
         )
 
-    assert label not in results.keys()
+    return obj
 
-    results[label] = obj
 
+async def fetch_posts(async_client, names_dict, fields=None):
+    """Fetch dict of posts, optionally with only some `fields`."""
+    results = {}
+    async with trio.open_nursery() as nursery:
+        for label, name in names_dict.items():
+            assembler = partial(
+                _assemble.assemble_post, async_client, name, fields=fields
+            )
+            fetcher = partial(fetch, results, label, assembler, "post")
+            nursery.start_soon(fetcher)
+    await _numbers.flush_number_index()
+    return results
+
+
+async def fetch_posts_by_numbers(async_client, numbers_dict, fields=None):
+    """Fetch dict of posts by their numbers, optionally with only some `fields`.
+
+    Post names are looked up in the number index, and only numbers which are not
+    in the index are resolved with a request (see `_assemble.assemble_post_name`).
+    """
+
+    async def assemble_post_by_number(number):
+        name = await _assemble.assemble_post_name(async_client, number)
+        return await _assemble.assemble_post(async_client, name, fields=fields)
 
-async def fetch_posts(names_dict):
-    """Fetch dict of posts."""
     results = {}
-    async with httpx.AsyncClient(http2=True, timeout=DEFAULT_TIMEOUT) as async_client:
+    async with trio.open_nursery() as nursery:
+        for label, number in numbers_dict.items():
+            assembler = partial(assemble_post_by_number, number)
+            fetcher = partial(fetch, results, label, assembler, "post")
+            nursery.start_soon(fetcher)
+    await _numbers.flush_number_index()
+    return results
+
+
+async def stream_posts(
+    async_client,
+    names_dict,
+    send_channel,
+    max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+    fields=None,
+):
+    """Fetch posts, sending them to a channel as they complete.
+
+    A ``(label, post)`` tuple is sent to `send_channel` as soon as each post has been
+    fetched, and the channel is closed once all posts have been sent. At most
+    `max_in_flight` posts are fetched (or waiting to be sent) at once, so a slow
+    receiver holds up new requests rather than letting posts pile up in memory.
+    If `fields` is given, other post attributes are left out (see
+    `_assemble.assemble_post`).
+    """
+    limiter = trio.CapacityLimiter(max_in_flight)
+
+    async def fetch_and_send(label, name):
+        try:
+            assembler = partial(
+                _assemble.assemble_post, async_client, name, fields=fields
+            )
+            post = await fetch_one(label, assembler, "post")
+            await _numbers.flush_number_index(_numbers.FLUSH_SIZE)
+            await send_channel.send((label, post))
+        finally:
+            limiter.release_on_behalf_of(label)
+
+    async with send_channel:
         async with trio.open_nursery() as nursery:
             for label, name in names_dict.items():
-                assembler = partial(_assemble.assemble_post, async_client, name)
-                fetcher = partial(fetch, results, label, assembler, "post")
-                nursery.start_soon(fetcher)
-    return results
+                await limiter.acquire_on_behalf_of(label)
+                nursery.start_soon(fetch_and_send, label, name)
+        await _numbers.flush_number_index()
+
+
+async def crawl_posts(
+    async_client,
+    names,
+    send_channel,
+    max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+    fields=None,
+):
+    """Fetch posts and the posts they link to, sending them to a channel.
+
+    Posts are fetched breadth-first: first the posts in `names`, then the posts
+    they link to (see `linked_names`), and so on, in the order they were found.
+    Each name is fetched only once. As in `stream_posts`, a ``(name, post)`` tuple
+    is sent to `send_channel` as soon as each post has been fetched, at most
+    `max_in_flight` posts are fetched at once, and the channel is closed once all
+    posts have been sent. If `fields` is given, it must include "internal_links".
+    """
+    seen = set()
+    frontier_send, frontier_receive = trio.open_memory_channel(math.inf)
+    for name in dict.fromkeys(names):
+        seen.add(name)
+        frontier_send.send_nowait(name)
+    # Number of names queued or being fetched
+    pending = len(seen)
+    if pending == 0:
+        frontier_send.close()
+    limiter = trio.CapacityLimiter(max_in_flight)
 
+    async def fetch_and_send(name):
+        nonlocal pending
+        try:
+            assembler = partial(
+                _assemble.assemble_post, async_client, name, fields=fields
+            )
+            post = await fetch_one(name, assembler, "post")
+            # Queue new names before this one is done, so the frontier stays open
+            for linked_name in linked_names(post):
+                if linked_name not in seen:
+                    seen.add(linked_name)
+                    pending += 1
+                    frontier_send.send_nowait(linked_name)
+            await _numbers.flush_number_index(_numbers.FLUSH_SIZE)
+            await send_channel.send((name, post))
+        finally:
+            limiter.release_on_behalf_of(name)
+            pending -= 1
+            if pending == 0:
+                frontier_send.close()
 
-async def fetch_vote_counts(numbers_dict):
+    async with send_channel, frontier_receive:
+        async with trio.open_nursery() as nursery:
+            async for name in frontier_receive:
+                await limiter.acquire_on_behalf_of(name)
+                nursery.start_soon(fetch_and_send, name)
+        await _numbers.flush_number_index()
+
+
+def linked_names(post):
+    """Get the names of the posts linked to by a post, in order, without repeats.
+
+    "Short" URLs (e.g. https://www.overcomingbias.com/?p=18402) are resolved
+    through the number index, without making requests, and are skipped if their
+    numbers are not in the index.
+    """
+    if post is None or post.internal_links is None:
+        return []
+    number_index = _numbers.get_number_index()
+    names = {}
+    for link in post.internal_links:
+        if _extract_post.is_valid_post_short_url(link):
+            name = number_index.get_name(int(link.rsplit("=", 1)[1]))
+            if name is not None:
+                names[name] = None
+            continue
+        try:
+            names[_extract_post.url_to_name(link)] = None
+        except ValueError:
+            pass
+    return list(names)
+
+
+async def fetch_vote_counts(async_client, numbers_dict):
     """Fetch dict of vote counts."""
     results = {}
-    async with httpx.AsyncClient(http2=True, timeout=DEFAULT_TIMEOUT) as async_client:
-        async with trio.open_nursery() as nursery:
-            for label, number in numbers_dict.items():
-                assembler = partial(_assemble.assemble_vote_count, async_client, number)
-                fetcher = partial(fetch, results, label, assembler, "vote count")
-                nursery.start_soon(fetcher)
+    async with trio.open_nursery() as nursery:
+        for label, number in numbers_dict.items():
+            assembler = partial(_assemble.assemble_vote_count, async_client, number)
+            fetcher = partial(fetch, results, label, assembler, "vote count")
+            nursery.start_soon(fetcher)
     return results
 
 
-async def fetch_comment_counts(disqus_ids_dict):
+async def fetch_comment_counts(async_client, disqus_ids_dict):
     """Fetch dict of comment counts."""
     results = {}
-    async with httpx.AsyncClient(http2=True, timeout=DEFAULT_TIMEOUT) as async_client:
-        async with trio.open_nursery() as nursery:
-            for label, disqus_id in disqus_ids_dict.items():
-                assembler = partial(
-                    _assemble.assemble_comment_count, async_client, disqus_id
-                )
-                fetcher = partial(fetch, results, label, assembler, "comment count")
-                nursery.start_soon(fetcher)
+    async with trio.open_nursery() as nursery:
+        for label, disqus_id in disqus_ids_dict.items():
+            assembler = partial(
+                _assemble.assemble_comment_count, async_client, disqus_id
+            )
+            fetcher = partial(fetch, results, label, assembler, "comment count")
+            nursery.start_soon(fetcher)
     return results
 
 
-async def fetch_edit_dates():
+async def fetch_edit_dates(async_client):
     """Fetch dict of edit dates."""
     results = {}
-    async with httpx.AsyncClient(http2=True, timeout=DEFAULT_TIMEOUT) as async_client:
-        async with trio.open_nursery() as nursery:
-            assembler = partial(_assemble.assemble_edit_dates, async_client)
-            fetcher = partial(fetch, results, "edit-dates", assembler, "edit dates")
-            nursery.start_soon(fetcher)
+    async with trio.open_nursery() as nursery:
+        assembler = partial(_assemble.assemble_edit_dates, async_client)
+        fetcher = partial(fetch, results, "edit-dates", assembler, "edit dates")
+        nursery.start_soon(fetcher)
     return results["edit-dates"]
@@ -0,0 +1,294 @@
+"""Store the links between posts as a graph, for fast traversal and ranking.
+
+Requires NumPy (``pip install obscraper[table]``).
+
+This interface is internal - implementation details may change.
+"""
+
+import collections
+import collections.abc
+
+from obscraper import _extract_post
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+DIRECTIONS = ["out", "in", "both"]
+
+
+class LinkGraph:
+    """A graph of the internal links between posts.
+
+    Each post is a node, identified by its number, and each link from one post
+    to another is an edge. Links are read from the posts' `internal_links`, whose
+    long URLs (e.g. https://www.overcomingbias.com/2006/11/introduction.html) and
+    short URLs (e.g. https://www.overcomingbias.com/?p=18402) are both resolved to
+    post numbers. Links to posts which are not in the graph, and links from posts
+    to themselves, are left out.
+
+    Edges are stored in compressed sparse row (CSR) arrays, in both directions, so
+    looking up the links to or from a post takes constant time.
+
+    Requires NumPy (``pip install obscraper[table]``).
+
+    Examples
+    --------
+    Find the posts most linked to by other posts::
+
+        graph = obscraper.LinkGraph.from_posts(posts)
+        ranks = graph.pagerank()
+        top_posts = sorted(ranks, key=ranks.get, reverse=True)[:10]
+    """
+
+    def __init__(self, numbers, out_offsets, out_targets, in_offsets, in_sources):
+        self._numbers = numbers
+        self._number_list = numbers.tolist()
+        self._indices = {number: i for i, number in enumerate(self._number_list)}
+        self._out = (out_offsets, out_targets)
+        self._in = (in_offsets, in_sources)
+        self._pageranks = {}
+
+    @classmethod
+    def from_posts(cls, posts):
+        """Create a graph of the links between some posts.
+
+        Parameters
+        ----------
+        posts : Mapping[str, obscraper.Post | None] | Iterable[obscraper.Post | None]
+            A mapping whose values are posts (e.g. as returned by
+            :func:`obscraper.get_posts_by_names`), or an iterable of posts. Posts
+            which are None, or which have no number, are left out.
+
+        Returns
+        -------
+        obscraper.LinkGraph
+            The graph.
+
+        Raises
+        ------
+        ImportError
+            If NumPy is not installed.
+        """
+        if np is None:
+            raise ImportError("LinkGraph requires NumPy: pip install obscraper[table]")
+        if isinstance(posts, collections.abc.Mapping):
+            posts = posts.values()
+        posts = sorted(
+            (post for post in posts if post is not None and post.number is not None),
+            key=lambda post: post.number,
+        )
+        numbers = np.array([post.number for post in posts], dtype=np.int64)
+        indices = {post.number: i for i, post in enumerate(posts)}
+        indices_by_name = {post.name: i for i, post in enumerate(posts)}
+
+        sources = []
+        targets = []
+        for source, post in enumerate(posts):
+            linked = set()
+            for link in post.internal_links or []:
+                target = _link_index(link, indices, indices_by_name)
+                if target is not None and target != source:
+                    linked.add(target)
+            sources.extend([source] * len(linked))
+            targets.extend(sorted(linked))
+        sources = np.array(sources, dtype=np.int64)
+        targets = np.array(targets, dtype=np.int64)
+
+        out_offsets = _offsets(sources, len(posts))
+        # Sort edges by target (then source) for the reverse direction
+        order = np.lexsort((sources, targets))
+        in_offsets = _offsets(targets[order], len(posts))
+        return cls(numbers, out_offsets, targets, in_offsets, sources[order])
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def __contains__(self, number):
+        return number in self._indices
+
+    @property
+    def numbers(self):
+        """List[int] : The numbers of the posts in the graph, in order."""
+        return list(self._number_list)
+
+    @property
+    def edge_count(self):
+        """int : The number of links between posts in the graph."""
+        return len(self._out[1])
+
+    def out_links(self, number):
+        """Get the posts which a post links to.
+
+        Parameters
+        ----------
+        number : int
+            A post number, e.g. 18402.
+
+        Returns
+        -------
+        List[int]
+            The numbers of the posts linked to, in order.
+
+        Raises
+        ------
+        KeyError
+            If there is no post with the given number in the graph.
+        """
+        return self._numbers[self._neighbors(self._out, self._indices[number])].tolist()
+
+    def in_links(self, number):
+        """Get the posts which link to a post.
+
+        Parameters
+        ----------
+        number : int
+            A post number, e.g. 18402.
+
+        Returns
+        -------
+        List[int]
+            The numbers of the posts which link to the post, in order.
+
+        Raises
+        ------
+        KeyError
+            If there is no post with the given number in the graph.
+        """
+        return self._numbers[self._neighbors(self._in, self._indices[number])].tolist()
+
+    def neighborhood(self, number, depth=1, direction="both"):
+        """Get the posts within some number of links of a post.
+
+        Posts are found by breadth-first search, so each post's distance is the
+        smallest number of links between it and the starting post.
+
+        Parameters
+        ----------
+        number : int
+            A post number, e.g. 18402.
+        depth : int, optional
+            The maximum number of links to follow.
+        direction : str, optional
+            Which links to follow: "out" (links from each post), "in" (links to
+            each post) or "both".
+
+        Returns
+        -------
+        Dict[int, int]
+            Dictionary whose keys are the numbers of the posts found (including
+            the starting post), and whose values are their distances from the
+            starting post, in order of distance.
+
+        Raises
+        ------
+        KeyError
+            If there is no post with the given number in the graph.
+        ValueError
+            If `depth` is negative or `direction` is not valid.
+        """
+        if depth < 0:
+            raise ValueError(f"expected non-negative depth, got {depth}")
+        if direction not in DIRECTIONS:
+            raise ValueError(
+                f"expected direction to be one of {DIRECTIONS}, got {direction}"
+            )
+        csrs = {"out": [self._out], "in": [self._in], "both": [self._out, self._in]}
+        start = self._indices[number]
+        distances = {start: 0}
+        queue = collections.deque([start])
+        while queue:
+            index = queue.popleft()
+            distance = distances[index] + 1
+            if distance > depth:
+                break
+            for csr in csrs[direction]:
+                for neighbor in self._neighbors(csr, index).tolist():
+                    if neighbor not in distances:
+                        distances[neighbor] = distance
+                        queue.append(neighbor)
+        numbers = self._number_list
+        return {numbers[index]: distance for index, distance in distances.items()}
+
+    def pagerank(self, damping=0.85, tolerance=1e-8, max_iterations=100):
+        """Rank the posts by PageRank.
+
+        Posts with no links out are treated as linking to every post. Results are
+        cached, so repeated calls with the same arguments are fast.
+
+        Parameters
+        ----------
+        damping : float, optional
+            The probability of following a link, rather than jumping to a random
+            post.
+        tolerance : float, optional
+            The iteration stops when the total change in the ranks is less than
+            this.
+        max_iterations : int, optional
+            The maximum number of iterations.
+
+        Returns
+        -------
+        Dict[int, float]
+            Dictionary whose keys are post numbers and whose values are their
+            ranks. The ranks sum to 1.
+
+        Raises
+        ------
+        ValueError
+            If `damping` is not between 0 and 1.
+        """
+        if not 0 <= damping <= 1:
+            raise ValueError(f"expected damping between 0 and 1, got {damping}")
+        key = (damping, tolerance, max_iterations)
+        if key not in self._pageranks:
+            ranks = self._compute_pagerank(damping, tolerance, max_iterations)
+            self._pageranks[key] = dict(zip(self._number_list, ranks.tolist()))
+        return dict(self._pageranks[key])
+
+    def _compute_pagerank(self, damping, tolerance, max_iterations):
+        count = len(self)
+        if count == 0:
+            return np.zeros(0)
+        out_offsets, targets = self._out
+        out_degrees = np.diff(out_offsets)
+        sources = np.repeat(np.arange(count), out_degrees)
+        dangling = out_degrees == 0
+        # Share of each source's rank passed along each of its links
+        weights = 1 / np.maximum(out_degrees, 1)
+        ranks = np.full(count, 1 / count)
+        for _ in range(max_iterations):
+            passed = np.bincount(
+                targets, weights=(ranks * weights)[sources], minlength=count
+            )
+            new_ranks = (1 - damping) / count + damping * (
+                passed + ranks[dangling].sum() / count
+            )
+            change = np.abs(new_ranks - ranks).sum()
+            ranks = new_ranks
+            if change < tolerance:
+                break
+        return ranks
+
+    @staticmethod
+    def _neighbors(csr, index):
+        offsets, values = csr
+        return values[offsets[index] : offsets[index + 1]]
+
+
+def _link_index(link, indices, indices_by_name):
+    """Get the index of the post a link points to, or None if it isn't known."""
+    if _extract_post.is_valid_post_short_url(link):
+        return indices.get(int(link.rsplit("=", 1)[1]))
+    try:
+        return indices_by_name.get(_extract_post.url_to_name(link))
+    except ValueError:
+        return None
+
+
+def _offsets(rows, count):
+    """Get CSR offsets from the (sorted) row index of each value."""
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=count), out=offsets[1:])
+    return offsets
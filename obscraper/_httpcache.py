@@ -0,0 +1,146 @@
+"""Cache HTTP responses on disk, and revalidate them with conditional requests.
+
+This interface is internal - implementation details may change.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import zlib
+
+import httpx
+import trio
+
+# Response headers which are kept in the cache
+CACHED_HEADERS = ["content-type", "etag", "last-modified"]
+
+_http_cache = trio.lowlevel.RunVar("http_cache", default=None)
+
+
+class CacheEntry:
+    """A cached response.
+
+    Parameters
+    ----------
+    headers : Dict[str, str]
+        The response headers kept in the cache (see `CACHED_HEADERS`).
+    content : bytes
+        The (decoded) response body.
+    """
+
+    def __init__(self, headers, content):
+        self.headers = headers
+        self.content = content
+
+    def validators(self):
+        """Get the headers which make a request conditional on this entry."""
+        headers = {}
+        if "etag" in self.headers:
+            headers["if-none-match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            headers["if-modified-since"] = self.headers["last-modified"]
+        return headers
+
+    def to_response(self, request):
+        """Make an ``httpx.Response`` for `request` from this entry."""
+        return httpx.Response(
+            200, headers=self.headers, content=self.content, request=request
+        )
+
+
+class HTTPCache:
+    """A cache of HTTP responses, stored on disk.
+
+    Each response body is compressed and stored in its own file, named after a hash
+    of the request URL and parameters. Only responses with an ``ETag`` or
+    ``Last-Modified`` header are stored, since otherwise they cannot be revalidated.
+
+    Parameters
+    ----------
+    directory : str | os.PathLike
+        Directory in which responses are stored. It is created if it does not exist.
+    """
+
+    def __init__(self, directory):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, url, params=None):
+        """Get the path of the file in which a response is stored."""
+        key = json.dumps([str(url), sorted((params or {}).items())])
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.directory / digest[:2] / digest
+
+    def load(self, url, params=None):
+        """Load a cached response, or return None if there is none (or it's invalid)."""
+        try:
+            with open(self.path(url, params), "rb") as file:
+                headers = json.loads(file.readline())
+                content = zlib.decompress(file.read())
+        except (OSError, ValueError, zlib.error):
+            return None
+        return CacheEntry(headers, content)
+
+    def save(self, response, url, params=None):
+        """Store a successful response, if it can be revalidated."""
+        headers = {
+            name: response.headers[name]
+            for name in CACHED_HEADERS
+            if name in response.headers
+        }
+        if "etag" not in headers and "last-modified" not in headers:
+            return
+        path = self.path(url, params)
+        path.parent.mkdir(exist_ok=True)
+        # Write to a temporary file first, so readers never see partial entries
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=path.parent, delete=False
+        ) as temp_file:
+            temp_file.write(json.dumps(headers).encode("utf-8") + b"\n")
+            temp_file.write(zlib.compress(response.content))
+        os.replace(temp_file.name, path)
+
+    def clear(self):
+        """Remove all cached responses."""
+        for path in self.directory.glob("*/*"):
+            path.unlink()
+
+
+def set_http_cache(http_cache):
+    """Set the HTTP cache for requests made in the current trio run.
+
+    Parameters
+    ----------
+    http_cache : HTTPCache | None
+        The cache. If None, responses are not cached.
+    """
+    _http_cache.set(http_cache)
+
+
+def get_http_cache():
+    """Get the HTTP cache for the current trio run, or None if there isn't one."""
+    return _http_cache.get()
+
+
+async def cached_get(async_client, url, headers, params=None):
+    """Send a GET request, revalidating (and updating) any cached response.
+
+    If a response is cached, the request is made conditional on it, and a
+    "304 Not Modified" response is replaced by the cached response. If no cache has
+    been set in the current trio run, this is a plain GET request.
+    """
+    http_cache = get_http_cache()
+    if http_cache is None:
+        return await async_client.get(url, headers=headers, params=params)
+
+    entry = await trio.to_thread.run_sync(http_cache.load, url, params)
+    if entry is not None:
+        headers = {**headers, **entry.validators()}
+    response = await async_client.get(url, headers=headers, params=params)
+    if response.status_code == 304 and entry is not None:
+        return entry.to_response(response.request)
+    if response.status_code == 200:
+        await trio.to_thread.run_sync(http_cache.save, response, url, params)
+    return response
@@ -0,0 +1,566 @@
+"""Search the text of posts with an inverted index.
+
+An index maps each term (a lower-case word, split as in `_utils.count_words`) to
+its postings: the numbers of the posts which contain it, and the positions of the
+term in each post's plaintext. Queries can combine terms and phrases with AND, OR
+and NOT, and matching posts are ranked by BM25.
+
+An index file consists of:
+
+- A header (see `HEADER`), giving the number of posts and terms, the total length
+  of the posts, and the offsets of the other sections.
+- The post table, giving the number and length (in words) of each post.
+- The term table, with one entry (see `TERM_ENTRY`) per term, sorted by term. Each
+  entry gives the position of the term in the term strings, and of its postings.
+- The term strings, encoded as UTF-8.
+- The postings of each term: the numbers of the posts which contain the term (in
+  order), the number of times the term appears in each post, then the positions of
+  the term in each post. Positions are only read for phrase queries.
+
+Integers are unsigned and little-endian. Since the term table is sorted, the
+postings of a term are found by binary search of the (memory-mapped) file, and
+reading them doesn't require reading the rest of the index.
+
+This interface is internal - implementation details may change.
+"""
+
+import array
+import collections.abc
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+
+from obscraper import _utils
+
+MAGIC = b"OBINDEX1"
+
+# Magic, number of posts, number of terms, total length of posts, offsets of the
+# post table, term table, term strings and postings
+HEADER = struct.Struct("<8sIIQQQQQ")
+# Term string offset, term string length, postings offset, postings length (in
+# integers), number of posts containing the term
+TERM_ENTRY = struct.Struct("<QIQII")
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Parentheses, quoted phrases (possibly unterminated) and words
+QUERY_TOKEN_PATTERN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"?|([^\s()"]+))')
+OPERATORS = ["AND", "OR", "NOT"]
+
+
+class SearchIndex:
+    """A full-text search index of post plaintext.
+
+    Indexes are created with :meth:`SearchIndex.from_posts`, or loaded from a file
+    written by :meth:`SearchIndex.save`. Loading an index is fast, since postings
+    are read from the (memory-mapped) file only when a query needs them. Posts can
+    be added, replaced or removed after an index is created or loaded, without
+    rebuilding the index.
+
+    Queries consist of words and quoted phrases, which can be combined with
+    ``AND``, ``OR``, ``NOT`` and parentheses. Words next to each other must all
+    match, as if joined by ``AND``. Words are matched ignoring case and
+    punctuation.
+
+    Examples
+    --------
+    Find posts about prediction markets, but not futarchy::
+
+        index = obscraper.SearchIndex.from_posts(posts)
+        index.save("posts.obindex")
+        with obscraper.SearchIndex.load("posts.obindex") as index:
+            results = index.search('"prediction markets" NOT futarchy', limit=10)
+    """
+
+    def __init__(self):
+        # Postings stored in the index file
+        self._map = None
+        self._header = None
+        self._stored_numbers = set()
+        # Stored posts which have since been replaced or removed
+        self._replaced_numbers = set()
+        # Postings of posts added since the file was written, and terms of each
+        # such post
+        self._added_postings = {}
+        self._added_terms = {}
+        # Length of each post in the index, current or stored
+        self._lengths = {}
+        self._total_length = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the index file, if the index was loaded from a file."""
+        if self._map is not None:
+            self._map.close()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def __contains__(self, number):
+        return number in self._lengths
+
+    @classmethod
+    def from_posts(cls, posts):
+        """Create an index of some posts.
+
+        Parameters
+        ----------
+        posts : Mapping[str, obscraper.Post | None] | Iterable[obscraper.Post | None]
+            A mapping whose values are posts (e.g. as returned by
+            :func:`obscraper.get_posts_by_names`), or an iterable of posts. Posts
+            which are None are left out.
+
+        Returns
+        -------
+        obscraper.SearchIndex
+            An index of the posts.
+
+        Raises
+        ------
+        ValueError
+            If a post has no number.
+        """
+        if isinstance(posts, collections.abc.Mapping):
+            posts = posts.values()
+        index = cls()
+        for post in posts:
+            if post is not None:
+                index.add_post(post)
+        return index
+
+    @classmethod
+    def load(cls, path):
+        """Load an index from a file.
+
+        Parameters
+        ----------
+        path : str | os.PathLike
+            Path of a file written by :meth:`SearchIndex.save`.
+
+        Returns
+        -------
+        obscraper.SearchIndex
+            The index.
+
+        Raises
+        ------
+        ValueError
+            If the file is not an index.
+        """
+        index = cls()
+        with open(path, "rb") as file:
+            try:
+                index._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                raise ValueError(f"{path} is not an obscraper index") from None
+        if (
+            len(index._map) < HEADER.size
+            or index._map[: len(MAGIC)] != MAGIC
+            or HEADER.unpack_from(index._map)[0] != MAGIC
+        ):
+            index._map.close()
+            raise ValueError(f"{path} is not an obscraper index")
+        index._header = HEADER.unpack_from(index._map)
+        _, post_count, _, total_length, post_table, _, _, _ = index._header
+        post_values = _read_integers(index._map, post_table, 2 * post_count)
+        index._lengths = dict(zip(post_values[::2], post_values[1::2]))
+        index._stored_numbers = set(index._lengths)
+        index._total_length = total_length
+        return index
+
+    def save(self, path):
+        """Write the index to a file.
+
+        The file is replaced atomically, so it can be the file the index was
+        loaded from.
+
+        Parameters
+        ----------
+        path : str | os.PathLike
+            Path of the index file.
+        """
+        terms = sorted(
+            {*self._stored_terms(), *self._added_postings}, key=lambda t: t.encode()
+        )
+        post_values = array.array("I")
+        for number in sorted(self._lengths):
+            post_values.extend([number, self._lengths[number]])
+
+        entries = []
+        strings = bytearray()
+        postings_values = array.array("I")
+        for term in terms:
+            postings = self._positions(term, {})
+            if not postings:
+                continue
+            encoded_term = term.encode("utf-8")
+            start = len(postings_values)
+            numbers = sorted(postings)
+            postings_values.extend(numbers)
+            postings_values.extend(len(postings[number]) for number in numbers)
+            for number in numbers:
+                postings_values.extend(postings[number])
+            entries.append(
+                TERM_ENTRY.pack(
+                    len(strings),
+                    len(encoded_term),
+                    start,
+                    len(postings_values) - start,
+                    len(postings),
+                )
+            )
+            strings += encoded_term
+
+        post_table = HEADER.size
+        term_table = post_table + 4 * len(post_values)
+        term_strings = term_table + TERM_ENTRY.size * len(entries)
+        postings_offset = term_strings + len(strings)
+        header = HEADER.pack(
+            MAGIC,
+            len(self._lengths),
+            len(entries),
+            self._total_length,
+            post_table,
+            term_table,
+            term_strings,
+            postings_offset,
+        )
+        temp_path = os.fspath(path) + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(header)
+            file.write(_little_endian(post_values))
+            file.write(b"".join(entries))
+            file.write(strings)
+            file.write(_little_endian(postings_values))
+        os.replace(temp_path, path)
+
+    def add_post(self, post):
+        """Add a post to the index, replacing any post with the same number.
+
+        Parameters
+        ----------
+        post : obscraper.Post
+            The post.
+
+        Raises
+        ------
+        ValueError
+            If the post has no number.
+        """
+        number = post.number
+        if number is None:
+            raise ValueError(f"expected post to have a number, got {post.name}")
+        if number in self._lengths:
+            self.remove_post(number)
+        postings = {}
+        terms = split_terms(post.plaintext or "")
+        for position, term in enumerate(terms):
+            postings.setdefault(term, []).append(position)
+        for term, positions in postings.items():
+            self._added_postings.setdefault(term, {})[number] = positions
+        self._added_terms[number] = list(postings)
+        self._lengths[number] = len(terms)
+        self._total_length += len(terms)
+
+    def remove_post(self, number):
+        """Remove a post from the index.
+
+        Parameters
+        ----------
+        number : int
+            The post number.
+
+        Raises
+        ------
+        KeyError
+            If there is no post with the given number in the index.
+        """
+        self._total_length -= self._lengths.pop(number)
+        if number in self._stored_numbers:
+            self._replaced_numbers.add(number)
+        for term in self._added_terms.pop(number, []):
+            term_postings = self._added_postings[term]
+            del term_postings[number]
+            if not term_postings:
+                del self._added_postings[term]
+
+    def search(self, query, limit=None):
+        """Find the posts which match a query, ranked by BM25.
+
+        Parameters
+        ----------
+        query : str
+            The query, e.g. ``'"prediction markets" AND (law OR policy)'``.
+        limit : int, optional
+            The maximum number of results. If not given, all matching posts are
+            returned.
+
+        Returns
+        -------
+        List[Tuple[int, float]]
+            List of the numbers and scores of the matching posts, from highest to
+            lowest score.
+
+        Raises
+        ------
+        ValueError
+            If the query is not valid.
+        """
+        tree = parse_query(query)
+        cache = {}
+        matches = self._evaluate(tree, cache)
+        scores = dict.fromkeys(matches, 0.0)
+        average_length = self._total_length / len(self._lengths) if self else 0
+        for term in _scored_terms(tree):
+            frequencies = self._frequencies(term, cache)
+            count = len(frequencies)
+            idf = math.log(1 + (len(self._lengths) - count + 0.5) / (count + 0.5))
+            for number in matches.intersection(frequencies):
+                frequency = frequencies[number]
+                norm = 1 - BM25_B + BM25_B * self._lengths[number] / average_length
+                scores[number] += (
+                    idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * norm)
+                )
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked if limit is None else ranked[:limit]
+
+    def _evaluate(self, node, cache):
+        """Get the set of numbers of posts which match a query tree."""
+        kind, value = node
+        if kind == "term":
+            return set(self._frequencies(value, cache))
+        if kind == "phrase":
+            return self._match_phrase(value, cache)
+        if kind == "or":
+            return set().union(*(self._evaluate(child, cache) for child in value))
+        if kind == "not":
+            return set(self._lengths) - self._evaluate(value, cache)
+        # "and": evaluate negated children last, removing their matches
+        included = [self._evaluate(c, cache) for c in value if c[0] != "not"]
+        excluded = [self._evaluate(c[1], cache) for c in value if c[0] == "not"]
+        matches = set.intersection(*included) if included else set(self._lengths)
+        return matches.difference(*excluded)
+
+    def _match_phrase(self, terms, cache):
+        # Check positions only in posts containing every term
+        candidates = set.intersection(
+            *(set(self._frequencies(term, cache)) for term in terms)
+        )
+        if not candidates:
+            return candidates
+        all_positions = [self._positions(term, cache) for term in terms]
+        matches = set()
+        for number in candidates:
+            starts = set(all_positions[0][number])
+            for offset, positions in enumerate(all_positions[1:], 1):
+                starts.intersection_update(
+                    position - offset for position in positions[number]
+                )
+            if starts:
+                matches.add(number)
+        return matches
+
+    def _frequencies(self, term, cache):
+        """Get a dict of the numbers of posts containing a term, and how often."""
+        key = ("frequencies", term)
+        if key not in cache:
+            frequencies = {}
+            entry = self._stored_entry(term)
+            if entry is not None:
+                count = entry[4]
+                values = _read_integers(
+                    self._map, self._postings_start(entry), 2 * count
+                )
+                frequencies = {
+                    number: frequency
+                    for number, frequency in zip(values[:count], values[count:])
+                    if number not in self._replaced_numbers
+                }
+            for number, positions in self._added_postings.get(term, {}).items():
+                frequencies[number] = len(positions)
+            cache[key] = frequencies
+        return cache[key]
+
+    def _positions(self, term, cache):
+        """Get a dict of the numbers of posts containing a term, and its positions."""
+        key = ("positions", term)
+        if key not in cache:
+            positions = {}
+            entry = self._stored_entry(term)
+            if entry is not None:
+                _, _, _, length, count = entry
+                values = _read_integers(self._map, self._postings_start(entry), length)
+                i = 2 * count
+                for number, frequency in zip(values[:count], values[count : 2 * count]):
+                    if number not in self._replaced_numbers:
+                        positions[number] = values[i : i + frequency]
+                    i += frequency
+            positions.update(self._added_postings.get(term, {}))
+            cache[key] = positions
+        return cache[key]
+
+    def _stored_entry(self, term):
+        """Get the term table entry for a term, or None if it isn't stored."""
+        if self._map is None:
+            return None
+        return self._find_term(term.encode("utf-8"))
+
+    def _postings_start(self, entry):
+        return self._header[7] + 4 * entry[2]
+
+    def _find_term(self, encoded_term):
+        """Binary search the term table for a term, returning its entry or None."""
+        low, high = 0, self._header[2]
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._term_entry(middle)
+            middle_term = self._term_string(entry)
+            if middle_term < encoded_term:
+                low = middle + 1
+            elif middle_term > encoded_term:
+                high = middle
+            else:
+                return entry
+        return None
+
+    def _stored_terms(self):
+        if self._map is None:
+            return []
+        return [
+            self._term_string(self._term_entry(i)).decode("utf-8")
+            for i in range(self._header[2])
+        ]
+
+    def _term_entry(self, i):
+        return TERM_ENTRY.unpack_from(self._map, self._header[5] + i * TERM_ENTRY.size)
+
+    def _term_string(self, entry):
+        start = self._header[6] + entry[0]
+        return self._map[start : start + entry[1]]
+
+
+def split_terms(text):
+    """Split text into lower-case terms, removing punctuation."""
+    return [word.lower() for word in _utils.split_words(text)]
+
+
+def parse_query(query):
+    """Parse a search query into a tree.
+
+    Each node of the tree is a tuple of its kind and value: ``("term", term)``,
+    ``("phrase", [term, ...])``, ``("and", [node, ...])``, ``("or", [node, ...])``
+    or ``("not", node)``.
+
+    Raises
+    ------
+    ValueError
+        If the query is not valid.
+    """
+    tokens = []
+    for match in QUERY_TOKEN_PATTERN.finditer(query):
+        open_paren, close_paren, phrase, word = match.groups()
+        if open_paren or close_paren:
+            tokens.append(("(" if open_paren else ")", None))
+        elif word in OPERATORS:
+            tokens.append((word, None))
+        else:
+            terms = split_terms(word if phrase is None else phrase)
+            if len(terms) == 1:
+                tokens.append(("term", terms[0]))
+            elif terms:
+                tokens.append(("phrase", terms))
+    if not tokens:
+        raise ValueError(f"expected query to contain a word, got {query!r}")
+    parser = _QueryParser(tokens)
+    tree = parser.parse_or()
+    if parser.position < len(tokens):
+        raise ValueError(f"unexpected {tokens[parser.position][0]} in query {query!r}")
+    return tree
+
+
+class _QueryParser:
+    """Recursive descent parser for a list of query tokens."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position][0]
+        return None
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == "OR":
+            self.position += 1
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() not in [None, "OR", ")"]:
+            if self.peek() == "AND":
+                self.position += 1
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_not(self):
+        if self.peek() == "NOT":
+            self.position += 1
+            return ("not", self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        kind = self.peek()
+        if kind in ["term", "phrase"]:
+            self.position += 1
+            return self.tokens[self.position - 1]
+        if kind == "(":
+            self.position += 1
+            node = self.parse_or()
+            if self.peek() != ")":
+                raise ValueError("expected ) in query")
+            self.position += 1
+            return node
+        raise ValueError(
+            f"expected word, phrase or ( in query, got {kind or 'end of query'}"
+        )
+
+
+def _scored_terms(node, negated=False):
+    """Get the set of terms in a query tree which are not negated."""
+    kind, value = node
+    if kind == "term":
+        return set() if negated else {value}
+    if kind == "phrase":
+        return set() if negated else set(value)
+    if kind == "not":
+        return _scored_terms(value, negated=True)
+    return set().union(*(_scored_terms(child, negated) for child in value))
+
+
+def _read_integers(buffer, offset, count):
+    """Read little-endian unsigned 32-bit integers from a buffer, as a list."""
+    values = array.array("I")
+    values.frombytes(buffer[offset : offset + 4 * count])
+    if sys.byteorder == "big":  # pragma: no cover
+        values.byteswap()
+    return values.tolist()
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":  # pragma: no cover
+        values = array.array("I", values)
+        values.byteswap()
+    return values.tobytes()
@@ -0,0 +1,143 @@
+"""Map post numbers to post names, and back, without making requests.
+
+The index is filled whenever a post page is tidied. It can be stored in a file, so
+that numbers learnt by one process are known to the next.
+
+This interface is internal - implementation details may change.
+"""
+
+import json
+import os
+import threading
+
+import trio
+
+# Name of the index file in a session's cache directory
+INDEX_FILE_NAME = "post-numbers.jsonl"
+
+# Number of new entries after which a long-running fetch saves the index
+FLUSH_SIZE = 100
+
+_number_index = trio.lowlevel.RunVar("number_index", default=None)
+
+
+class NumberIndex:
+    """A two-way index of post numbers and post names.
+
+    If a path is given, the index is read from that file (if it exists), and new
+    entries are appended to it as JSON Lines records when `flush` is called, so the
+    index persists across processes. Otherwise it is only kept in memory.
+
+    Parameters
+    ----------
+    path : str | os.PathLike, optional
+        Path of the index file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._names = {}
+        self._numbers = {}
+        # Entries which haven't been written to the file yet
+        self._unsaved = []
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        return len(self._names)
+
+    @property
+    def unsaved_count(self):
+        """int : The number of entries which haven't been written to the file."""
+        return len(self._unsaved)
+
+    def add(self, number, name):
+        """Record the name of a post with a given number.
+
+        The entry is available at once, but is only written to the file by
+        `flush`, so that adding entries never blocks on disk access.
+
+        Parameters
+        ----------
+        number : int
+            The post number, e.g. 18402.
+        name : str
+            The post name, e.g. "2006/11/introduction".
+        """
+        with self._lock:
+            if self._names.get(number) == name:
+                return
+            self._set(number, name)
+            if self.path is not None:
+                self._unsaved.append([number, name])
+
+    def flush(self):
+        """Append the unsaved entries to the file, in a single write."""
+        with self._lock:
+            entries, self._unsaved = self._unsaved, []
+            if not entries:
+                return
+            lines = "".join(json.dumps(entry) + "\n" for entry in entries)
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(lines)
+
+    def get_name(self, number):
+        """Get the name of the post with a given number, or None if not known."""
+        return self._names.get(number)
+
+    def get_number(self, name):
+        """Get the number of the post with a given name, or None if not known."""
+        return self._numbers.get(name)
+
+    def _set(self, number, name):
+        # Remove stale entries, so both directions agree
+        self._numbers.pop(self._names.get(number), None)
+        self._names.pop(self._numbers.get(name), None)
+        self._names[number] = name
+        self._numbers[name] = number
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    number, name = json.loads(line)
+                except ValueError:
+                    continue  # line cut off by an interrupted write
+                self._set(number, name)
+
+
+_default_number_index = NumberIndex()
+
+
+def set_number_index(number_index):
+    """Set the number index used in the current trio run.
+
+    Parameters
+    ----------
+    number_index : NumberIndex | None
+        The index. If None, a shared in-memory index is used.
+    """
+    _number_index.set(number_index)
+
+
+def get_number_index():
+    """Get the number index for the current trio run (or the shared index)."""
+    try:
+        number_index = _number_index.get()
+    except RuntimeError:  # not in a trio run
+        number_index = None
+    return _default_number_index if number_index is None else number_index
+
+
+async def flush_number_index(min_count=1):
+    """Save the current number index in a worker thread, if enough entries are new.
+
+    Parameters
+    ----------
+    min_count : int, optional
+        The index is only saved if it has at least this many unsaved entries.
+    """
+    number_index = get_number_index()
+    if number_index.unsaved_count >= max(min_count, 1):
+        await trio.to_thread.run_sync(number_index.flush)
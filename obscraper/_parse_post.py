@@ -0,0 +1,608 @@
+"""Extract all attributes of an overcomingbias post in a single pass.
+
+Produces the same results as the `_extract_post.extract_*` functions, but gathers
+every attribute while the page is being parsed, rather than building a
+BeautifulSoup tree and then searching it once per attribute.
+
+This interface is internal - implementation details may change.
+"""
+
+import re
+
+import lxml.etree
+
+from obscraper import _extract_post, _utils
+
+POST_ID_PATTERN = re.compile(r"^post-\d+$")
+NON_WHITESPACE_PATTERN = re.compile(r"\S+")
+
+# Classes of the elements containing each attribute
+TARGET_CLASSES = {
+    "url": "st_sharethis",
+    "title": "entry-title",
+    "author": "url fn n",
+    "publish_date": "entry-date",
+    "text": "entry-content",
+    "disqus_id": "dsq-postid",
+}
+
+# Attributes whose value is the text of the element
+TEXT_ATTRIBUTES = frozenset(["title", "author", "publish_date"])
+
+# The following follow the conventions of BeautifulSoup (with the lxml parser), so
+# that the results are the same as those of `_extract_post`
+
+# Tags which are serialized as e.g. "<br/>" if they are empty
+VOID_TAGS = frozenset(
+    [
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "keygen",
+        "link",
+        "menuitem",
+        "meta",
+        "param",
+        "source",
+        "track",
+        "wbr",
+        "basefont",
+        "bgsound",
+        "command",
+        "frame",
+        "image",
+        "isindex",
+        "nextid",
+        "spacer",
+    ]
+)
+
+# Tags whose text is not escaped when serialized
+CDATA_TAGS = frozenset(["script", "style"])
+
+# Tags whose text is not part of the text of the page
+NON_TEXT_TAGS = frozenset(["script", "style", "template", "rt", "rp"])
+
+# Tags in which whitespace-only strings are not collapsed
+PRESERVE_WHITESPACE_TAGS = frozenset(["pre", "textarea"])
+ASCII_WHITESPACE = frozenset("\x20\x0a\x09\x0c\x0d")
+
+# Attributes whose values are whitespace-separated lists, for all or some tags
+MULTI_VALUED_ATTRIBUTES = frozenset(["class", "accesskey", "dropzone"])
+TAG_MULTI_VALUED_ATTRIBUTES = {
+    "a": frozenset(["rel", "rev"]),
+    "link": frozenset(["rel", "rev"]),
+    "td": frozenset(["headers"]),
+    "th": frozenset(["headers"]),
+    "form": frozenset(["accept-charset"]),
+    "object": frozenset(["archive"]),
+    "area": frozenset(["rel"]),
+    "icon": frozenset(["sizes"]),
+    "iframe": frozenset(["sandbox"]),
+    "output": frozenset(["for"]),
+}
+
+
+def parse_post(page_html, lazy=False, skip_content=False):
+    """Extract all attributes of a post from its page.
+
+    Parameters
+    ----------
+    page_html : str
+        Full HTML of an overcomingbias post page.
+    lazy : bool, optional
+        If True, the attributes derived from the post content (see
+        `parse_content`) are not extracted. Instead, the HTML of the content is
+        returned under the key "content".
+    skip_content : bool, optional
+        If True, the attributes derived from the post content are not extracted,
+        and are None instead.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Keyword arguments for ``obscraper.Post`` (or ``obscraper.Post.from_content``
+        if `lazy` is True), excluding the vote count, comment count and edit date.
+        If the post content is extracted, the post's plaintext is also included,
+        under the key "plaintext".
+
+    Raises
+    ------
+    AssertionError
+        If the page does not look like an overcomingbias post.
+    obscraper.AttributeNotFoundError
+        If an attribute could not be extracted from the page.
+    """
+    target = PostTarget(raw_content=lazy, skip_content=skip_content)
+    feed(target, page_html)
+    assert target.is_ob_post(), "HTML is not overcomingbias post."
+
+    url = target.get_attribute("url", "URL")
+    try:
+        name = _extract_post.url_to_name(url["st_url"])
+    except ValueError:
+        name = None
+    _extract_post.raise_attribute_not_found_error_if_none(name, "name")
+    meta = target.get_attribute("meta", "metadata")
+    meta_header = _extract_post.parse_meta_header(split_values(meta["class"]))
+    title = target.get_attribute("title", "title")
+    author = target.get_attribute("author", "author")
+    publish_date = target.get_attribute("publish_date", "publish date")
+    content = target.get_attribute("text", "text")
+    disqus_id = target.found.get("disqus_id")
+
+    if skip_content:
+        content_attributes = {
+            "text_html": None,
+            "word_count": None,
+            "internal_links": None,
+            "external_links": None,
+        }
+    elif lazy:
+        content_attributes = {"content": content.html()}
+    else:
+        content_attributes = content.attributes()
+    return {
+        "name": name,
+        "number": int(meta_header["post"][0]),
+        "page_type": meta_header["type"][0],
+        "page_status": meta_header["status"][0],
+        "page_format": meta_header.get("format", [""])[0],
+        "tags": meta_header.get("tag", []),
+        "categories": meta_header.get("category", []),
+        "title": title,
+        "author": author,
+        "publish_date": _utils.tidy_date(publish_date, _extract_post.OB_SERVER_TZ),
+        "disqus_id": None if disqus_id is None else disqus_id["data-dsqidentifier"],
+        **content_attributes,
+    }
+
+
+def parse_content(content):
+    """Extract the attributes of a post which are derived from its content.
+
+    Parameters
+    ----------
+    content : str
+        HTML of the element containing the post text, as returned by `parse_post`
+        with ``lazy=True``.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The post's text HTML, word count, internal links, external links and
+        plaintext.
+    """
+    target = PostTarget()
+    feed(target, content)
+    return target.get_attribute("text", "text").attributes()
+
+
+def feed(target, html):
+    """Parse some HTML, sending events to a parser target."""
+    parser = lxml.etree.HTMLParser(target=target)
+    parser.feed(html)
+    parser.close()
+
+
+def parse_post_bytes(content, encoding=None, lazy=False, skip_content=False):
+    """Extract all attributes of a post from the raw bytes of its page.
+
+    Used to parse pages in other processes, since both the arguments and the
+    return value are cheap to pickle.
+
+    Parameters
+    ----------
+    content : bytes
+        Body of the response from the post page.
+    encoding : str, optional
+        Encoding of the response body. Defaults to UTF-8.
+    lazy : bool, optional
+        Whether to defer extracting the attributes derived from the post content.
+    skip_content : bool, optional
+        Whether to leave out the attributes derived from the post content.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Attributes of the post, as returned by `parse_post`.
+    """
+    page_html = content.decode(encoding or "utf-8", errors="replace")
+    return parse_post(page_html, lazy, skip_content)
+
+
+class PostTarget:
+    """Parser target which picks out post attributes as a page is parsed.
+
+    Receives events from an ``lxml.etree.HTMLParser``, and records the first
+    element with each of the classes in `TARGET_CLASSES` (as well as the metadata
+    header, site title and body). Text attributes (e.g. the title) are recorded as
+    strings, the post text is recorded by a `ContentWriter`, and other attributes
+    are recorded as dicts of the element's attributes.
+
+    Parameters
+    ----------
+    raw_content : bool, optional
+        If True, the post text is recorded as it is found on the page (see
+        `ContentWriter`).
+    skip_content : bool, optional
+        If True, the post text is not recorded - only the attributes of the element
+        containing it.
+    """
+
+    def __init__(self, raw_content=False, skip_content=False):
+        self.raw_content = raw_content
+        self.skip_content = skip_content
+        self.found = {}
+        self.site_url = None
+        self._remaining = dict(TARGET_CLASSES)
+        self._stack = []
+        self._data = []
+        self._preserve_depth = 0
+        self._non_text_depth = 0
+        self._captures = []
+        self._site_title_depth = None
+        self._content = None
+
+    def is_ob_post(self):
+        """Check whether the page looks like an overcomingbias post."""
+        if self.site_url is None or "www.overcomingbias.com" not in self.site_url:
+            return False
+        body = self.found.get("body")
+        return body is not None and "single-post" in split_values(body["class"])
+
+    def get_attribute(self, key, attribute_name):
+        """Get a recorded attribute, raising an error if it was not found."""
+        attribute = self.found.get(key)
+        _extract_post.raise_attribute_not_found_error_if_none(attribute, attribute_name)
+        return attribute
+
+    def start(self, tag, attrib):
+        """Handle the start of an element."""
+        self._flush()
+        self._stack.append(tag)
+        depth = len(self._stack)
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth += 1
+        if tag in NON_TEXT_TAGS:
+            self._non_text_depth += 1
+        if self._content is not None:
+            self._content.start(tag, attrib, depth)
+
+        if tag == "a" and self._site_title_depth is not None:
+            self.site_url = attrib.get("href", "")
+            self._site_title_depth = None
+        if tag == "body" and "body" not in self.found:
+            self.found["body"] = {"class": attrib.get("class", "")}
+        element_id = attrib.get("id")
+        if element_id is not None:
+            if element_id == "site-title" and "site_title" not in self.found:
+                self.found["site_title"] = attrib
+                self._site_title_depth = depth
+            if "meta" not in self.found and POST_ID_PATTERN.search(element_id):
+                self.found["meta"] = {"class": attrib.get("class", "")}
+        classes = attrib.get("class")
+        if classes is not None and self._remaining:
+            for key, target in list(self._remaining.items()):
+                if has_class(classes, target):
+                    del self._remaining[key]
+                    self._found_target(key, tag, attrib, depth)
+
+    def _found_target(self, key, tag, attrib, depth):
+        if key in TEXT_ATTRIBUTES:
+            self._captures.append((key, depth, []))
+        elif key == "text" and not self.skip_content:
+            self._content = ContentWriter(tag, attrib, depth, self.raw_content)
+        else:
+            self.found[key] = attrib
+
+    def end(self, tag):
+        """Handle the end of an element."""
+        self._flush()
+        depth = len(self._stack)
+        if self._content is not None:
+            self._content.end(tag, depth)
+            if depth == self._content.depth:
+                self.found["text"], self._content = self._content, None
+        if self._captures and self._captures[-1][1] == depth:
+            for key, capture_depth, parts in list(self._captures):
+                if capture_depth == depth:
+                    self.found[key] = "".join(parts)
+            self._captures = [c for c in self._captures if c[1] != depth]
+        if self._site_title_depth == depth:
+            self._site_title_depth = None
+
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth -= 1
+        if tag in NON_TEXT_TAGS:
+            self._non_text_depth -= 1
+        self._stack.pop()
+
+    def data(self, data):
+        """Handle text."""
+        self._data.append(data)
+
+    def comment(self, text):
+        """Handle a comment."""
+        self._flush()
+        if self._content is not None:
+            self._content.markup("<!--" + self._collapse(text) + "-->")
+
+    def pi(self, target, data):
+        """Handle a processing instruction."""
+        self._flush()
+        if self._content is not None:
+            self._content.markup("<?" + target + " " + data + ">")
+
+    def close(self):
+        """Handle the end of the page."""
+        self._flush()
+
+    def _flush(self):
+        """Handle text collected since the last element, comment etc."""
+        if not self._data:
+            return
+        text = self._collapse("".join(self._data))
+        self._data = []
+        is_text = self._non_text_depth == 0
+        if is_text:
+            for _, _, parts in self._captures:
+                parts.append(text)
+        if self._content is not None:
+            escaped = self._stack[-1] not in CDATA_TAGS
+            self._content.text(text, escaped, is_text)
+
+    def _collapse(self, text):
+        """Replace whitespace-only text with a single space or newline."""
+        return collapse_whitespace(text, self._preserve_depth > 0)
+
+
+class TextTarget:
+    """Parser target which collects the text of a page.
+
+    The text is the same as that given by BeautifulSoup's ``get_text`` method.
+    """
+
+    def __init__(self):
+        self._text_parts = []
+        self._stack = []
+        self._data = []
+        self._preserve_depth = 0
+        self._non_text_depth = 0
+
+    def text(self):
+        """str : The text collected so far."""
+        return "".join(self._text_parts)
+
+    def start(self, tag, attrib):  # pylint: disable=unused-argument
+        """Handle the start of an element."""
+        self._flush()
+        self._stack.append(tag)
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth += 1
+        if tag in NON_TEXT_TAGS:
+            self._non_text_depth += 1
+
+    def end(self, tag):
+        """Handle the end of an element."""
+        self._flush()
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth -= 1
+        if tag in NON_TEXT_TAGS:
+            self._non_text_depth -= 1
+        self._stack.pop()
+
+    def data(self, data):
+        """Handle text."""
+        self._data.append(data)
+
+    def comment(self, text):  # pylint: disable=unused-argument
+        """Handle a comment."""
+        self._flush()
+
+    def pi(self, target, data):  # pylint: disable=unused-argument
+        """Handle a processing instruction."""
+        self._flush()
+
+    def close(self):
+        """Handle the end of the page."""
+        self._flush()
+
+    def _flush(self):
+        if not self._data:
+            return
+        text = "".join(self._data)
+        self._data = []
+        if self._non_text_depth == 0:
+            self._text_parts.append(collapse_whitespace(text, self._preserve_depth > 0))
+
+
+class ContentWriter:
+    """Serialize the post text, collecting its plaintext and links on the way.
+
+    The first element with class "gdsrcacheloader" (a placeholder for the vote
+    count widget) is left out of the HTML and plaintext, but its links are kept.
+
+    Parameters
+    ----------
+    tag : str
+        Tag of the element containing the post text.
+    attrib : Dict[str, str]
+        Attributes of the element containing the post text.
+    depth : int
+        Depth of the element containing the post text.
+    raw : bool, optional
+        If True, only serialize the post text, without removing the vote count
+        placeholder or collecting the plaintext and links.
+    """
+
+    def __init__(self, tag, attrib, depth, raw=False):
+        self.depth = depth
+        self.raw = raw
+        self.links = []
+        self._html_parts = ["<", tag, format_attributes(tag, attrib)]
+        self._text_parts = []
+        self._start_tag_open = True
+        self._cache_loader_depth = None
+        self._cache_loader_removed = raw
+
+    def attributes(self):
+        """Get the post attributes derived from the post text.
+
+        Returns
+        -------
+        Dict[str, Any]
+            The text HTML, word count, internal links, external links and
+            plaintext.
+        """
+        plaintext = self.plaintext()
+        return {
+            "text_html": self.html(),
+            "word_count": _utils.count_words(plaintext),
+            "internal_links": [
+                link for link in self.links if _extract_post.is_valid_post_url(link)
+            ],
+            "external_links": [
+                link for link in self.links if not _extract_post.is_valid_post_url(link)
+            ],
+            "plaintext": plaintext,
+        }
+
+    def html(self):
+        """str : The HTML of the post text."""
+        return "".join(self._html_parts)
+
+    def plaintext(self):
+        """str : Plaintext of the post, as given by `convert_to_plaintext`."""
+        return squish_text("".join(self._text_parts))
+
+    def start(self, tag, attrib, depth):
+        """Handle the start of an element within the post text."""
+        if tag == "a" and "href" in attrib and not self.raw:
+            self.links.append(attrib["href"])
+        if self._cache_loader_depth is not None:
+            return
+        classes = attrib.get("class")
+        if (
+            not self._cache_loader_removed
+            and classes is not None
+            and has_class(classes, "gdsrcacheloader")
+        ):
+            self._cache_loader_depth = depth
+            self._cache_loader_removed = True
+            return
+        self._close_start_tag()
+        self._html_parts.append("<" + tag)
+        if attrib:
+            self._html_parts.append(format_attributes(tag, attrib))
+        self._start_tag_open = True
+
+    def end(self, tag, depth):
+        """Handle the end of an element within (or containing) the post text."""
+        if self._cache_loader_depth is not None:
+            if depth == self._cache_loader_depth:
+                self._cache_loader_depth = None
+            return
+        if not self._start_tag_open:
+            self._html_parts.append("</" + tag + ">")
+        elif tag in VOID_TAGS:
+            self._html_parts.append("/>")
+        else:
+            self._html_parts.append("></" + tag + ">")
+        self._start_tag_open = False
+
+    def text(self, text, escaped, is_text):
+        """Handle text within the post text."""
+        if self._cache_loader_depth is not None:
+            return
+        self._close_start_tag()
+        self._html_parts.append(escape(text) if escaped else text)
+        if is_text and not self.raw:
+            self._text_parts.append(text)
+
+    def markup(self, markup):
+        """Handle a comment (or similar) within the post text."""
+        if self._cache_loader_depth is not None:
+            return
+        self._close_start_tag()
+        self._html_parts.append(markup)
+
+    def _close_start_tag(self):
+        if self._start_tag_open:
+            self._html_parts.append(">")
+            self._start_tag_open = False
+
+
+def convert_to_plaintext(text_html):
+    """Convert post text from HTML to plaintext format.
+
+    Gives the same result as `_extract_post.convert_to_plaintext`, without building
+    a BeautifulSoup tree.
+
+    Parameters
+    ----------
+    text_html : str
+        Post text HTML, e.g. as returned by `parse_post`.
+
+    Returns
+    -------
+    str
+        Full text of post as plaintext.
+    """
+    target = TextTarget()
+    feed(target, text_html)
+    return squish_text(target.text())
+
+
+def collapse_whitespace(text, preserve=False):
+    """Replace whitespace-only text with a space or newline, unless preserved."""
+    if not preserve and ASCII_WHITESPACE.issuperset(text):
+        return "\n" if "\n" in text else " "
+    return text
+
+
+def squish_text(text):
+    """Remove leading, trailing and repeated spaces, as `convert_to_plaintext` does."""
+    text = text.replace("\xa0", " ")
+    return re.sub(" {2,}", " ", text.strip())
+
+
+def split_values(value):
+    """Split a multi-valued attribute (e.g. class) into a list of values."""
+    return NON_WHITESPACE_PATTERN.findall(value)
+
+
+def has_class(classes, target):
+    """Check whether a class attribute matches a class, like BeautifulSoup does."""
+    values = split_values(classes)
+    return target in values or target == " ".join(values)
+
+
+def format_attributes(tag, attrib):
+    """Format the attributes of a tag, in the same way as BeautifulSoup."""
+    multi_valued = TAG_MULTI_VALUED_ATTRIBUTES.get(tag, ())
+    parts = []
+    for key, value in sorted(attrib.items()):
+        if key in MULTI_VALUED_ATTRIBUTES or key in multi_valued:
+            value = " ".join(split_values(value))
+        parts.append(f" {key}={quote(escape(value))}")
+    return "".join(parts)
+
+
+def escape(text):
+    """Escape text using BeautifulSoup's "minimal" formatter."""
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def quote(value):
+    """Quote an attribute value, in the same way as BeautifulSoup."""
+    if '"' in value:
+        if "'" in value:
+            return '"' + value.replace('"', "&quot;") + '"'
+        return "'" + value + "'"
+    return '"' + value + '"'
@@ -2,9 +2,25 @@
 
 import dataclasses
 import datetime
+import enum
 from typing import List, Union
 
-from obscraper import _extract_post
+from obscraper import _extract_post, _parse_post
+
+
+class _Lazy(enum.Enum):
+    """Sentinel for post attributes which have not been computed yet."""
+
+    LAZY = "LAZY"
+
+    def __repr__(self):
+        return "LAZY"
+
+
+LAZY = _Lazy.LAZY
+
+# Post attributes which are derived from the post content
+CONTENT_FIELDS = ["text_html", "word_count", "internal_links", "external_links"]
 
 
 @dataclasses.dataclass(order=False)
@@ -51,6 +67,16 @@ class Post:
         The number of comments on the post.
     edit_date : datetime.datetime, optional
         The (aware) datetime when the post was last edited, according to the sitemap.
+
+    Notes
+    -----
+    Posts created by `Post.from_content` (e.g. by sessions with ``lazy_posts=True``)
+    keep the HTML of the post content, and only compute `text_html`, `word_count`,
+    `internal_links` and `external_links` when one of them is first accessed.
+
+    Posts retrieved with a `fields` argument (e.g. by
+    ``obscraper.get_posts_by_names(names, fields=["title"])``) only have the
+    requested attributes and their name - other attributes are None.
     """
 
     # pylint: disable=too-many-instance-attributes
@@ -80,5 +106,91 @@ class Post:
 
     @property
     def plaintext(self):
-        """str : The full text of the post in plaintext format."""
-        return _extract_post.convert_to_plaintext(self.text_html)
+        """str | None : The full text of the post in plaintext format."""
+        text_html = self.text_html
+        if text_html is None:
+            return None
+        cached = self.__dict__.get("_plaintext")
+        if cached is None or cached[0] is not text_html:
+            cached = (text_html, _parse_post.convert_to_plaintext(text_html))
+            self.__dict__["_plaintext"] = cached
+        return cached[1]
+
+    def _cache_plaintext(self, plaintext):
+        """Store the plaintext of the current `text_html`, so it isn't computed again.
+
+        Parameters
+        ----------
+        plaintext : str
+            The plaintext of the post, as given by the `plaintext` property.
+        """
+        self.__dict__["_plaintext"] = (self.text_html, plaintext)
+
+    @classmethod
+    def from_content(cls, content, **attributes):
+        """Create a post whose content attributes are computed when first accessed.
+
+        Parameters
+        ----------
+        content : str
+            HTML of the element containing the post text, as found on the page
+            (i.e. including the vote count placeholder).
+        **attributes
+            The other attributes of the post.
+
+        Returns
+        -------
+        obscraper.Post
+            A post whose `text_html`, `word_count`, `internal_links` and
+            `external_links` are extracted from `content` when first accessed.
+        """
+        post = cls(**{name: LAZY for name in CONTENT_FIELDS}, **attributes)
+        post.__dict__["_content"] = content
+        return post
+
+    def _extract_content(self):
+        """Compute all content attributes, discarding the retained content.
+
+        Posts may be shared between threads, so the content is only discarded
+        once every attribute is set. If two threads extract it at once, both
+        compute the same attributes, and only the first result is kept.
+        """
+        content = self.__dict__.get("_content")
+        if content is None:
+            return  # already extracted by another thread
+        attributes = _parse_post.parse_content(content)
+        for name in CONTENT_FIELDS:
+            # Don't overwrite attributes which have since been set
+            if self.__dict__[name] is LAZY:
+                self.__dict__[name] = attributes[name]
+        if self.__dict__["text_html"] is attributes["text_html"]:
+            self._cache_plaintext(attributes["plaintext"])
+        self.__dict__.pop("_content", None)
+
+
+class _ContentField:
+    """Data descriptor for a post attribute which may be computed lazily."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, post, owner=None):
+        if post is None:
+            return self
+        value = post.__dict__[self.name]
+        if value is LAZY:
+            post._extract_content()  # pylint: disable=protected-access
+            value = post.__dict__[self.name]
+        return value
+
+    def __set__(self, post, value):
+        post.__dict__[self.name] = value
+
+
+# Added after the class is created, so dataclasses still treats them as fields
+for _name in CONTENT_FIELDS:
+    setattr(Post, _name, _ContentField(_name))
+
+
+# Names of all post attributes, in order
+FIELDS = [field.name for field in dataclasses.fields(Post)]
@@ -0,0 +1,156 @@
+"""Limit the rate of requests made to each host.
+
+This interface is internal - implementation details may change.
+"""
+
+import collections
+import math
+
+import trio
+
+# Default sustained rate (requests per second) and burst size for each host
+DEFAULT_RATE_LIMIT = 40.0
+DEFAULT_BURST = 20
+
+# Period (in seconds) over which the current request rate is measured
+RATE_WINDOW = 10.0
+
+_rate_limiter = trio.lowlevel.RunVar("rate_limiter")
+
+
+class TokenBucket:
+    """Token bucket rate limiter for a single host.
+
+    Tokens are added to the bucket at a constant rate, up to a maximum of `burst`
+    tokens. Each request takes one token, waiting until one is available. The bucket
+    can also be paused (e.g. after a 429 response), in which case all requests wait
+    until the pause is over.
+
+    Parameters
+    ----------
+    rate : float | None
+        Sustained request rate (in requests per second). If None, the rate is not
+        limited, but the bucket can still be paused.
+    burst : int
+        Maximum number of requests which can be sent at once.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        # The bucket is tracked via the time at which it will next be full (the
+        # "theoretical arrival time" of the generic cell rate algorithm), which avoids
+        # accumulating rounding errors in a fractional token count.
+        self._full_at = -math.inf
+        self._resume_at = -math.inf
+        self._sent = collections.deque()
+
+    async def acquire(self):
+        """Wait until a request can be sent, then take a token."""
+        while True:
+            now = trio.current_time()
+            if now < self._resume_at:
+                await trio.sleep_until(self._resume_at)
+                continue
+            if self.rate is None:
+                break
+            start = max(self._full_at, now)
+            send_at = start - (self.burst - 1) / self.rate
+            if send_at <= now:
+                self._full_at = start + 1 / self.rate
+                break
+            await trio.sleep_until(send_at)
+        self._sent.append(trio.current_time())
+
+    async def pause(self, delay):
+        """Stop all requests for `delay` seconds, and wait until the pause is over.
+
+        Overlapping pauses are merged, so the bucket resumes at the latest requested
+        time. The bucket is emptied, so requests resume at the sustained rate rather
+        than in a burst.
+        """
+        self._resume_at = max(self._resume_at, trio.current_time() + delay)
+        if self.rate is not None:
+            self._full_at = self._resume_at + (self.burst - 1) / self.rate
+        await trio.sleep_until(self._resume_at)
+
+    def current_rate(self):
+        """float : The rate at which requests were sent over the last few seconds."""
+        now = trio.current_time()
+        while self._sent and self._sent[0] < now - RATE_WINDOW:
+            self._sent.popleft()
+        return len(self._sent) / RATE_WINDOW
+
+
+class RateLimiter:
+    """Rate limiter shared by all requests, with one token bucket per host.
+
+    Parameters
+    ----------
+    rate : float | None, optional
+        Sustained request rate (in requests per second) for each host. If None, the
+        rate is not limited.
+    burst : int, optional
+        Maximum number of requests which can be sent to a host at once.
+
+    Raises
+    ------
+    ValueError
+        If the rate or burst size is not positive.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE_LIMIT, burst=DEFAULT_BURST):
+        if rate is not None and not rate > 0:
+            raise ValueError(f"expected rate to be positive (or None), got {rate}")
+        if not isinstance(burst, int) or burst < 1:
+            raise ValueError(f"expected burst to be positive int, got {burst}")
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+
+    def bucket(self, host):
+        """Get the token bucket for a host."""
+        try:
+            return self._buckets[host]
+        except KeyError:
+            return self._buckets.setdefault(host, TokenBucket(self.rate, self.burst))
+
+    async def acquire(self, host):
+        """Wait until a request can be sent to a host."""
+        await self.bucket(host).acquire()
+
+    async def pause(self, host, delay):
+        """Stop all requests to a host for `delay` seconds, and wait."""
+        await self.bucket(host).pause(delay)
+
+    def current_rate(self, host=None):
+        """Get the rate at which requests have recently been sent.
+
+        Parameters
+        ----------
+        host : str, optional
+            A host name. If not given, the total rate across all hosts is returned.
+
+        Returns
+        -------
+        float
+            Number of requests per second, measured over the last `RATE_WINDOW`
+            seconds.
+        """
+        if host is not None:
+            return self.bucket(host).current_rate()
+        return sum(bucket.current_rate() for bucket in self._buckets.values())
+
+
+def set_rate_limiter(rate_limiter):
+    """Set the rate limiter for requests made in the current trio run."""
+    _rate_limiter.set(rate_limiter)
+
+
+def get_rate_limiter():
+    """Get the rate limiter for the current trio run, creating it if needed."""
+    try:
+        return _rate_limiter.get()
+    except LookupError:
+        set_rate_limiter(RateLimiter())
+        return _rate_limiter.get()
@@ -3,12 +3,24 @@
 This interface is internal - implementation details may change.
 """
 
+import contextlib
+import functools
+
+import httpx
 import trio
 
-from obscraper import _assemble, _exceptions, _extract_post, _fetch, _utils
+from obscraper import (
+    _assemble,
+    _exceptions,
+    _extract_post,
+    _fetch,
+    _post,
+    _session,
+    _utils,
+)
 
 
-def get_posts_by_names(names):
+def get_posts_by_names(names, session=None, fields=None):
     """Get dict of posts identified by their names.
 
     No exceptions are raised if a post or post attribute is not found - instead "None"
@@ -18,6 +30,13 @@ def get_posts_by_names(names):
     ----------
     names : List[str]
         A list of overcomingbias post names to scrape data for.
+    session : obscraper.Session, optional
+        The session used to make requests. If not given, a shared default session
+        is used.
+    fields : List[str], optional
+        Names of the post attributes to get, e.g. ``["title", "votes"]``. Other
+        attributes (except the name) are None, and the requests and parsing needed
+        only for them are skipped. If not given, all attributes are included.
 
     Returns
     -------
@@ -28,12 +47,14 @@ def get_posts_by_names(names):
     Raises
     ------
     ValueError
-        If any of the input names are not valid overcomingbias post names.
+        If any of the input names are not valid overcomingbias post names, or any
+        of the fields are not post attributes.
     """
     # Argument validation
     raise_exception_if_arg_is_not_type(names, list, "names")
     for name in names:
         raise_exception_if_name_is_not_valid_post_name(name)
+    fields = tidy_fields(fields)
 
     # Short-circuit if list is empty
     if names == []:
@@ -41,12 +62,138 @@ def get_posts_by_names(names):
 
     # Scraping
     names_dict = {name: name for name in names}
-    posts = trio.run(_fetch.fetch_posts, names_dict)
+    posts = _get_session(session).run(_fetch.fetch_posts, names_dict, fields)
 
     return posts
 
 
-def get_vote_counts(numbers_dict):
+def iter_posts_by_names(names, session=None, fields=None):
+    """Iterate over posts identified by their names, as they are fetched.
+
+    Posts are yielded in the order they are fetched, rather than the order of
+    `names`. No exceptions are raised if a post or post attribute is not found -
+    instead "None" is yielded for that post.
+
+    Only a limited number of posts are fetched ahead of the consumer, so memory use
+    does not grow with the number of names.
+
+    Parameters
+    ----------
+    names : List[str]
+        A list of overcomingbias post names to scrape data for.
+    session : obscraper.Session, optional
+        The session used to make requests. If not given, a shared default session
+        is used.
+    fields : List[str], optional
+        Names of the post attributes to get, e.g. ``["title", "votes"]``. Other
+        attributes (except the name) are None, and the requests and parsing needed
+        only for them are skipped. If not given, all attributes are included.
+
+    Yields
+    ------
+    Tuple[str, obscraper.Post | None]
+        Tuples whose first element is an inputted name and whose second element is
+        the corresponding post.
+
+    Raises
+    ------
+    ValueError
+        If any of the input names are not valid overcomingbias post names, or any
+        of the fields are not post attributes.
+    """
+    # Argument validation (done now, rather than when iteration starts)
+    raise_exception_if_arg_is_not_type(names, list, "names")
+    for name in names:
+        raise_exception_if_name_is_not_valid_post_name(name)
+    fields = tidy_fields(fields)
+
+    return _iter_posts_by_names(names, session, fields)
+
+
+def _iter_posts_by_names(names, session, fields):
+    if names == []:
+        return
+    names_dict = {name: name for name in names}
+    stream_posts = functools.partial(_fetch.stream_posts, fields=fields)
+    yield from _get_session(session).iterate(stream_posts, names_dict)
+
+
+def open_post_stream(names, async_client=None, fields=None):
+    """Open a stream of posts identified by their names, as they are fetched.
+
+    Must be used as an async context manager, from within a trio event loop. It
+    gives a trio receive channel, from which posts can be received as soon as they
+    are fetched::
+
+        async with obscraper.open_post_stream(names) as posts:
+            async for name, post in posts:
+                ...
+
+    Posts are fetched in a background task, which is cancelled when the ``async
+    with`` block exits, so it is safe to stop receiving early.
+
+    Parameters
+    ----------
+    names : List[str]
+        A list of overcomingbias post names to scrape data for.
+    async_client : httpx.AsyncClient, optional
+        The HTTP client used to make requests. If not given, a new client is opened
+        (and closed when the ``async with`` block exits).
+    fields : List[str], optional
+        Names of the post attributes to get, e.g. ``["title", "votes"]``. Other
+        attributes (except the name) are None, and the requests and parsing needed
+        only for them are skipped. If not given, all attributes are included.
+
+    Returns
+    -------
+    AsyncContextManager[trio.MemoryReceiveChannel]
+        Context manager giving a channel of tuples, whose first element is an
+        inputted name and whose second element is the corresponding post (or None
+        if it could not be retrieved), in the order they are fetched.
+
+    Raises
+    ------
+    ValueError
+        If any of the input names are not valid overcomingbias post names, or any
+        of the fields are not post attributes.
+    """
+    # Argument validation (done now, rather than when the stream is opened)
+    raise_exception_if_arg_is_not_type(names, list, "names")
+    for name in names:
+        raise_exception_if_name_is_not_valid_post_name(name)
+    fields = tidy_fields(fields)
+
+    return _open_post_stream(names, async_client, fields)
+
+
+@contextlib.asynccontextmanager
+async def _open_post_stream(names, async_client, fields):
+    if async_client is None:
+        async with httpx.AsyncClient(
+            http2=True, timeout=_session.DEFAULT_TIMEOUT
+        ) as new_client:
+            async with _open_post_stream(names, new_client, fields) as receive_channel:
+                yield receive_channel
+        return
+
+    names_dict = {name: name for name in names}
+    send_channel, receive_channel = trio.open_memory_channel(0)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(
+            functools.partial(_fetch.stream_posts, fields=fields),
+            async_client,
+            names_dict,
+            send_channel,
+        )
+        try:
+            yield receive_channel
+        finally:
+            # Cancel before closing, so the sender isn't woken by a broken channel
+            nursery.cancel_scope.cancel()
+            receive_channel.close()
+
+
+def get_vote_counts(numbers_dict, session=None):
     """Get vote counts for some posts.
 
     Unlike other functions, `get_vote_counts` returns 0 (rather than None) when a post
@@ -59,12 +206,16 @@ def get_vote_counts(numbers_dict):
     numbers_dict : Dict[str, int]
         Dictionary whose keys are arbitrary labels (e.g. the post URLs) and whose values
         are post numbers to get votes for.
+    session : obscraper.Session, optional
+        The session used to make requests. If not given, a shared default session
+        is used.
 
     Returns
     -------
-    Dict[str, int]
+    Dict[str, int | None]
         A dictionary whose keys are the inputted labels and whose values are the
-        corresponding vote counts (int). The vote count is 0 if the post is not found.
+        corresponding vote counts (int). The vote count is 0 if the post is not found,
+        and None if it is missing from the vote count API's response.
 
     Raises
     ------
@@ -82,12 +233,12 @@ def get_vote_counts(numbers_dict):
         return {}
 
     # Run
-    votes = trio.run(_fetch.fetch_vote_counts, numbers_dict)
+    votes = _get_session(session).run(_fetch.fetch_vote_counts, numbers_dict)
 
     return votes
 
 
-def get_comment_counts(disqus_ids_dict):
+def get_comment_counts(disqus_ids_dict, session=None):
     """Get comment counts for some posts.
 
     If no comment count is found, "None" is returned.
@@ -97,6 +248,9 @@ def get_comment_counts(disqus_ids_dict):
     disqus_ids_dict : Dict[str, str | None]
         Dictionary whose keys are arbitrary labels (e.g. the post URLs)
         and whose values are the the corresponding Disqus ID strings.
+    session : obscraper.Session, optional
+        The session used to make requests. If not given, a shared default session
+        is used.
 
     Returns
     -------
@@ -121,49 +275,137 @@ def get_comment_counts(disqus_ids_dict):
         return {}
 
     # Run
-    comments = trio.run(_fetch.fetch_comment_counts, disqus_ids_dict)
+    comments = _get_session(session).run(_fetch.fetch_comment_counts, disqus_ids_dict)
 
     return comments
 
 
-def get_edit_dates():
+def get_edit_dates(session=None):
     """Get a dict of post edit dates.
 
+    Parameters
+    ----------
+    session : obscraper.Session, optional
+        The session used to make requests. If not given, a shared default session
+        is used.
+
     Returns
     -------
     Dict[str, datetime.datetime]
         Dictionary whose keys are post names and values are the last edit dates of each
         post as "aware" datetime.datetime objects.
     """
-    edit_dates = trio.run(_fetch.fetch_edit_dates)
+    edit_dates = _get_session(session).run(_fetch.fetch_edit_dates)
     return edit_dates
 
 
-def get_all_posts():
+def get_all_posts(session=None, fields=None):
     """Get all posts hosted on the overcomingbias site.
 
     This includes vote and comment counts for each post, and their last edit dates.
 
     Posts which are no longer hosted on the overcomingbias site are returned as "None".
 
+    Parameters
+    ----------
+    session : obscraper.Session, optional
+        The session used to make requests. If not given, a shared default session
+        is used.
+    fields : List[str], optional
+        Names of the post attributes to get, e.g. ``["title", "votes"]``. Other
+        attributes (except the name) are None, and the requests and parsing needed
+        only for them are skipped. If not given, all attributes are included.
+
     Returns
     -------
     Dict[str, obscraper.Post]
         A dictionary whose keys are post names and whose values are the
         corresponding posts.
+
+    Raises
+    ------
+    ValueError
+        If any of the fields are not post attributes.
     """
-    edit_dates = get_edit_dates()
-    posts = get_posts_by_names(list(edit_dates.keys()))
+    fields = tidy_fields(fields)
+    edit_dates = get_edit_dates(session=session)
+    posts = get_posts_by_names(list(edit_dates.keys()), session=session, fields=fields)
     return posts
 
 
-def get_post_by_name(name):
+def crawl_posts(names=None, session=None, fields=None):
+    """Iterate over posts, following links between posts to find more of them.
+
+    Starting from `names` (or from all posts listed in the sitemap), posts are
+    fetched breadth-first: the posts linked to by each post are fetched after it,
+    in the order they were found. This finds posts which are not listed in the
+    sitemap, but can still be reached through links from other posts.
+
+    Each post is fetched only once, and new posts are yielded as soon as they are
+    fetched. No exceptions are raised if a post or post attribute is not found -
+    instead "None" is yielded for that post.
+
+    Parameters
+    ----------
+    names : List[str], optional
+        A list of overcomingbias post names to start from. If not given, the crawl
+        starts from every post listed in the sitemap (see
+        :func:`obscraper.get_edit_dates`).
+    session : obscraper.Session, optional
+        The session used to make requests. If not given, a shared default session
+        is used.
+    fields : List[str], optional
+        Names of the post attributes to get, e.g. ``["title", "votes"]``. The
+        internal links are always included, since they are needed to find more
+        posts. If not given, all attributes are included.
+
+    Yields
+    ------
+    Tuple[str, obscraper.Post | None]
+        Tuples whose first element is a post name and whose second element is the
+        corresponding post, in the order they are fetched.
+
+    Raises
+    ------
+    ValueError
+        If any of the input names are not valid overcomingbias post names, or any
+        of the fields are not post attributes.
+
+    Notes
+    -----
+    Links of the form https://www.overcomingbias.com/?p=18402 are only followed
+    if their post numbers are already known (e.g. because the posts have been
+    fetched before), so that no extra requests are made to resolve them.
+    """
+    if names is not None:
+        raise_exception_if_arg_is_not_type(names, list, "names")
+        for name in names:
+            raise_exception_if_name_is_not_valid_post_name(name)
+    if fields is not None:
+        raise_exception_if_arg_is_not_type(fields, (list, tuple), "fields")
+        fields = tidy_fields([*fields, "internal_links"])
+
+    return _crawl_posts(names, session, fields)
+
+
+def _crawl_posts(names, session, fields):
+    session = _get_session(session)
+    if names is None:
+        names = list(get_edit_dates(session=session))
+    crawl_posts = functools.partial(_fetch.crawl_posts, fields=fields)
+    yield from session.iterate(crawl_posts, names)
+
+
+def get_post_by_name(name, session=None):
     """Get a single post by its name.
 
     Parameters
     ---------
     name : str
         An overcomingbias post name, e.g. '2010/09/jobs-explain-lots'.
+    session : obscraper.Session, optional
+        The session used to make requests. If not given, a shared default session
+        is used.
 
     Returns
     -------
@@ -178,13 +420,13 @@ def get_post_by_name(name):
         If the post could not be retrieved.
     """
     raise_exception_if_arg_is_not_type(name, str, "name")
-    post = get_posts_by_names([name])[name]
+    post = get_posts_by_names([name], session=session)[name]
     if post is None:
         raise _exceptions.InvalidResponseError("Could not retrieve" f" post {name}.")
     return post
 
 
-def get_posts_by_urls(urls):
+def get_posts_by_urls(urls, session=None, fields=None):
     """Get list of posts identified by their URLs.
 
     "None" is returned if a post could not be retrieved.
@@ -193,6 +435,13 @@ def get_posts_by_urls(urls):
     ---------
     urls : List[str]
         A list of overcomingbias post URLs to scrape data for.
+    session : obscraper.Session, optional
+        The session used to make requests. If not given, a shared default session
+        is used.
+    fields : List[str], optional
+        Names of the post attributes to get, e.g. ``["title", "votes"]``. Other
+        attributes (except the name) are None, and the requests and parsing needed
+        only for them are skipped. If not given, all attributes are included.
 
     Returns
     -------
@@ -203,25 +452,84 @@ def get_posts_by_urls(urls):
     Raises
     ------
     ValueError
-        If any of the input URLs are not valid overcomingbias post URLs.
+        If any of the input URLs are not valid overcomingbias post URLs, or any of
+        the fields are not post attributes.
     """
     raise_exception_if_arg_is_not_type(urls, list, "urls")
 
     names = [_extract_post.url_to_name(url) for url in urls]
-    posts_by_names = get_posts_by_names(names)
+    posts_by_names = get_posts_by_names(names, session=session, fields=fields)
     posts_by_urls = {
         _extract_post.name_to_url(name): post for name, post in posts_by_names.items()
     }
     return posts_by_urls
 
 
-def get_post_by_url(url):
+def get_posts_by_numbers(numbers, session=None, fields=None):
+    """Get dict of posts identified by their numbers.
+
+    Post numbers are resolved to post names through an index of the numbers and
+    names of every post fetched so far (which is stored in the session's
+    `cache_dir`, if it has one). A request is made to the post's "short" URL, e.g.
+    https://www.overcomingbias.com/?p=18402, only for numbers which are not in
+    the index.
+
+    No exceptions are raised if a post or post attribute is not found - instead "None"
+    is returned for that post.
+
+    Parameters
+    ----------
+    numbers : List[int]
+        A list of overcomingbias post numbers to scrape data for.
+    session : obscraper.Session, optional
+        The session used to make requests. If not given, a shared default session
+        is used.
+    fields : List[str], optional
+        Names of the post attributes to get, e.g. ``["title", "votes"]``. Other
+        attributes (except the name) are None, and the requests and parsing needed
+        only for them are skipped. If not given, all attributes are included.
+
+    Returns
+    -------
+    Dict[int, obscraper.Post]
+        A dictionary whose keys are the inputted numbers and whose values are the
+        corresponding posts.
+
+    Raises
+    ------
+    ValueError
+        If any of the input numbers are not valid post numbers, or any of the
+        fields are not post attributes.
+    """
+    # Argument validation
+    raise_exception_if_arg_is_not_type(numbers, list, "numbers")
+    for number in numbers:
+        raise_exception_if_number_has_incorrect_format(number)
+    fields = tidy_fields(fields)
+
+    # Short-circuit if list is empty
+    if numbers == []:
+        return {}
+
+    # Scraping
+    numbers_dict = {number: number for number in numbers}
+    posts = _get_session(session).run(
+        _fetch.fetch_posts_by_numbers, numbers_dict, fields
+    )
+
+    return posts
+
+
+def get_post_by_url(url, session=None):
     """Get a single post by its URL.
 
     Parameters
     ---------
     url : str
         An overcomingbias post URL.
+    session : obscraper.Session, optional
+        The session used to make requests. If not given, a shared default session
+        is used.
 
     Returns
     -------
@@ -236,19 +544,26 @@ def get_post_by_url(url):
         If the post could not be retrieved.
     """
     raise_exception_if_arg_is_not_type(url, str, "url")
-    post = get_posts_by_urls([url])[url]
+    post = get_posts_by_urls([url], session=session)[url]
     if post is None:
         raise _exceptions.InvalidResponseError("Could not retrieve post" f" {url}.")
     return post
 
 
-def get_posts_by_edit_date(start_date, end_date):
+def get_posts_by_edit_date(start_date, end_date, session=None, fields=None):
     """Get posts edited within a given date range.
 
     Parameters
     ----------
     start_date, end_date : datetime.datetime
         The start and end dates of the date range, as "aware" datetimes.
+    session : obscraper.Session, optional
+        The session used to make requests. If not given, a shared default session
+        is used.
+    fields : List[str], optional
+        Names of the post attributes to get, e.g. ``["title", "votes"]``. Other
+        attributes (except the name) are None, and the requests and parsing needed
+        only for them are skipped. If not given, all attributes are included.
 
     Returns
     -------
@@ -259,32 +574,89 @@ def get_posts_by_edit_date(start_date, end_date):
     Raises
     ------
     ValueError
-        If `start_date` is after `end_date`.
+        If `start_date` is after `end_date`, or any of the fields are not post
+        attributes.
     """
     raise_exception_if_date_has_incorrect_format(start_date, "start_date")
     raise_exception_if_date_has_incorrect_format(end_date, "end_date")
     if start_date > end_date:
         raise ValueError("end date is before start date")
+    fields = tidy_fields(fields)
+
+    selected_names = get_names_by_edit_date(start_date, end_date, session=session)
+    posts = get_posts_by_names(selected_names, session=session, fields=fields)
+    return posts
+
+
+def get_names_by_edit_date(start_date, end_date, session=None):
+    """Get the names of posts edited within a given date range.
 
-    edit_dates = get_edit_dates()
-    selected_names = [
+    Arguments are as for `get_posts_by_edit_date`, but are not checked.
+    """
+    edit_dates = get_edit_dates(session=session)
+    return [
         name
         for name, edit_date in edit_dates.items()
         if start_date < edit_date < end_date
     ]
-    posts = get_posts_by_names(selected_names)
-    return posts
+
+
+def get_failed_posts():
+    """Get the posts which could not be retrieved recently.
+
+    Post pages which fail (e.g. because the post no longer exists) are not
+    requested again for 10 minutes - the post is returned as None (or the original
+    error is raised) without making any requests. This lets callers skip posts
+    which are known to be missing, e.g. those still listed in the sitemap.
+
+    Returns
+    -------
+    Dict[str, obscraper.PostFailure]
+        Dictionary whose keys are post names and whose values describe why each
+        post could not be retrieved.
+
+    Notes
+    -----
+    Errors which are likely to be temporary (e.g. being rate limited) are not
+    stored. Use :func:`obscraper.clear_cache` to retry failed posts sooner.
+    """
+    return _assemble.post_failures.items()
 
 
 def clear_cache():
-    """Clear all cached data."""
+    """Clear all cached data, including recent failures."""
     _assemble.assemble_post.cache_clear()
+    _assemble.post_failures.clear()
+    _assemble.assemble_post_name.cache_clear()
     _assemble.assemble_vote_count.cache_clear()
     _assemble.assemble_comment_count.cache_clear()
     _assemble.assemble_edit_dates.cache_clear()
     _assemble.assemble_vote_auth.cache_clear()
 
 
+def _get_session(session):
+    """Get the given session, or the default session if `session` is None."""
+    if session is None:
+        return _session.get_default_session()
+    return session
+
+
+def tidy_fields(fields):
+    """Check a list of post attribute names, and convert it to a tuple.
+
+    The post name is always included, and the attributes are put in a standard
+    order, so that equivalent lists give the same (hashable) result. None is
+    returned unchanged.
+    """
+    if fields is None:
+        return None
+    raise_exception_if_arg_is_not_type(fields, (list, tuple), "fields")
+    for field in fields:
+        if field not in _post.FIELDS:
+            raise ValueError(f"expected field to be post attribute name, got {field}")
+    return tuple(field for field in _post.FIELDS if field == "name" or field in fields)
+
+
 def raise_exception_if_name_is_not_valid_post_name(name):
     """Raise an exception if a post name is not valid."""
     if not isinstance(name, str):
@@ -1,13 +1,21 @@
 """Encode and decode Post objects."""
 
-import dataclasses
+import codecs
 import datetime
 import json
 
 import dateutil.parser
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 from obscraper import _post, _utils
 
+# Post attributes and properties which are serialized, in order
+POST_FIELDS = _post.FIELDS + _utils.property_names(_post.Post)
+
 
 class PostEncoder(json.JSONEncoder):
     """Encode obscraper.Post object to JSON.
@@ -16,21 +24,110 @@ class PostEncoder(json.JSONEncoder):
     plaintext and URL) are included in the serialized object.
 
     Inherits from ``json.JSONEncoder``.
+
+    Parameters
+    ----------
+    fields : List[str], optional
+        Names of the post attributes and properties to include, in order. If not
+        given, all of them are included.
+    **kwargs
+        Other arguments to pass to ``json.JSONEncoder``.
     """
 
+    def __init__(self, *, fields=None, **kwargs):
+        super().__init__(**kwargs)
+        self.fields = POST_FIELDS if fields is None else tidy_fields(fields)
+
     def default(self, o):
         if isinstance(o, _post.Post):
-            attributes = dataclasses.asdict(o)
-            properties = {
-                name: getattr(o, name) for name in _utils.property_names(_post.Post)
-            }
-            return {**attributes, **properties}
+            return post_to_dict(o, self.fields)
         if _utils.is_aware_datetime(o):
-            time_in_utc = o.astimezone(datetime.timezone.utc)
-            return time_in_utc.strftime("%Y-%m-%dT%H:%M:%SZ")
+            return format_datetime(o)
         return super().default(o)
 
 
+def post_to_dict(post, fields=None):
+    """Convert obscraper.Post to a dictionary of its attributes and properties.
+
+    Attribute values are not copied, so this is much faster than
+    ``dataclasses.asdict``.
+
+    Parameters
+    ----------
+    post : obscraper.Post
+        A post.
+    fields : List[str], optional
+        Names of the attributes and properties to include, in order. If not given,
+        all of them are included.
+
+    Returns
+    -------
+    dict
+        Dictionary whose keys are attribute names and whose values are the
+        corresponding values.
+    """
+    if fields is None:
+        fields = POST_FIELDS
+    return {name: getattr(post, name) for name in fields}
+
+
+def format_datetime(date):
+    """Format an aware datetime as a UTC ISO 8601 string, e.g. 2010-09-08T07:06:05Z."""
+    return date.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def tidy_fields(fields):
+    """Check that fields are post attribute or property names."""
+    for name in fields:
+        if name not in POST_FIELDS:
+            raise ValueError(
+                f"expected field to be post attribute or property name, got {name}"
+            )
+    return list(fields)
+
+
+def dumps_posts(obj, fields=None):
+    """Serialize an object, which may be or contain posts, to a compact JSON string.
+
+    Gives the same JSON as ``json.dumps(obj, cls=PostEncoder)``, without
+    whitespace between items and with non-ASCII characters left unescaped. Uses
+    ``orjson`` if it is installed, which is several times faster.
+
+    Parameters
+    ----------
+    obj : Any
+        The object to serialize, e.g. a post or a dict of posts.
+    fields : List[str], optional
+        Names of the post attributes and properties to include, in order. If not
+        given, all of them are included.
+
+    Returns
+    -------
+    str
+        The serialized object.
+    """
+    fields = POST_FIELDS if fields is None else tidy_fields(fields)
+    if orjson is None:
+        return json.dumps(
+            obj,
+            cls=PostEncoder,
+            fields=fields,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    def default(o):
+        if isinstance(o, _post.Post):
+            return post_to_dict(o, fields)
+        if _utils.is_aware_datetime(o):
+            return format_datetime(o)
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    # Pass posts and datetimes to `default`, rather than using orjson's own formats
+    option = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME
+    return orjson.dumps(obj, default=default, option=option).decode("utf-8")
+
+
 def dict_to_post(post_dict):
     """Convert dictionary to obscraper.Post.
 
@@ -41,26 +138,43 @@ def dict_to_post(post_dict):
     ---------
     post_dict : dict
         A dictionary whose keys are obscraper.Post attribute names and
-        whose values valid obscraper.Post attribute values.
+        whose values valid obscraper.Post attribute values. Properties (e.g.
+        "url") are ignored, and missing attributes are set to None.
 
     Returns
     -------
     obscraper.Post
         The post object corresponding to the inputted dictionary.
     """
-    if "publish_date" not in post_dict.keys():
+    if "name" not in post_dict or not _POST_FIELD_SET.issuperset(post_dict):
         # not the object I'm looking for
         return post_dict
 
     # Don't pass properties to the Post constructor
-    for name in _utils.property_names(_post.Post):
-        post_dict.pop(name, None)
+    attributes = {name: post_dict.get(name) for name in _post.FIELDS}
 
     # Parse datetimes
-    post_dict["publish_date"] = dateutil.parser.isoparse(post_dict["publish_date"])
-    if post_dict["edit_date"] is not None:
-        post_dict["edit_date"] = dateutil.parser.isoparse(post_dict["edit_date"])
-    return _post.Post(**post_dict)
+    for name in _DATETIME_FIELDS:
+        if attributes[name] is not None:
+            attributes[name] = parse_datetime(attributes[name])
+    return _post.Post(**attributes)
+
+
+_POST_FIELD_SET = frozenset(POST_FIELDS)
+_DATETIME_FIELDS = ["publish_date", "edit_date"]
+
+
+def parse_datetime(text):
+    """Parse an ISO 8601 datetime, e.g. as formatted by `format_datetime`."""
+    if len(text) == 20 and text[-1] == "Z":
+        # Fast path for the format written by `format_datetime`
+        try:
+            date = datetime.datetime.fromisoformat(text[:-1])
+        except ValueError:
+            pass
+        else:
+            return date.replace(tzinfo=datetime.timezone.utc)
+    return dateutil.parser.isoparse(text)
 
 
 class PostDecoder(json.JSONDecoder):
@@ -72,3 +186,117 @@ class PostDecoder(json.JSONDecoder):
 
     def __init__(self):
         super().__init__(object_hook=dict_to_post)
+
+
+# Number of characters read from a file at once by `iter_posts`
+READ_SIZE = 1 << 16
+_WHITESPACE = " \t\n\r"
+
+
+def iter_posts(fileobj):
+    """Iterate over posts in a file, reading one record at a time.
+
+    Reads files written by the command line interface, either in the JSON format
+    (a list of records) or the JSON Lines format (one record per line). Each
+    record is an object with the URL of the post and the post (or null). Files
+    containing posts on their own (rather than records) can also be read.
+
+    Only one record is held in memory at a time (as well as a small read
+    buffer), so files can be much larger than the available memory.
+
+    Parameters
+    ----------
+    fileobj : TextIO | BinaryIO
+        A file object, open for reading. Binary files are decoded as UTF-8.
+
+    Yields
+    ------
+    Tuple[str, obscraper.Post | None]
+        Tuples whose first element is a post URL, and whose second element is
+        the corresponding post (or None if it could not be retrieved).
+
+    Raises
+    ------
+    json.JSONDecodeError
+        If the file is not valid JSON or JSON Lines.
+    """
+    decoder = PostDecoder()
+    reader = _BufferedReader(fileobj)
+    is_list = reader.peek() == "["
+    if is_list:
+        reader.advance()
+    while True:
+        char = reader.peek()
+        if char == "" or (is_list and char == "]"):
+            break
+        record = reader.decode(decoder)
+        if isinstance(record, _post.Post):
+            yield record.url, record
+        else:
+            yield record["url"], record["post"]
+        if is_list and reader.peek() == ",":
+            reader.advance()
+
+
+class _BufferedReader:
+    """Read JSON values from a file, one at a time."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.buffer = ""
+        self.index = 0
+        self.eof = False
+        self._decode = None
+
+    def peek(self):
+        """Get the next character which isn't whitespace (or "" at the end)."""
+        while True:
+            while self.index < len(self.buffer):
+                if self.buffer[self.index] not in _WHITESPACE:
+                    return self.buffer[self.index]
+                self.index += 1
+            if not self.read():
+                return ""
+
+    def advance(self):
+        """Skip the next character."""
+        self.index += 1
+
+    def decode(self, decoder):
+        """Decode the next JSON value, reading more of the file if needed."""
+        read_size = READ_SIZE
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.index)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A number may continue in the unread part of the file
+                if end < len(self.buffer) or self.eof:
+                    self.index = end
+                    return value
+            # The value may be incomplete
+            self.read(read_size)
+            # Read more each time, so large values aren't decoded many times
+            read_size *= 2
+
+    def read(self, size=READ_SIZE):
+        """Read more of the file into the buffer, returning False at the end."""
+        while True:
+            chunk = self.fileobj.read(size)
+            at_end = not chunk
+            if isinstance(chunk, bytes):
+                if self._decode is None:
+                    self._decode = codecs.getincrementaldecoder("utf-8")().decode
+                chunk = self._decode(chunk, final=at_end)
+            # (A few bytes may not be enough to decode a character)
+            if chunk or at_end:
+                break
+        if at_end:
+            self.eof = True
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.index :] + chunk
+        self.index = 0
+        return True
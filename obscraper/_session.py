@@ -0,0 +1,375 @@
+"""Long-lived sessions which reuse a single HTTP client and event loop.
+
+This interface is internal - implementation details may change.
+"""
+
+import atexit
+import concurrent.futures
+import os
+import threading
+
+import httpx
+import trio
+
+from obscraper import _download, _httpcache, _numbers, _ratelimit, _scrape, _tidy
+
+# Default timeout for requests (in seconds)
+# See https://www.python-httpx.org/advanced/#timeout-configuration
+DEFAULT_TIMEOUT = 20.0
+
+
+class Session:
+    """A reusable scraping session.
+
+    A session owns one pooled HTTP/2 client and a background thread running a trio
+    event loop. Requests made through the same session reuse warm connections, rather
+    than opening a new client (and performing new TLS handshakes) on every call.
+
+    Sessions are best used as context managers::
+
+        with obscraper.Session() as session:
+            posts = session.get_posts_by_names(names)
+            votes = session.get_vote_counts(numbers)
+
+    The module-level functions (e.g. ``obscraper.get_posts_by_names``) use a shared
+    default session, which is opened when first needed.
+
+    Parameters
+    ----------
+    timeout : float, optional
+        Timeout for each request (in seconds).
+    max_concurrency : int, optional
+        Maximum number of requests in flight at once, across all endpoints.
+    endpoint_concurrency : Dict[str, int], optional
+        Maximum number of requests in flight at once to each endpoint. Keys are
+        "post" (post pages), "vote" (the vote count API) and "comment" (the Disqus
+        comment count API). Endpoints which are not given use the default limits.
+    rate_limit : float | None, optional
+        Maximum sustained request rate (in requests per second) to each host. If None,
+        the rate is not limited.
+    burst : int, optional
+        Maximum number of requests which can be sent to a host at once, before the
+        rate limit applies.
+    cache_dir : str | os.PathLike, optional
+        Directory in which to cache post pages and the edit dates sitemap. Cached
+        responses are revalidated with conditional requests, so unchanged pages are
+        not downloaded again, even by a new process. The index of post numbers and
+        names (see :func:`obscraper.get_posts_by_numbers`) is also stored there.
+        If not given, responses are only cached in memory.
+    parse_executor : str | concurrent.futures.Executor, optional
+        Executor in which post pages are parsed, so that downloads continue while
+        pages are parsed on other cores. If "process", the session creates a
+        process pool with one worker per core, which is shut down when the session
+        is closed. If None, pages are parsed in the session's event loop thread.
+    lazy_posts : bool, optional
+        If True, the text HTML, word count and links of each post are extracted
+        when first accessed, rather than when the post is downloaded. This saves
+        time if these attributes are not needed. See
+        :meth:`obscraper.Post.from_content`.
+
+    Raises
+    ------
+    ValueError
+        If any of the concurrency or rate limits, or the parse executor, are not
+        valid.
+
+    Notes
+    -----
+    When a host responds with "429 Too Many Requests", all requests to that host are
+    paused until the ``Retry-After`` time (or a back-off delay) has passed.
+    """
+
+    def __init__(
+        self,
+        timeout=DEFAULT_TIMEOUT,
+        max_concurrency=_download.DEFAULT_MAX_CONCURRENCY,
+        endpoint_concurrency=None,
+        rate_limit=_ratelimit.DEFAULT_RATE_LIMIT,
+        burst=_ratelimit.DEFAULT_BURST,
+        cache_dir=None,
+        parse_executor=None,
+        lazy_posts=False,
+    ):
+        self.timeout = timeout
+        self.concurrency_limits = _download.make_concurrency_limits(
+            max_concurrency, endpoint_concurrency
+        )
+        # Check rate limits are valid before the event loop is started
+        _ratelimit.RateLimiter(rate_limit, burst)
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.http_cache = None if cache_dir is None else _httpcache.HTTPCache(cache_dir)
+        self.number_index = (
+            None
+            if cache_dir is None
+            else _numbers.NumberIndex(os.path.join(cache_dir, _numbers.INDEX_FILE_NAME))
+        )
+        if not (
+            parse_executor in (None, "process")
+            or isinstance(parse_executor, concurrent.futures.Executor)
+        ):
+            raise ValueError(
+                'expected parse_executor to be None, "process" or an Executor,'
+                f" got {parse_executor}"
+            )
+        self.parse_executor = parse_executor
+        self.lazy_posts = lazy_posts
+        self._executor = None
+        self._rate_limiter = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._trio_token = None
+        self._async_client = None
+        self._stop_event = None
+        self._nursery = None
+        self._error = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def is_open(self):
+        """bool : Whether the session's event loop is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def open(self):
+        """Start the background event loop and open the HTTP client.
+
+        Does nothing if the session is already open.
+        """
+        with self._lock:
+            if self.is_open:
+                return
+            if self.parse_executor == "process":
+                self._executor = concurrent.futures.ProcessPoolExecutor()
+            else:
+                self._executor = self.parse_executor
+            started = threading.Event()
+            self._error = None
+            self._thread = threading.Thread(
+                target=self._run_loop,
+                args=(started,),
+                name="obscraper-session",
+                daemon=True,
+            )
+            self._thread.start()
+            started.wait()
+            if self._error is not None:
+                error, self._error = self._error, None
+                self._thread.join()
+                if self.parse_executor == "process":
+                    self._executor.shutdown()
+                raise error
+
+    def close(self):
+        """Close the HTTP client and stop the background event loop.
+
+        Does nothing if the session is already closed.
+        """
+        with self._lock:
+            if not self.is_open:
+                return
+            trio.from_thread.run_sync(self._stop_event.set, trio_token=self._trio_token)
+            self._thread.join()
+            self._thread = None
+            self._trio_token = None
+            if self.number_index is not None:
+                self.number_index.flush()
+            if self.parse_executor == "process":
+                self._executor.shutdown()
+            self._executor = None
+
+    def run(self, async_fn, *args):
+        """Run an async function in the session's event loop.
+
+        The session's HTTP client is passed to `async_fn` as its first argument.
+
+        Parameters
+        ----------
+        async_fn : callable
+            An async function whose first argument is an ``httpx.AsyncClient``.
+        *args
+            Other positional arguments to pass to `async_fn`.
+
+        Returns
+        -------
+        Any
+            The return value of `async_fn`.
+        """
+        self.open()
+        return trio.from_thread.run(
+            async_fn, self._async_client, *args, trio_token=self._trio_token
+        )
+
+    def iterate(self, async_fn, *args):
+        """Iterate over items sent by an async function in the session's event loop.
+
+        `async_fn` is run in the background, and must send items to a memory
+        channel (closing it when done). The channel has no buffer, so `async_fn`
+        waits for each item to be consumed before sending the next one.
+
+        Parameters
+        ----------
+        async_fn : callable
+            An async function whose first argument is an ``httpx.AsyncClient`` and
+            whose last argument is a ``trio.MemorySendChannel``.
+        *args
+            Other positional arguments to pass to `async_fn`.
+
+        Yields
+        ------
+        Any
+            Items sent by `async_fn`.
+        """
+        self.open()
+        trio_token = self._trio_token
+        send_channel, receive_channel = trio.open_memory_channel(0)
+        cancel_scope = trio.CancelScope()
+        error = None
+
+        async def produce():
+            nonlocal error
+            with cancel_scope:
+                try:
+                    await async_fn(self._async_client, *args, send_channel)
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Raise in the consumer rather than crashing the event loop
+                    error = exc
+                finally:
+                    await send_channel.aclose()
+
+        trio.from_thread.run_sync(
+            self._nursery.start_soon, produce, trio_token=trio_token
+        )
+        try:
+            while True:
+                try:
+                    item = trio.from_thread.run(
+                        receive_channel.receive, trio_token=trio_token
+                    )
+                except trio.EndOfChannel:
+                    break
+                yield item
+        finally:
+            try:
+                trio.from_thread.run_sync(cancel_scope.cancel, trio_token=trio_token)
+            except trio.RunFinishedError:
+                pass
+        if error is not None:
+            raise error
+
+    def current_rate(self, host=None):
+        """Get the rate at which requests have recently been sent.
+
+        Parameters
+        ----------
+        host : str, optional
+            A host name, e.g. "www.overcomingbias.com". If not given, the total rate
+            across all hosts is returned.
+
+        Returns
+        -------
+        float
+            Number of requests per second, measured over the last few seconds.
+        """
+        self.open()
+        return trio.from_thread.run_sync(
+            self._rate_limiter.current_rate, host, trio_token=self._trio_token
+        )
+
+    def get_posts_by_names(self, names, fields=None):
+        """Get dict of posts identified by their names.
+
+        See :func:`obscraper.get_posts_by_names`.
+        """
+        return _scrape.get_posts_by_names(names, session=self, fields=fields)
+
+    def get_posts_by_numbers(self, numbers, fields=None):
+        """Get dict of posts identified by their numbers.
+
+        See :func:`obscraper.get_posts_by_numbers`.
+        """
+        return _scrape.get_posts_by_numbers(numbers, session=self, fields=fields)
+
+    def iter_posts_by_names(self, names, fields=None):
+        """Iterate over posts identified by their names, as they are fetched.
+
+        See :func:`obscraper.iter_posts_by_names`.
+        """
+        return _scrape.iter_posts_by_names(names, session=self, fields=fields)
+
+    def crawl_posts(self, names=None, fields=None):
+        """Iterate over posts, following links between posts to find more of them.
+
+        See :func:`obscraper.crawl_posts`.
+        """
+        return _scrape.crawl_posts(names, session=self, fields=fields)
+
+    def get_vote_counts(self, numbers_dict):
+        """Get vote counts for some posts.
+
+        See :func:`obscraper.get_vote_counts`.
+        """
+        return _scrape.get_vote_counts(numbers_dict, session=self)
+
+    def get_comment_counts(self, disqus_ids_dict):
+        """Get comment counts for some posts.
+
+        See :func:`obscraper.get_comment_counts`.
+        """
+        return _scrape.get_comment_counts(disqus_ids_dict, session=self)
+
+    def get_edit_dates(self):
+        """Get a dict of post edit dates.
+
+        See :func:`obscraper.get_edit_dates`.
+        """
+        return _scrape.get_edit_dates(session=self)
+
+    def _run_loop(self, started):
+        try:
+            trio.run(self._serve, started)
+        except BaseException as error:  # pylint: disable=broad-except
+            if not started.is_set():
+                self._error = error
+                started.set()
+            else:
+                raise
+
+    async def _serve(self, started):
+        async with httpx.AsyncClient(http2=True, timeout=self.timeout) as async_client:
+            _download.set_concurrency_limits(self.concurrency_limits)
+            self._rate_limiter = _ratelimit.RateLimiter(self.rate_limit, self.burst)
+            _ratelimit.set_rate_limiter(self._rate_limiter)
+            _httpcache.set_http_cache(self.http_cache)
+            _numbers.set_number_index(self.number_index)
+            _tidy.set_parse_executor(self._executor)
+            _tidy.set_lazy_posts(self.lazy_posts)
+            self._async_client = async_client
+            self._trio_token = trio.lowlevel.current_trio_token()
+            self._stop_event = trio.Event()
+            async with trio.open_nursery() as nursery:
+                # Runs background tasks, e.g. for `iterate`
+                self._nursery = nursery
+                started.set()
+                await self._stop_event.wait()
+                nursery.cancel_scope.cancel()
+        self._async_client = None
+
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+def get_default_session():
+    """Get the session used by the module-level functions."""
+    global _default_session  # pylint: disable=global-statement
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = Session()
+            atexit.register(_default_session.close)
+        return _default_session
@@ -0,0 +1,284 @@
+"""Store posts in an SQLite database, indexed for fast queries and updates.
+
+Each post's attributes are stored as JSON, alongside indexed columns for its
+number, author and dates. Tags and categories are stored in separate tables, so
+that posts with a given tag (or category) can be found without reading every post.
+
+This interface is internal - implementation details may change.
+"""
+
+import collections.abc
+import json
+import sqlite3
+
+from obscraper import _post, _serialize
+
+# File extensions which the command line interface writes to an SQLite store
+SQLITE_EXTENSIONS = (".sqlite", ".sqlite3", ".db")
+
+# Post attributes stored as JSON. Properties (e.g. the plaintext) are left out,
+# since they are computed from the attributes when the post is loaded.
+STORED_FIELDS = _post.FIELDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    name TEXT PRIMARY KEY,
+    number INTEGER,
+    author TEXT,
+    publish_date TEXT,
+    edit_date TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS posts_number ON posts (number);
+CREATE INDEX IF NOT EXISTS posts_author ON posts (author);
+CREATE INDEX IF NOT EXISTS posts_publish_date ON posts (publish_date);
+CREATE INDEX IF NOT EXISTS posts_edit_date ON posts (edit_date);
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (tag, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_name ON tags (name);
+CREATE TABLE IF NOT EXISTS categories (
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (category, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS categories_name ON categories (name);
+"""
+
+
+class SQLiteStore(collections.abc.MutableMapping):
+    """A store of posts in an SQLite database, which maps post names to posts.
+
+    Posts are indexed by name, number, author, publish date, edit date, tag and
+    category, so queries (see :meth:`SQLiteStore.find`) don't need to read every
+    post. Stores can be passed to :func:`obscraper.sync`, which reads the stored
+    edit dates from the index. They can also be written by the command line
+    interface, e.g. with ``--outfile posts.sqlite``.
+
+    Stores are best used as context managers::
+
+        with obscraper.SQLiteStore("posts.sqlite") as store:
+            store.update(obscraper.get_all_posts())
+            posts = store.find(author="Robin Hanson", tag="meta")
+
+    Parameters
+    ----------
+    path : str | os.PathLike
+        Path of the database file. It is created if it doesn't exist.
+
+    Notes
+    -----
+    Posts which could not be retrieved can be stored as None.
+    """
+
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
+
+    def __getitem__(self, name):
+        row = self._connection.execute(
+            "SELECT data FROM posts WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return _load_post(row[0])
+
+    def __setitem__(self, name, post):
+        self.update({name: post})
+
+    def __delitem__(self, name):
+        with self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM posts WHERE name = ?", (name,)
+            )
+            if cursor.rowcount == 0:
+                raise KeyError(name)
+            self._delete_tags([(name,)])
+
+    def __contains__(self, name):
+        return (
+            self._connection.execute(
+                "SELECT 1 FROM posts WHERE name = ?", (name,)
+            ).fetchone()
+            is not None
+        )
+
+    def __iter__(self):
+        """Iterate over post names, in alphabetical order."""
+        cursor = self._connection.execute("SELECT name FROM posts ORDER BY name")
+        return (name for (name,) in cursor)
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def update(self, other=(), /, **kwargs):
+        """Add or replace posts, in a single transaction.
+
+        Parameters
+        ----------
+        other : Mapping[str, obscraper.Post | None] | Iterable[Tuple], optional
+            Posts to store, keyed by name (or ``(name, post)`` pairs). Posts with
+            the same names as stored posts replace them.
+        **kwargs
+            More posts to store, keyed by name.
+        """
+        # If a name appears more than once, the last post is stored
+        items = dict(other, **kwargs).items()
+        rows = [_post_row(name, post) for name, post in items]
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO posts VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._delete_tags([(name,) for name, _ in items])
+            for table, attribute in [("tags", "tags"), ("categories", "categories")]:
+                self._connection.executemany(
+                    f"INSERT OR IGNORE INTO {table} VALUES (?, ?)",
+                    (
+                        (value, name)
+                        for name, post in items
+                        if post is not None
+                        for value in getattr(post, attribute) or []
+                    ),
+                )
+
+    def edit_dates(self):
+        """Get the edit dates of the stored posts.
+
+        Only the index is read, so this is much faster than reading every post.
+
+        Returns
+        -------
+        Dict[str, datetime.datetime | None]
+            Dictionary whose keys are post names and whose values are their edit
+            dates (or None if they are not known).
+        """
+        cursor = self._connection.execute("SELECT name, edit_date FROM posts")
+        return {
+            name: None if date is None else _serialize.parse_datetime(date)
+            for name, date in cursor
+        }
+
+    def get_by_number(self, number):
+        """Get a post by its number.
+
+        Parameters
+        ----------
+        number : int
+            A post number, e.g. 18402.
+
+        Returns
+        -------
+        obscraper.Post
+            The post with the given number.
+
+        Raises
+        ------
+        KeyError
+            If there is no post with the given number in the store.
+        """
+        row = self._connection.execute(
+            "SELECT data FROM posts WHERE number = ?", (number,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(number)
+        return _load_post(row[0])
+
+    def find(
+        self,
+        author=None,
+        tag=None,
+        category=None,
+        published_between=None,
+        edited_between=None,
+    ):
+        """Find the stored posts which match some conditions.
+
+        Only posts which match all of the given conditions are returned. Posts
+        which are None are never returned.
+
+        Parameters
+        ----------
+        author : str, optional
+            The post author, e.g. "Robin Hanson".
+        tag : str, optional
+            One of the post tags, e.g. "meta".
+        category : str, optional
+            One of the post categories, e.g. "meta".
+        published_between : Tuple[datetime.datetime, datetime.datetime], optional
+            Start and end of the range of publish dates. Both must be timezone
+            aware. The range includes the start date but not the end date.
+        edited_between : Tuple[datetime.datetime, datetime.datetime], optional
+            Start and end of the range of edit dates. Both must be timezone
+            aware. The range includes the start date but not the end date.
+
+        Returns
+        -------
+        Dict[str, obscraper.Post]
+            Dictionary whose keys are post names and whose values are the
+            matching posts, in order of publish date.
+        """
+        conditions = ["data IS NOT NULL"]
+        parameters = []
+        if author is not None:
+            conditions.append("author = ?")
+            parameters.append(author)
+        if tag is not None:
+            conditions.append("name IN (SELECT name FROM tags WHERE tag = ?)")
+            parameters.append(tag)
+        if category is not None:
+            conditions.append(
+                "name IN (SELECT name FROM categories WHERE category = ?)"
+            )
+            parameters.append(category)
+        for column, dates in [
+            ("publish_date", published_between),
+            ("edit_date", edited_between),
+        ]:
+            if dates is not None:
+                conditions.append(f"{column} >= ? AND {column} < ?")
+                parameters.extend(_serialize.format_datetime(date) for date in dates)
+        cursor = self._connection.execute(
+            f"SELECT name, data FROM posts WHERE {' AND '.join(conditions)}"
+            " ORDER BY publish_date, name",
+            parameters,
+        )
+        return {name: _load_post(data) for name, data in cursor}
+
+    def _delete_tags(self, names):
+        for table in ["tags", "categories"]:
+            self._connection.executemany(f"DELETE FROM {table} WHERE name = ?", names)
+
+
+def _post_row(name, post):
+    """Get the row of the posts table for a post."""
+    if post is None:
+        return (name, None, None, None, None, None)
+    return (
+        name,
+        post.number,
+        post.author,
+        _format_date_or_none(post.publish_date),
+        _format_date_or_none(post.edit_date),
+        _serialize.dumps_posts(post, fields=STORED_FIELDS),
+    )
+
+
+def _format_date_or_none(date):
+    return None if date is None else _serialize.format_datetime(date)
+
+
+def _load_post(data):
+    return None if data is None else json.loads(data, cls=_serialize.PostDecoder)
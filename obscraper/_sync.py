@@ -0,0 +1,105 @@
+"""Keep a local store of posts up to date with the overcomingbias site.
+
+This interface is internal - implementation details may change.
+"""
+
+import dataclasses
+from typing import List
+
+from obscraper import _scrape
+
+
+@dataclasses.dataclass
+class SyncReport:
+    """Summary of the changes made to a store by :func:`obscraper.sync`.
+
+    Attributes
+    ----------
+    added : List[str]
+        Names of posts which were new, and were added to the store.
+    updated : List[str]
+        Names of posts which had been edited since they were stored, and were
+        replaced in the store.
+    deleted : List[str]
+        Names of posts which are no longer listed on the site. These were removed
+        from the store, unless `delete=False` was passed.
+    failed : List[str]
+        Names of new or edited posts which could not be retrieved. These are left
+        unchanged in the store, so they are retried by the next sync.
+    """
+
+    added: List[str] = dataclasses.field(default_factory=list)
+    updated: List[str] = dataclasses.field(default_factory=list)
+    deleted: List[str] = dataclasses.field(default_factory=list)
+    failed: List[str] = dataclasses.field(default_factory=list)
+
+    @property
+    def changed(self):
+        """bool : Whether any posts were added, updated or deleted."""
+        return bool(self.added or self.updated or self.deleted)
+
+
+def sync(store, delete=True, session=None):
+    """Bring a local store of posts up to date.
+
+    The edit dates of stored posts are compared with the edit dates listed on the
+    site (see :func:`obscraper.get_edit_dates`), and only posts which are new or
+    have been edited since they were stored are downloaded. A refresh in which few
+    posts have changed therefore needs only a few requests.
+
+    Parameters
+    ----------
+    store : MutableMapping[str, obscraper.Post]
+        A mapping (e.g. a dict) from post names to posts, which is updated in
+        place. New and edited posts are written with a single call to its
+        ``update`` method (a single transaction for an
+        :class:`obscraper.SQLiteStore`). If it has an ``edit_dates()`` method
+        returning a dict of post names to edit dates, this is used instead of
+        reading every stored post.
+    delete : bool, optional
+        Whether to remove posts which are no longer listed on the site from the
+        store. Deleted posts are reported either way.
+    session : obscraper.Session, optional
+        The session used to make requests. If not given, a shared default session
+        is used.
+
+    Returns
+    -------
+    obscraper.SyncReport
+        The names of posts which were added, updated, deleted, or could not be
+        retrieved.
+    """
+    remote_dates = _scrape.get_edit_dates(session=session)
+    local_dates = stored_edit_dates(store)
+
+    report = SyncReport()
+    for name, edit_date in remote_dates.items():
+        if name not in local_dates:
+            report.added.append(name)
+        elif local_dates[name] is None or local_dates[name] < edit_date:
+            report.updated.append(name)
+    report.deleted = [name for name in local_dates if name not in remote_dates]
+
+    posts = _scrape.get_posts_by_names(report.added + report.updated, session=session)
+    report.failed = [name for name, post in posts.items() if post is None]
+    store.update({name: post for name, post in posts.items() if post is not None})
+    failed = set(report.failed)
+    report.added = [name for name in report.added if name not in failed]
+    report.updated = [name for name in report.updated if name not in failed]
+
+    if delete:
+        for name in report.deleted:
+            del store[name]
+    return report
+
+
+def stored_edit_dates(store):
+    """Get a dict of the edit dates of posts in a store."""
+    try:
+        edit_dates = store.edit_dates
+    except AttributeError:
+        return {
+            name: None if post is None else post.edit_date
+            for name, post in store.items()
+        }
+    return dict(edit_dates())
@@ -0,0 +1,409 @@
+"""Store many posts in columns, for fast analysis of the whole corpus.
+
+Requires NumPy (``pip install obscraper[table]``).
+
+This interface is internal - implementation details may change.
+"""
+
+import collections.abc
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# Fields stored as int64 arrays, with -1 for missing values
+INT_FIELDS = ["number", "word_count", "votes", "comments"]
+# Fields stored as datetime64 arrays (in UTC), with NaT for missing values
+DATETIME_FIELDS = ["publish_date", "edit_date"]
+# Fields stored as dictionary-encoded strings, with code -1 for missing values
+STRING_FIELDS = [
+    "name",
+    "page_type",
+    "page_status",
+    "page_format",
+    "title",
+    "author",
+    "disqus_id",
+]
+# Fields stored as dictionary-encoded lists of strings
+LIST_FIELDS = ["tags", "categories"]
+
+AGGREGATIONS = ["count", "sum", "mean", "min", "max"]
+
+MISSING_INT = -1
+_NAT = np.iinfo(np.int64).min if np is not None else None
+
+
+class PostTable:
+    """A table of posts, stored in columns.
+
+    Numbers, word counts, vote counts and comment counts are stored in integer
+    arrays (with -1 for missing values), and dates in ``datetime64`` arrays (with
+    NaT for missing values). Strings (e.g. authors) and lists of strings (tags and
+    categories) are dictionary-encoded, i.e. stored as arrays of integer codes.
+    This makes filtering, sorting and aggregating posts fast, even for the whole
+    corpus.
+
+    Tables are created with :meth:`PostTable.from_posts`, and refer to the posts
+    they were created from, so converting a table back to posts is cheap.
+
+    Requires NumPy (``pip install obscraper[table]``).
+
+    Examples
+    --------
+    Total votes for posts by each author, since 2020::
+
+        table = obscraper.PostTable.from_posts(posts)
+        recent = table.select(table.column("publish_date") >= np.datetime64("2020"))
+        votes = recent.group_by("author", "votes", "sum")
+    """
+
+    def __init__(self, posts, ints, dates, strings, lists):
+        self._posts = posts
+        self._ints = ints
+        self._dates = dates
+        self._strings = strings
+        self._lists = lists
+
+    @classmethod
+    def from_posts(cls, posts):
+        """Create a table from some posts.
+
+        Parameters
+        ----------
+        posts : Mapping[str, obscraper.Post | None] | Iterable[obscraper.Post | None]
+            A mapping whose values are posts (e.g. as returned by
+            :func:`obscraper.get_posts_by_names`), or an iterable of posts. Posts
+            which are None are left out.
+
+        Returns
+        -------
+        obscraper.PostTable
+            A table with one row per post.
+
+        Raises
+        ------
+        ImportError
+            If NumPy is not installed.
+        """
+        if np is None:
+            raise ImportError("PostTable requires NumPy: pip install obscraper[table]")
+        if isinstance(posts, collections.abc.Mapping):
+            posts = posts.values()
+        posts = [post for post in posts if post is not None]
+
+        ints = {
+            field: np.array(
+                [_int_or_missing(getattr(post, field)) for post in posts],
+                dtype=np.int64,
+            )
+            for field in INT_FIELDS
+        }
+        dates = {
+            field: np.array(
+                [_timestamp_or_nat(getattr(post, field)) for post in posts],
+                dtype=np.int64,
+            ).view("datetime64[s]")
+            for field in DATETIME_FIELDS
+        }
+        strings = {}
+        for field in STRING_FIELDS:
+            encoder = _Encoder()
+            codes = np.array(
+                [encoder.encode(getattr(post, field)) for post in posts],
+                dtype=np.int32,
+            )
+            strings[field] = (codes, encoder.values)
+        lists = {}
+        for field in LIST_FIELDS:
+            encoder = _Encoder()
+            lengths = []
+            codes = []
+            for post in posts:
+                values = getattr(post, field) or []
+                lengths.append(len(values))
+                codes.extend(encoder.encode(value) for value in values)
+            offsets = np.zeros(len(posts) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            lists[field] = (offsets, np.array(codes, dtype=np.int32), encoder.values)
+
+        post_array = np.empty(len(posts), dtype=object)
+        post_array[:] = posts
+        return cls(post_array, ints, dates, strings, lists)
+
+    def __len__(self):
+        return len(self._posts)
+
+    def __iter__(self):
+        return iter(self._posts)
+
+    def to_posts(self):
+        """Get the posts in the table, in order.
+
+        Returns
+        -------
+        List[obscraper.Post]
+            The posts the table was created from (not copies).
+        """
+        return self._posts.tolist()
+
+    def column(self, field):
+        """Get the values of a post attribute, for every post in the table.
+
+        Parameters
+        ----------
+        field : str
+            The name of a post attribute, e.g. "votes".
+
+        Returns
+        -------
+        numpy.ndarray | List[List[str]]
+            An int64 array for numbers and counts (with -1 for missing values), a
+            ``datetime64[s]`` array for dates (in UTC, with NaT for missing values),
+            an object array for strings (with None for missing values), or a list
+            of lists of strings for tags and categories.
+
+        Raises
+        ------
+        ValueError
+            If `field` is not a post attribute stored in the table.
+        """
+        if field in self._ints:
+            return self._ints[field]
+        if field in self._dates:
+            return self._dates[field]
+        if field in self._strings:
+            codes, values = self._strings[field]
+            lookup = np.array(values + [None], dtype=object)
+            return lookup[codes]
+        if field in self._lists:
+            offsets, codes, values = self._lists[field]
+            return [
+                [values[code] for code in codes[start:end]]
+                for start, end in zip(offsets[:-1], offsets[1:])
+            ]
+        raise ValueError(f"expected field to be stored in table, got {field}")
+
+    def match(self, field, value):
+        """Find the posts whose string attribute equals (or contains) a value.
+
+        Parameters
+        ----------
+        field : str
+            The name of a string attribute (e.g. "author"), or of "tags" or
+            "categories".
+        value : str
+            The value to look for. For tags and categories, posts match if the
+            value is one of their tags (or categories).
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean array which is True for matching posts, e.g. to pass to
+            `select`.
+
+        Raises
+        ------
+        ValueError
+            If `field` is not a string (or list of strings) attribute.
+        """
+        if field in self._strings:
+            codes, values = self._strings[field]
+            code = _find_code(values, value)
+            return codes == code
+        if field in self._lists:
+            offsets, codes, values = self._lists[field]
+            mask = np.zeros(len(self), dtype=bool)
+            positions = np.flatnonzero(codes == _find_code(values, value))
+            mask[np.searchsorted(offsets, positions, side="right") - 1] = True
+            return mask
+        raise ValueError(f"expected field to be string attribute, got {field}")
+
+    def select(self, rows):
+        """Get a table with some of the posts.
+
+        Parameters
+        ----------
+        rows : numpy.ndarray
+            Boolean array with one element per post (e.g. from `match`, or a
+            comparison with a `column`), or an array of row indices.
+
+        Returns
+        -------
+        obscraper.PostTable
+            A table with the selected posts, in the order given by `rows`.
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        elif rows.size == 0:
+            # An empty list gives a float array, which can't be used as indices
+            rows = rows.astype(np.int64)
+        ints = {field: array[rows] for field, array in self._ints.items()}
+        dates = {field: array[rows] for field, array in self._dates.items()}
+        strings = {
+            field: (codes[rows], values)
+            for field, (codes, values) in self._strings.items()
+        }
+        lists = {}
+        for field, (offsets, codes, values) in self._lists.items():
+            starts = offsets[rows]
+            lengths = offsets[rows + 1] - starts
+            new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=new_offsets[1:])
+            positions = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(
+                new_offsets[-1]
+            )
+            lists[field] = (new_offsets, codes[positions], values)
+        return PostTable(self._posts[rows], ints, dates, strings, lists)
+
+    def sort(self, field, descending=False):
+        """Get a table with the posts sorted by an attribute.
+
+        Posts with missing values are put last. The sort is stable, so posts
+        with equal values stay in the same order.
+
+        Parameters
+        ----------
+        field : str
+            The name of a number, count, date or string attribute.
+        descending : bool, optional
+            Whether to sort from largest to smallest.
+
+        Returns
+        -------
+        obscraper.PostTable
+            A table with the same posts, sorted.
+
+        Raises
+        ------
+        ValueError
+            If the posts can't be sorted by `field`.
+        """
+        if field in self._ints:
+            keys = self._ints[field]
+            missing = keys == MISSING_INT
+        elif field in self._dates:
+            keys = self._dates[field].view(np.int64)
+            missing = np.isnat(self._dates[field])
+        elif field in self._strings:
+            codes, values = self._strings[field]
+            # Rank of each value in sorted order
+            ranks = np.empty(len(values) + 1, dtype=np.int64)
+            ranks[np.argsort(np.array(values, dtype=object), kind="stable")] = (
+                np.arange(len(values))
+            )
+            ranks[-1] = -1
+            keys = ranks[codes]
+            missing = codes == -1
+        else:
+            raise ValueError(f"expected field to be sortable attribute, got {field}")
+        if descending:
+            keys = -keys
+        order = np.lexsort((keys, missing))
+        return self.select(order)
+
+    def group_by(self, field, value_field=None, func="count"):
+        """Aggregate a numerical attribute of the posts, grouped by a string attribute.
+
+        Parameters
+        ----------
+        field : str
+            The name of the attribute to group posts by, e.g. "author". If "tags"
+            or "categories", each post is counted in the group of each of its
+            tags (or categories).
+        value_field : str, optional
+            The name of the number or count attribute to aggregate, e.g. "votes".
+            Missing values are ignored. Not needed if `func` is "count".
+        func : str, optional
+            The aggregation: "count" (the number of posts), "sum", "mean", "min"
+            or "max".
+
+        Returns
+        -------
+        Dict[str, int | float]
+            Dictionary whose keys are the values of `field`, and whose values are
+            the aggregated values. Groups with no (non-missing) values are left
+            out.
+
+        Raises
+        ------
+        ValueError
+            If the arguments are not valid.
+        """
+        if func not in AGGREGATIONS:
+            raise ValueError(f"expected func to be one of {AGGREGATIONS}, got {func}")
+        if field in self._strings:
+            groups, names = self._strings[field]
+            rows = np.arange(len(self))
+        elif field in self._lists:
+            offsets, groups, names = self._lists[field]
+            rows = np.repeat(np.arange(len(self)), np.diff(offsets))
+        else:
+            raise ValueError(f"expected field to be string attribute, got {field}")
+
+        if func == "count" and value_field is None:
+            values = np.ones(len(rows), dtype=np.int64)
+        elif value_field in self._ints:
+            values = self._ints[value_field][rows]
+            present = values != MISSING_INT
+            groups, values = groups[present], values[present]
+        else:
+            raise ValueError(
+                "expected value_field to be number or count attribute,"
+                f" got {value_field}"
+            )
+        present = groups != -1
+        groups, values = groups[present], values[present]
+
+        counts = np.bincount(groups, minlength=len(names))
+        if func == "count":
+            result = counts
+        elif func in ["sum", "mean"]:
+            result = np.bincount(groups, weights=values, minlength=len(names))
+            if func == "sum":
+                result = result.astype(np.int64)
+            else:
+                result = result / np.maximum(counts, 1)
+        elif func == "min":
+            result = np.full(len(names), np.iinfo(np.int64).max)
+            np.minimum.at(result, groups, values)
+        else:
+            result = np.full(len(names), np.iinfo(np.int64).min)
+            np.maximum.at(result, groups, values)
+        return {names[code]: result[code].item() for code in np.flatnonzero(counts > 0)}
+
+
+class _Encoder:
+    """Assign integer codes to values, in order of first appearance."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def encode(self, value):
+        """Get the code for a value (-1 if it is None)."""
+        if value is None:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _find_code(values, value):
+    """Get the code of a value, or -2 (which matches nothing) if there isn't one."""
+    try:
+        return values.index(value)
+    except ValueError:
+        return -2
+
+
+def _int_or_missing(value):
+    return MISSING_INT if value is None else value
+
+
+def _timestamp_or_nat(date):
+    return _NAT if date is None else int(date.timestamp())
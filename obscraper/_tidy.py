@@ -1,21 +1,34 @@
 """Produce a tidy object (or None) from a raw HTTP response."""
 
 import json
+import logging
 import re
 
 import bs4
 import dateutil.parser
+import trio
 
-from obscraper import _exceptions, _extract_post, _post
+from obscraper import _exceptions, _extract_post, _numbers, _parse_post, _post
 
+logger = logging.getLogger(__name__)
 
-def tidy_post(response):
+_parse_executor = trio.lowlevel.RunVar("parse_executor", default=None)
+_lazy_posts = trio.lowlevel.RunVar("lazy_posts", default=False)
+
+
+def tidy_post(response, lazy=False, skip_content=False):
     """Tidy raw response from a post page.
 
     Parameters
     ----------
     response : httpx.Response
         Raw response from a post page.
+    lazy : bool, optional
+        If True, the post's text HTML, word count and links are extracted when
+        first accessed (see ``obscraper.Post.from_content``).
+    skip_content : bool, optional
+        If True, the post's text HTML, word count and links are not extracted, and
+        are None instead.
 
     Returns
     -------
@@ -30,36 +43,123 @@ def tidy_post(response):
         If an obscraper.Post attribute could not be extracted from the
         response text.
     """
-    raw_html = bs4.BeautifulSoup(response.text, "lxml")
-    assert _extract_post.is_ob_post_html(raw_html), "HTML is not overcomingbias post."
+    return make_post(_parse_post.parse_post(response.text, lazy, skip_content))
+
+
+def make_post(attributes):
+    """Make a post from the attributes returned by `_parse_post.parse_post`.
 
-    new_post = _post.Post(
-        # URL and title
-        name=_extract_post.extract_name(raw_html),
-        # Metadata
-        number=_extract_post.extract_number(raw_html),
-        page_type=_extract_post.extract_page_type(raw_html),
-        page_status=_extract_post.extract_page_status(raw_html),
-        page_format=_extract_post.extract_page_format(raw_html),
-        # Tags and categories
-        tags=_extract_post.extract_tags(raw_html),
-        categories=_extract_post.extract_categories(raw_html),
-        # Title, author, date
-        title=_extract_post.extract_title(raw_html),
-        author=_extract_post.extract_author(raw_html),
-        publish_date=_extract_post.extract_publish_date(raw_html),
-        # Word count and links
-        text_html=_extract_post.extract_text_html(raw_html),
-        word_count=_extract_post.extract_word_count(raw_html),
-        internal_links=_extract_post.extract_internal_links(raw_html),
-        external_links=_extract_post.extract_external_links(raw_html),
-        # Disqus ID string
-        disqus_id=_extract_post.extract_disqus_id(raw_html),
+    The post's number and name are added to the number index (see
+    `_numbers.get_number_index`).
+    """
+    if attributes.get("number") is not None and attributes.get("name") is not None:
+        _numbers.get_number_index().add(attributes["number"], attributes["name"])
+    if "content" in attributes:
+        return _post.Post.from_content(**attributes)
+    plaintext = attributes.pop("plaintext", None)
+    post = _post.Post(**attributes)
+    if plaintext is not None:
+        post._cache_plaintext(plaintext)  # pylint: disable=protected-access
+    return post
+
+
+async def async_tidy_post(response, skip_content=False):
+    """Tidy raw response from a post page, parsing it in the parse executor.
+
+    The response body is sent to the executor set by `set_parse_executor`, which
+    returns the post attributes, so the event loop is free to handle other requests
+    while the page is parsed. If no executor has been set, the page is parsed in
+    the event loop thread. Posts are lazy if set by `set_lazy_posts`.
+
+    See `tidy_post` for the parameters, return value and exceptions.
+    """
+    executor = get_parse_executor()
+    lazy = _lazy_posts.get()
+    if executor is None:
+        return tidy_post(response, lazy, skip_content)
+    attributes = await run_in_executor(
+        executor,
+        _parse_post.parse_post_bytes,
+        response.content,
+        response.encoding,
+        lazy,
+        skip_content,
     )
-    return new_post
+    return make_post(attributes)
+
+
+def set_lazy_posts(lazy):
+    """Set whether posts tidied in the current trio run are lazy (see `tidy_post`)."""
+    _lazy_posts.set(lazy)
+
+
+def set_parse_executor(executor):
+    """Set the executor used to parse post pages in the current trio run.
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor | None
+        The executor. If None, post pages are parsed in the event loop thread.
+    """
+    _parse_executor.set(executor)
+
+
+def get_parse_executor():
+    """Get the executor used to parse post pages, or None if there isn't one."""
+    return _parse_executor.get()
+
+
+async def run_in_executor(executor, func, *args):
+    """Run a function in an executor, and wait for its result without blocking."""
+    trio_token = trio.lowlevel.current_trio_token()
+    done = trio.Event()
+
+    def wake(_):
+        try:
+            trio_token.run_sync_soon(done.set)
+        except trio.RunFinishedError:
+            pass
+
+    future = executor.submit(func, *args)
+    future.add_done_callback(wake)
+    try:
+        await done.wait()
+    except trio.Cancelled:
+        future.cancel()
+        raise
+    return future.result()
+
 
+def tidy_post_redirect(response):
+    """Get the name of a post from the redirect response of its short URL.
 
-def tidy_vote_count(response):
+    Parameters
+    ----------
+    response : httpx.Response
+        Raw (redirect) response from a short post URL, e.g.
+        https://www.overcomingbias.com/?p=18402.
+
+    Returns
+    -------
+    str
+        The name of the post which the response redirects to.
+
+    Raises
+    ------
+    obscraper.InvalidResponseError
+        If the response does not redirect to an overcomingbias post.
+    """
+    if not response.is_redirect:
+        raise _exceptions.InvalidResponseError("Short URL did not redirect.")
+    try:
+        return _extract_post.url_to_name(response.headers["location"])
+    except ValueError as err:
+        raise _exceptions.InvalidResponseError(
+            "Short URL did not redirect to a post."
+        ) from err
+
+
+def tidy_vote_counts(response, numbers):
     """Tidy raw response from the vote count API.
 
     Note that an exception is *not* raised if the response does not
@@ -67,20 +167,69 @@ def tidy_vote_count(response):
     returns 0 (rather than an error message) for posts that do not
     exist.
 
+    Items are matched to post numbers by their IDs. If any item has no
+    usable ID, items are assumed to be in the order they were requested.
+
     Parameters
     ----------
     response : httpx.Response
         Raw response from the vote count API.
+    numbers : List[int]
+        The post numbers whose vote counts were requested, in the order
+        they were requested.
 
     Returns
     -------
-    int
-        The vote count stated in the response.
+    Dict[int, int]
+        Dictionary whose keys are post numbers and whose values are the
+        vote counts stated in the response. Posts whose vote counts are
+        missing from the response, or can't be read, are logged and left
+        out, so an error is raised for each of them (rather than the whole
+        batch) when they are requested (see `_assemble.assemble_vote_count`).
+
+    Raises
+    ------
+    obscraper.InvalidResponseError
+        If the items have no usable IDs, and there isn't one item per post
+        number.
     """
     assert response.text != "-1", "Invalid Vote Auth Code."
 
-    raw_json = json.loads(response.text)
-    html_soup = bs4.BeautifulSoup(raw_json["items"][0]["html"], "lxml")
+    items = json.loads(response.text)["items"]
+    item_numbers = [vote_item_number(item) for item in items]
+    if None in item_numbers or not set(item_numbers).issubset(numbers):
+        if len(items) != len(numbers):
+            raise _exceptions.InvalidResponseError(
+                f"Expected {len(numbers)} vote counts, got {len(items)}."
+            )
+        # Items are returned in the order they were requested
+        item_numbers = numbers
+
+    counts = {}
+    for number, item in zip(item_numbers, items):
+        try:
+            counts[number] = extract_vote_count(item["html"])
+        except (KeyError, TypeError, AttributeError):
+            logger.warning("Could not read vote count of post %s: %r", number, item)
+    missing = [number for number in numbers if number not in counts]
+    if missing:
+        logger.warning("No vote counts found for posts %s", missing)
+    return counts
+
+
+def vote_item_number(item):
+    """Get the post number from the ID of a vote count API item, or None."""
+    try:
+        # IDs may be prefixed with the rating type, e.g. "atr.18402"
+        match = re.search(r"(\d+)$", str(item["id"]))
+    except (KeyError, TypeError):
+        return None
+    return None if match is None else int(match.group(1))
+
+
+def extract_vote_count(item_html):
+    """Extract the vote count from a vote count API item."""
+    html_soup = bs4.BeautifulSoup(item_html, "lxml")
 
     pattern = r"(Rating:\s*\+?)(\d+)(\s*vote)"
     match = re.search(pattern, html_soup.text).group(2)
@@ -89,33 +238,29 @@ def tidy_vote_count(response):
     return votes
 
 
-def tidy_comment_count(response):
+def tidy_comment_counts(response, disqus_ids):
     """Tidy raw response from the comment count API.
 
     Parameters
     ----------
     response : httpx.Response
         Raw response from the comment count API.
+    disqus_ids : List[str]
+        The Disqus IDs whose comment counts were requested.
 
     Returns
     -------
-    int
-        The comment count stated in the response.
-
-    Raises
-    ------
-    obscraper.InvalidResponseError
-        If no comment count is found in the response.
+    Dict[str, int | None]
+        Dictionary whose keys are the Disqus IDs and whose values are the
+        comment counts stated in the response. The comment count is None
+        if it is not found in the response.
     """
     pattern = r"(?<=displayCount\()(.*)(?=\))"
     match = re.search(pattern, response.text).group()
     raw_json = json.loads(match)
 
-    if raw_json["counts"] == []:
-        raise _exceptions.InvalidResponseError("Comment count not found.")
-
-    comments = raw_json["counts"][0]["comments"]
-    return comments
+    counts = {count["id"]: count["comments"] for count in raw_json["counts"]}
+    return {disqus_id: counts.get(disqus_id) for disqus_id in disqus_ids}
 
 
 def tidy_edit_dates(response):
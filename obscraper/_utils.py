@@ -25,14 +25,16 @@ def count_words(text, ignore=None):
     """Count the number of words in a string, ignoring some."""
     if ignore is None:
         ignore = []
-    text_without_punctuation = re.sub(r"[^a-zA-Z0-9\s]+", "", text)
-    text_without_special_chars = re.sub(r"\s+", " ", text_without_punctuation)
-    words = len(
-        [word for word in str.split(text_without_special_chars) if word not in ignore]
-    )
+    words = len([word for word in split_words(text) if word not in ignore])
     return words
 
 
+def split_words(text):
+    """Split a string into words, removing punctuation."""
+    text_without_punctuation = re.sub(r"[^a-zA-Z0-9\s]+", "", text)
+    return text_without_punctuation.split()
+
+
 def is_aware_datetime(date):
     """Test if an object is an "aware" datetime.datetime object."""
     if not isinstance(date, datetime.datetime):
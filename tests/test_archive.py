@@ -0,0 +1,103 @@
+import dataclasses
+import pathlib
+from unittest.mock import Mock, patch
+
+import httpx
+import pytest
+
+from obscraper import __main__, _archive, _tidy
+
+POST_PAGE = pathlib.Path(__file__).parent / "post_page.html"
+
+
+@pytest.fixture(scope="module")
+def posts():
+    post = _tidy.tidy_post(httpx.Response(200, content=POST_PAGE.read_bytes()))
+    return {
+        f"2010/09/post-{i}": dataclasses.replace(
+            post, name=f"2010/09/post-{i}", number=20000 + i, votes=i
+        )
+        for i in range(100)
+    }
+
+
+@pytest.fixture
+def archive_path(tmp_path, posts):
+    path = tmp_path / "posts.obarchive"
+    with _archive.ArchiveWriter(path) as writer:
+        for name, post in posts.items():
+            writer.add(name, post)
+        writer.add("2010/09/missing", None)
+    return path
+
+
+def test_archive_returns_posts_by_name(archive_path, posts):
+    with _archive.Archive(archive_path) as archive:
+        assert len(archive) == 101
+        assert archive["2010/09/post-42"] == posts["2010/09/post-42"]
+        assert archive["2010/09/missing"] is None
+        assert "2010/09/post-99" in archive
+        assert "2010/09/post-100" not in archive
+        with pytest.raises(KeyError):
+            archive["2010/09/post-100"]
+
+
+def test_archive_returns_posts_by_number(archive_path, posts):
+    with _archive.Archive(archive_path) as archive:
+        assert archive.get_by_number(20007) == posts["2010/09/post-7"]
+        with pytest.raises(KeyError):
+            archive.get_by_number(12345)
+
+
+def test_archive_iterates_in_order_added(archive_path, posts):
+    with _archive.Archive(archive_path) as archive:
+        assert list(archive) == list(posts) + ["2010/09/missing"]
+        assert dict(archive.items()) == {**posts, "2010/09/missing": None}
+
+
+def test_later_posts_replace_earlier_posts(tmp_path, posts):
+    path = tmp_path / "posts.obarchive"
+    first, second = posts["2010/09/post-1"], posts["2010/09/post-2"]
+    with _archive.ArchiveWriter(path) as writer:
+        writer.add("2010/09/post-1", first)
+        writer.add("2010/09/post-2", second)
+        writer.add("2010/09/post-1", None)
+    with _archive.Archive(path) as archive:
+        assert list(archive) == ["2010/09/post-2", "2010/09/post-1"]
+        assert archive["2010/09/post-1"] is None
+        with pytest.raises(KeyError):
+            archive.get_by_number(first.number)
+
+
+def test_empty_archive_can_be_read(tmp_path):
+    path = tmp_path / "posts.obarchive"
+    _archive.ArchiveWriter(path).close()
+    with _archive.Archive(path) as archive:
+        assert len(archive) == 0
+        assert list(archive) == []
+        assert "2010/09/post-1" not in archive
+
+
+def test_invalid_archive_raises_value_error(tmp_path, archive_path):
+    for content in [b"", b"not an archive", archive_path.read_bytes()[:-10]]:
+        path = tmp_path / "invalid.obarchive"
+        path.write_bytes(content)
+        with pytest.raises(ValueError):
+            _archive.Archive(path)
+
+
+def test_main_writes_archive(tmp_path, posts):
+    outfile = tmp_path / "posts.obarchive"
+    names = list(posts)[:3]
+
+    def iter_posts_by_names(names, session=None, fields=None):
+        return ((name, posts[name]) for name in names)
+
+    with patch("obscraper._scrape.iter_posts_by_names", iter_posts_by_names), patch(
+        "obscraper._scrape.get_edit_dates", Mock(return_value=dict.fromkeys(names))
+    ):
+        with pytest.raises(SystemExit) as sysexit:
+            __main__.main(["-a", "-o", str(outfile), "--format", "archive"])
+    assert sysexit.value.code == 0
+    with _archive.Archive(outfile) as archive:
+        assert dict(archive) == {name: posts[name] for name in names}
@@ -1,9 +1,361 @@
+import json
+import pathlib
 import re
+from unittest.mock import AsyncMock, Mock, patch
 
-from obscraper import _assemble
+import httpx
+import pytest
+import trio
+
+from obscraper import _assemble, _download, _exceptions, _scrape, _tidy
 
 
 async def test_extract_auth_code_returns_result_in_correct_format(async_http_client):
     vote_auth = await _assemble.assemble_vote_auth(async_http_client)
     assert isinstance(vote_auth, str)
     assert re.search(r"^[a-z0-9]{10}$", vote_auth) is not None
+
+
+def fake_vote_response(numbers):
+    """Fake vote count API response, where each post has (number % 100) votes."""
+    items = [
+        {"id": number, "html": f"<span>Rating: +{number % 100} votes</span>"}
+        for number in numbers
+    ]
+    return Mock(text=json.dumps({"items": items}))
+
+
+@pytest.fixture
+def mock_download_vote_counts():
+    async def download_vote_counts(async_client, numbers, vote_auth):
+        return fake_vote_response(numbers)
+
+    mock = AsyncMock(side_effect=download_vote_counts)
+    with patch("obscraper._assemble.assemble_vote_auth", AsyncMock(return_value="")):
+        with patch("obscraper._download.download_vote_counts", mock):
+            yield mock
+    _assemble.assemble_vote_count.cache_clear()
+
+
+async def test_batcher_combines_concurrent_requests(autojump_clock):
+    assemble_batch = AsyncMock(side_effect=lambda c, items: {i: 2 * i for i in items})
+    batcher = _assemble._Batcher(assemble_batch, max_size=100)
+    results = {}
+
+    async def submit(item):
+        results[item] = await batcher.submit("Client", item)
+
+    async with trio.open_nursery() as nursery:
+        for item in range(250):
+            nursery.start_soon(submit, item)
+    assert results == {i: 2 * i for i in range(250)}
+    assert assemble_batch.call_count == 3
+
+
+async def test_batcher_raises_error_in_all_callers(autojump_clock):
+    assemble_batch = AsyncMock(side_effect=_exceptions.InvalidResponseError)
+    batcher = _assemble._Batcher(assemble_batch, max_size=100)
+    errors = []
+
+    async def submit(item):
+        try:
+            await batcher.submit("Client", item)
+        except _exceptions.InvalidResponseError as error:
+            errors.append(error)
+
+    async with trio.open_nursery() as nursery:
+        for item in range(10):
+            nursery.start_soon(submit, item)
+    assert len(errors) == 10
+    assert assemble_batch.call_count == 1
+
+
+async def test_assemble_vote_counts_uses_batches(
+    mock_download_vote_counts, autojump_clock
+):
+    numbers = list(range(10000, 10000 + 2 * _download.VOTE_BATCH_SIZE + 1))
+    votes = await _assemble.assemble_vote_counts("Client", numbers)
+    assert votes == {number: number % 100 for number in numbers}
+    assert mock_download_vote_counts.call_count == 3
+
+
+async def test_assemble_vote_counts_fills_vote_count_cache(
+    mock_download_vote_counts, autojump_clock
+):
+    await _assemble.assemble_vote_counts("Client", [12345, 23456])
+    assert await _assemble.assemble_vote_count("Client", 23456) == 56
+    assert mock_download_vote_counts.call_count == 1
+
+    # Only uncached numbers are downloaded
+    await _assemble.assemble_vote_counts("Client", [12345, 34567])
+    assert mock_download_vote_counts.call_args.args[1] == [34567]
+
+
+async def test_concurrent_vote_counts_are_batched(
+    mock_download_vote_counts, autojump_clock
+):
+    results = {}
+
+    async def assemble(number):
+        results[number] = await _assemble.assemble_vote_count("Client", number)
+
+    async with trio.open_nursery() as nursery:
+        for number in range(20000, 20050):
+            nursery.start_soon(assemble, number)
+    assert results == {number: number % 100 for number in range(20000, 20050)}
+    assert mock_download_vote_counts.call_count == 1
+
+
+VOTE_RESPONSE = pathlib.Path(__file__).parent / "vote_response.json"
+
+
+def test_tidy_vote_counts_reads_vote_api_response():
+    response = Mock(text=VOTE_RESPONSE.read_text())
+    assert _tidy.tidy_vote_counts(response, [18115, 18402]) == {18402: 12, 18115: 0}
+
+
+def test_tidy_vote_counts_matches_counts_by_id():
+    response = fake_vote_response([23456, 12345])
+    assert _tidy.tidy_vote_counts(response, [12345, 23456]) == {12345: 45, 23456: 56}
+    items = [{"id": f"atr.{n}", "html": f"Rating: +{n % 100} votes"} for n in [1, 2]]
+    response = Mock(text=json.dumps({"items": items}))
+    assert _tidy.tidy_vote_counts(response, [2, 1]) == {1: 1, 2: 2}
+
+
+def test_tidy_vote_counts_uses_request_order_without_ids():
+    items = [{"html": f"Rating: +{votes} votes"} for votes in [3, 4]]
+    response = Mock(text=json.dumps({"items": items}))
+    assert _tidy.tidy_vote_counts(response, [12345, 23456]) == {12345: 3, 23456: 4}
+    with pytest.raises(_exceptions.InvalidResponseError):
+        _tidy.tidy_vote_counts(response, [12345, 23456, 34567])
+
+
+def test_tidy_vote_counts_leaves_out_missing_or_bad_counts(logs):
+    items = [
+        {"id": 12345, "html": "<span>Rating: +45 votes</span>"},
+        {"id": 23456, "html": "<span>Unexpected</span>"},
+    ]
+    response = Mock(text=json.dumps({"items": items}))
+    counts = _tidy.tidy_vote_counts(response, [12345, 23456, 34567])
+    assert counts == {12345: 45}
+    assert "Could not read vote count of post 23456" in logs.getvalue()
+    assert "No vote counts found for posts [23456, 34567]" in logs.getvalue()
+
+
+async def test_missing_vote_count_only_fails_its_own_post(
+    mock_download_vote_counts, autojump_clock
+):
+    def download_vote_counts(async_client, numbers, vote_auth):
+        return fake_vote_response([n for n in numbers if n != 23456])
+
+    mock_download_vote_counts.side_effect = download_vote_counts
+    results = {}
+
+    async def get_vote_count(number):
+        try:
+            results[number] = await _assemble.assemble_vote_count("Client", number)
+        except _exceptions.InvalidResponseError:
+            results[number] = "error"
+
+    async with trio.open_nursery() as nursery:
+        for number in [12345, 23456, 34567]:
+            nursery.start_soon(get_vote_count, number)
+    assert results == {12345: 45, 23456: "error", 34567: 67}
+
+
+def fake_comment_response(disqus_ids):
+    """Fake comment count API response, where IDs ending in "0" are not found."""
+    counts = [
+        {"id": disqus_id, "comments": int(disqus_id[:5]) % 100}
+        for disqus_id in disqus_ids
+        if not disqus_id.endswith("0")
+    ]
+    payload = json.dumps({"text": {}, "counts": counts})
+    return Mock(text=f"var DISQUSWIDGETS;DISQUSWIDGETS.displayCount({payload});")
+
+
+def fake_disqus_id(number):
+    return f"{number} http://www.overcomingbias.com/?p={number}"
+
+
+@pytest.fixture
+def mock_download_comment_counts():
+    async def download_comment_counts(async_client, disqus_ids):
+        return fake_comment_response(disqus_ids)
+
+    mock = AsyncMock(side_effect=download_comment_counts)
+    with patch("obscraper._download.download_comment_counts", mock):
+        yield mock
+    _assemble.assemble_comment_count.cache_clear()
+
+
+async def test_concurrent_comment_counts_are_batched(
+    mock_download_comment_counts, autojump_clock
+):
+    results = {}
+
+    async def assemble(disqus_id):
+        results[disqus_id] = await _assemble.assemble_comment_count("Client", disqus_id)
+
+    numbers = range(30000, 30000 + _download.COMMENT_BATCH_SIZE + 1)
+    async with trio.open_nursery() as nursery:
+        for number in numbers:
+            nursery.start_soon(assemble, fake_disqus_id(number))
+        nursery.start_soon(assemble, None)
+    assert results.pop(None) is None
+    assert results == {
+        fake_disqus_id(n): None if n % 10 == 0 else n % 100 for n in numbers
+    }
+    assert mock_download_comment_counts.call_count == 2
+
+
+async def test_assemble_comment_counts_fills_comment_count_cache(
+    mock_download_comment_counts, autojump_clock
+):
+    disqus_ids = [fake_disqus_id(12345), fake_disqus_id(12340), None]
+    comments = await _assemble.assemble_comment_counts("Client", disqus_ids)
+    assert comments == {disqus_ids[0]: 45, disqus_ids[1]: None}
+    assert await _assemble.assemble_comment_count("Client", disqus_ids[1]) is None
+    assert mock_download_comment_counts.call_count == 1
+
+
+def test_tidy_comment_counts_returns_none_for_missing_ids():
+    disqus_ids = [fake_disqus_id(12345), fake_disqus_id(12340)]
+    response = fake_comment_response(disqus_ids)
+    counts = _tidy.tidy_comment_counts(response, disqus_ids)
+    assert counts == {disqus_ids[0]: 45, disqus_ids[1]: None}
+
+
+@pytest.fixture
+def mock_post_requests():
+    """Mock downloads of the example post page, and its votes, comments and dates."""
+    page = (pathlib.Path(__file__).parent / "post_page.html").read_bytes()
+    mocks = {
+        "download_post": AsyncMock(return_value=httpx.Response(200, content=page)),
+        "assemble_vote_count": AsyncMock(return_value=10),
+        "assemble_comment_count": AsyncMock(return_value=5),
+        "assemble_edit_dates": AsyncMock(return_value={"2006/11/introduction": None}),
+    }
+    with patch("obscraper._download.download_post", mocks["download_post"]):
+        with patch.multiple(
+            "obscraper._assemble",
+            assemble_vote_count=mocks["assemble_vote_count"],
+            assemble_comment_count=mocks["assemble_comment_count"],
+            assemble_edit_dates=mocks["assemble_edit_dates"],
+        ):
+            yield mocks
+    _assemble.assemble_post.cache_clear()
+    _assemble.post_failures.clear()
+
+
+async def test_assemble_post_only_gets_requested_fields(mock_post_requests):
+    post = await _assemble.assemble_post("Client", "2006/11/introduction", ("title",))
+    assert post.name == "2006/11/introduction"
+    assert post.title == "How To Join & Contribute"
+    assert post.number is None
+    assert post.text_html is None
+    assert post.plaintext is None
+    assert post.votes is None
+    assert mock_post_requests["assemble_vote_count"].call_count == 0
+    assert mock_post_requests["assemble_comment_count"].call_count == 0
+    assert mock_post_requests["assemble_edit_dates"].call_count == 0
+
+
+async def test_assemble_post_only_makes_requests_for_requested_fields(
+    mock_post_requests,
+):
+    post = await _assemble.assemble_post(
+        "Client", "2006/11/introduction", ("votes", "word_count")
+    )
+    assert post.votes == 10
+    assert post.word_count > 0
+    assert post.comments is None
+    assert post.text_html is None
+    assert mock_post_requests["assemble_vote_count"].call_count == 1
+    assert mock_post_requests["assemble_comment_count"].call_count == 0
+
+
+async def test_assemble_post_caches_projections_separately(mock_post_requests):
+    name = "2006/11/introduction"
+    partial_post = await _assemble.assemble_post("Client", name, ("title",))
+    full_post = await _assemble.assemble_post("Client", name)
+    assert full_post.text_html is not None
+    assert full_post.votes == 10
+    assert partial_post.text_html is None
+    assert await _assemble.assemble_post("Client", name, ("title",)) is partial_post
+    assert mock_post_requests["download_post"].call_count == 2
+
+
+def status_error(status_code):
+    """An error like the one raised by `_download.async_retry` for a status code."""
+    request = httpx.Request("GET", "https://www.overcomingbias.com/")
+    response = httpx.Response(status_code, request=request)
+    try:
+        response.raise_for_status()
+    except httpx.HTTPStatusError as err:
+        try:
+            raise _exceptions.InvalidResponseError("Invalid response.") from err
+        except _exceptions.InvalidResponseError as error:
+            return error
+
+
+async def test_assemble_post_does_not_request_failed_posts_again(
+    mock_post_requests,
+):
+    name = "2006/11/introduction"
+    mock_post_requests["download_post"].side_effect = status_error(404)
+    for fields in [None, ("title",)]:
+        with pytest.raises(_exceptions.InvalidResponseError):
+            await _assemble.assemble_post("Client", name, fields)
+    assert mock_post_requests["download_post"].call_count == 1
+    failures = _scrape.get_failed_posts()
+    assert list(failures) == [name]
+    assert failures[name].kind == "not_found"
+    assert failures[name].failed_at.tzinfo is not None
+
+    _assemble.post_failures.clear()
+    _assemble.assemble_post.cache_clear()
+    assert _scrape.get_failed_posts() == {}
+    mock_post_requests["download_post"].side_effect = None
+    post = await _assemble.assemble_post("Client", name)
+    assert post.name == name
+
+
+async def test_assemble_post_requests_posts_again_after_temporary_errors(
+    mock_post_requests,
+):
+    name = "2006/11/introduction"
+    mock_post_requests["download_post"].side_effect = status_error(503)
+    with pytest.raises(_exceptions.InvalidResponseError):
+        await _assemble.assemble_post("Client", name)
+    assert _scrape.get_failed_posts() == {}
+    mock_post_requests["download_post"].side_effect = None
+    post = await _assemble.assemble_post("Client", name)
+    assert post.name == name
+    assert mock_post_requests["download_post"].call_count == 2
+
+
+def test_failures_expire_after_ttl():
+    now = 0
+    failures = _assemble._FailureCache(maxsize=10, ttl=60, timer=lambda: now)
+    failures.record("2006/11/introduction", _exceptions.AttributeNotFoundError())
+    failure = failures.get("2006/11/introduction")
+    assert failure.kind == "attribute_not_found"
+    assert isinstance(failure.exception(), _exceptions.AttributeNotFoundError)
+    now = 61
+    assert failures.get("2006/11/introduction") is None
+    assert failures.items() == {}
+
+
+@pytest.mark.parametrize(
+    "error, kind",
+    [
+        (status_error(410), "not_found"),
+        (status_error(500), None),
+        (status_error(503), None),
+        (status_error(429), None),
+        (_exceptions.InvalidResponseError("Not a post."), "invalid_response"),
+    ],
+)
+def test_failure_kind(error, kind):
+    assert _assemble.failure_kind(error) == kind
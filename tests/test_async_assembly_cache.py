@@ -82,3 +82,78 @@ async def test_cache_clear_clears_cache(expensive_mock, autojump_clock):
     assert trio.current_time() - start_time == 5
     assert result == "Client 2"
     assert expensive_mock.call_count == 2
+
+
+async def test_concurrent_calls_are_coalesced(expensive_mock, autojump_clock):
+    # Arrange
+    @async_assembly_cache(maxsize=10, ttl=100)
+    async def get_expensive_mock(async_client, *args, **kwargs):
+        return await expensive_mock(async_client, *args, **kwargs)
+
+    results = []
+
+    async def call(async_client, arg):
+        results.append(await get_expensive_mock(async_client, arg))
+
+    # Call many times at once, with 2 different args
+    start_time = trio.current_time()
+    async with trio.open_nursery() as nursery:
+        for n in range(100):
+            nursery.start_soon(call, f"Client {n}", n % 2)
+    assert trio.current_time() - start_time == 5
+    assert expensive_mock.call_count == 2
+    # All callers with the same arg get the result of the same call
+    assert len(set(results)) == 2
+    assert sorted(results.count(result) for result in set(results)) == [50, 50]
+
+
+async def test_errors_are_raised_in_all_concurrent_callers(autojump_clock):
+    # Arrange
+    failing_mock = AsyncMock(side_effect=ValueError)
+
+    @async_assembly_cache(maxsize=10, ttl=100)
+    async def get_failing_mock(async_client, *args, **kwargs):
+        await trio.sleep(5)
+        return await failing_mock(async_client, *args, **kwargs)
+
+    errors = []
+
+    async def call():
+        try:
+            await get_failing_mock("Client", "arg")
+        except ValueError as error:
+            errors.append(error)
+
+    async with trio.open_nursery() as nursery:
+        for _ in range(10):
+            nursery.start_soon(call)
+    assert failing_mock.call_count == 1
+    assert len(errors) == 10
+
+    # Errors are not cached
+    with pytest.raises(ValueError):
+        await get_failing_mock("Client", "arg")
+    assert failing_mock.call_count == 2
+
+
+async def test_waiting_callers_retry_if_first_call_is_cancelled(
+    expensive_mock, autojump_clock
+):
+    # Arrange
+    @async_assembly_cache(maxsize=10, ttl=100)
+    async def get_expensive_mock(async_client, *args, **kwargs):
+        return await expensive_mock(async_client, *args, **kwargs)
+
+    async def cancelled_call():
+        with trio.move_on_after(1):
+            await get_expensive_mock("Client 1", "arg")
+
+    # Second caller waits for the first, which is cancelled, then tries itself
+    start_time = trio.current_time()
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(cancelled_call)
+        await trio.sleep(0.5)
+        result = await get_expensive_mock("Client 2", "arg")
+    assert result == "Client 2"
+    assert trio.current_time() - start_time == 6
+    assert expensive_mock.call_count == 2
@@ -0,0 +1,64 @@
+import pytest
+import trio
+
+from obscraper import _download
+
+
+async def run_requests(n, endpoint):
+    """Start n fake requests to an endpoint, returning the max number in flight."""
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fake_request():
+        nonlocal in_flight, max_in_flight
+        async with _download.concurrency_limit(endpoint):
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await trio.sleep(1)
+            in_flight -= 1
+
+    async with trio.open_nursery() as nursery:
+        for _ in range(n):
+            nursery.start_soon(fake_request)
+    return max_in_flight
+
+
+async def test_endpoint_limit_is_respected(autojump_clock):
+    limits = _download.make_concurrency_limits(10, {"post": 3})
+    _download.set_concurrency_limits(limits)
+    start_time = trio.current_time()
+    assert await run_requests(12, "post") == 3
+    assert trio.current_time() - start_time == 4
+
+
+async def test_total_limit_is_respected(autojump_clock):
+    limits = _download.make_concurrency_limits(2, {"post": 5})
+    _download.set_concurrency_limits(limits)
+    assert await run_requests(10, "post") == 2
+    assert await run_requests(10, None) == 2
+
+
+async def test_default_limits_are_used_if_none_set(autojump_clock):
+    max_in_flight = await run_requests(100, "vote")
+    assert max_in_flight == _download.DEFAULT_ENDPOINT_CONCURRENCY["vote"]
+
+
+def test_make_concurrency_limits_fills_in_defaults():
+    limits = _download.make_concurrency_limits(5, {"vote": 2})
+    assert limits == {
+        "total": 5,
+        "post": _download.DEFAULT_ENDPOINT_CONCURRENCY["post"],
+        "vote": 2,
+        "comment": _download.DEFAULT_ENDPOINT_CONCURRENCY["comment"],
+    }
+
+
+@pytest.mark.parametrize(
+    "max_concurrency, endpoint_concurrency",
+    [(0, None), (-1, None), (1.5, None), (5, {"post": 0}), (5, {"fake": 1})],
+)
+def test_make_concurrency_limits_rejects_invalid_limits(
+    max_concurrency, endpoint_concurrency
+):
+    with pytest.raises(ValueError):
+        _download.make_concurrency_limits(max_concurrency, endpoint_concurrency)
@@ -0,0 +1,240 @@
+import functools
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import httpx
+import pytest
+import trio
+from utils import mock_site_transport
+
+from obscraper import _assemble, _exceptions, _fetch, _numbers, _scrape
+
+NAMES = [f"2020/01/post-{n}" for n in range(50)]
+
+
+async def fake_assemble_post(async_client, name, **kwargs):
+    """Return the name as the "post", after a delay which depends on the name."""
+    number = int(name.split("-")[-1])
+    await trio.sleep(number % 5)
+    if number % 10 == 0:
+        raise _exceptions.InvalidResponseError
+    return name
+
+
+@pytest.fixture
+def mock_assemble_post():
+    with patch("obscraper._assemble.assemble_post", fake_assemble_post):
+        yield
+
+
+def expected_posts(names):
+    return {name: None if name.endswith("0") else name for name in names}
+
+
+async def test_stream_posts_sends_all_posts(mock_assemble_post, autojump_clock):
+    send_channel, receive_channel = trio.open_memory_channel(0)
+    results = {}
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(
+            _fetch.stream_posts, "Client", {n: n for n in NAMES}, send_channel
+        )
+        async for label, post in receive_channel:
+            results[label] = post
+    assert results == expected_posts(NAMES)
+
+
+async def test_stream_posts_limits_posts_in_flight(autojump_clock):
+    in_flight = 0
+    max_in_flight = 0
+
+    async def counting_assemble_post(async_client, name, **kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await trio.sleep(1)
+        return name
+
+    send_channel, receive_channel = trio.open_memory_channel(0)
+    with patch("obscraper._assemble.assemble_post", counting_assemble_post):
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(
+                _fetch.stream_posts, "Client", {n: n for n in NAMES}, send_channel, 7
+            )
+            async for _ in receive_channel:
+                in_flight -= 1
+                # slow consumer
+                await trio.sleep(5)
+    assert max_in_flight == 7
+
+
+def test_iter_posts_by_names_yields_all_posts(mock_assemble_post):
+    results = dict(_scrape.iter_posts_by_names(NAMES))
+    assert results == expected_posts(NAMES)
+
+
+def test_iter_posts_by_names_can_stop_early(mock_assemble_post):
+    posts = _scrape.iter_posts_by_names(NAMES)
+    first_label, _ = next(posts)
+    assert first_label in NAMES
+    posts.close()
+    # Session is still usable
+    assert dict(_scrape.iter_posts_by_names(NAMES[:3])) == expected_posts(NAMES[:3])
+
+
+def test_iter_posts_by_names_validates_names_immediately():
+    with pytest.raises(ValueError):
+        _scrape.iter_posts_by_names(["Not a name"])
+    with pytest.raises(TypeError):
+        _scrape.iter_posts_by_names("2020/01/not-a-list")
+    assert list(_scrape.iter_posts_by_names([])) == []
+
+
+async def test_open_post_stream_gives_all_posts(mock_assemble_post, autojump_clock):
+    results = {}
+    async with _scrape.open_post_stream(NAMES, "Client") as posts:
+        async for label, post in posts:
+            results[label] = post
+    assert results == expected_posts(NAMES)
+
+
+async def test_open_post_stream_can_be_stopped_early(
+    mock_assemble_post, autojump_clock
+):
+    async with _scrape.open_post_stream(NAMES, "Client") as posts:
+        async for label, post in posts:
+            break
+    assert label in NAMES
+    # The background task was cancelled, rather than left waiting to send
+    await trio.sleep(10)
+
+
+def test_open_post_stream_validates_arguments_immediately():
+    with pytest.raises(ValueError):
+        _scrape.open_post_stream(["Not a name"])
+    with pytest.raises(ValueError):
+        _scrape.open_post_stream([], fields=["not_a_field"])
+
+
+def post_url(number):
+    return f"https://www.overcomingbias.com/2020/01/post-{number}.html"
+
+
+# Links from each post, by number. Post 4 can't be retrieved.
+CRAWL_LINKS = {
+    0: [post_url(1), post_url(2), post_url(0), "https://www.overcomingbias.com/?p=1"],
+    1: [post_url(3), post_url(2), post_url(3)],
+    2: [],
+    3: [post_url(4), post_url(0)],
+    4: [post_url(5)],
+}
+
+
+@pytest.fixture
+def mock_crawl_assemble_post():
+    """Return fake posts with links, recording the names fetched."""
+    fetched = []
+
+    async def crawl_assemble_post(async_client, name, **kwargs):
+        fetched.append(name)
+        number = int(name.split("-")[-1])
+        await trio.sleep(0.01)
+        if number == 4:
+            raise _exceptions.InvalidResponseError
+        return SimpleNamespace(name=name, internal_links=CRAWL_LINKS[number])
+
+    with patch("obscraper._assemble.assemble_post", crawl_assemble_post):
+        yield fetched
+
+
+async def test_crawl_posts_follows_links_breadth_first(
+    mock_crawl_assemble_post, autojump_clock
+):
+    send_channel, receive_channel = trio.open_memory_channel(0)
+    results = []
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(
+            _fetch.crawl_posts, "Client", [NAMES[1], NAMES[0], NAMES[1]], send_channel
+        )
+        async for name, post in receive_channel:
+            results.append((name, post))
+    fetched = mock_crawl_assemble_post
+    # Each post is fetched once, starting with the given names
+    assert fetched[:2] == [NAMES[1], NAMES[0]]
+    assert sorted(fetched) == NAMES[:5]
+    assert fetched.index(NAMES[4]) > fetched.index(NAMES[3])
+    assert sorted(name for name, _ in results) == NAMES[:5]
+    assert dict(results)[NAMES[4]] is None
+
+
+@pytest.fixture
+def clear_assembly_caches():
+    with patch("obscraper._numbers._default_number_index", _numbers.NumberIndex()):
+        yield
+    _scrape.clear_cache()
+
+
+async def test_crawl_posts_fetches_posts_missing_from_sitemap(clear_assembly_caches):
+    # Every page links to these posts, which aren't in the sitemap
+    hidden_names = [
+        "2006/12/contributors_be",
+        "2007/02/moderate_modera",
+        "2006/11/hidden-link",
+    ]
+    transport = mock_site_transport(["2006/11/introduction"])
+    fields = _scrape.tidy_fields(["title", "edit_date", "internal_links"])
+    send_channel, receive_channel = trio.open_memory_channel(0)
+    async with httpx.AsyncClient(transport=transport) as async_client:
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(
+                functools.partial(
+                    _fetch.crawl_posts,
+                    async_client,
+                    ["2006/11/introduction"],
+                    send_channel,
+                    fields=fields,
+                )
+            )
+            results = {name: post async for name, post in receive_channel}
+    assert set(results) == {"2006/11/introduction", *hidden_names}
+    assert results["2006/11/introduction"].edit_date is not None
+    for name in hidden_names:
+        assert results[name].name == name
+        assert results[name].edit_date is None
+
+
+async def test_crawl_posts_with_no_names(autojump_clock):
+    send_channel, receive_channel = trio.open_memory_channel(0)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(_fetch.crawl_posts, "Client", [], send_channel)
+        assert [item async for item in receive_channel] == []
+
+
+def test_crawl_posts_starts_from_sitemap(mock_crawl_assemble_post):
+    with patch("obscraper._scrape.get_edit_dates", Mock(return_value={NAMES[3]: None})):
+        results = dict(_scrape.crawl_posts(fields=["title"]))
+    assert set(results) == {NAMES[0], NAMES[1], NAMES[2], NAMES[3], NAMES[4]}
+    assert len(mock_crawl_assemble_post) == 5
+
+
+def test_crawl_posts_validates_arguments_immediately():
+    with pytest.raises(ValueError):
+        _scrape.crawl_posts(["Not a name"])
+    with pytest.raises(ValueError):
+        _scrape.crawl_posts(fields=["not_a_field"])
+
+
+def test_linked_names_skips_unknown_short_urls_and_repeats():
+    post = SimpleNamespace(internal_links=CRAWL_LINKS[0] + CRAWL_LINKS[1])
+    assert _fetch.linked_names(post) == [NAMES[1], NAMES[2], NAMES[0], NAMES[3]]
+    assert _fetch.linked_names(None) == []
+
+
+def test_linked_names_resolves_known_short_urls():
+    number_index = _numbers.NumberIndex()
+    number_index.add(12345, NAMES[7])
+    links = ["https://www.overcomingbias.com/?p=12345", post_url(7)]
+    post = SimpleNamespace(
+        internal_links=[*links, "https://www.overcomingbias.com/?p=54321"]
+    )
+    with patch("obscraper._numbers._default_number_index", number_index):
+        assert _fetch.linked_names(post) == [NAMES[7]]
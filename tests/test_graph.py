@@ -0,0 +1,115 @@
+import dataclasses
+import pathlib
+
+import httpx
+import pytest
+
+from obscraper import _graph, _tidy
+
+np = pytest.importorskip("numpy")
+
+POST_PAGE = pathlib.Path(__file__).parent / "post_page.html"
+
+
+def long_url(i):
+    return f"https://www.overcomingbias.com/2010/09/post-{i}.html"
+
+
+def short_url(i):
+    return f"https://www.overcomingbias.com/?p={20000 + i}"
+
+
+# Links from each post, by index
+LINKS = {
+    0: [long_url(1), short_url(2), long_url(1)],
+    1: [long_url(2)],
+    2: [short_url(0), long_url(2), "https://www.overcomingbias.com/?p=99999"],
+    3: [long_url(2), "http://www.overcomingbias.com/2006/12/not-stored.html"],
+    4: [],
+}
+
+
+@pytest.fixture(scope="module")
+def posts():
+    post = _tidy.tidy_post(httpx.Response(200, content=POST_PAGE.read_bytes()))
+    return {
+        f"2010/09/post-{i}": dataclasses.replace(
+            post, name=f"2010/09/post-{i}", number=20000 + i, internal_links=links
+        )
+        for i, links in LINKS.items()
+    }
+
+
+@pytest.fixture(scope="module")
+def graph(posts):
+    # Out of order, with posts which can't be in the graph
+    no_number = dataclasses.replace(posts["2010/09/post-0"], number=None)
+    return _graph.LinkGraph.from_posts([*reversed(posts.values()), None, no_number])
+
+
+def test_graph_resolves_long_and_short_links(graph):
+    assert len(graph) == 5
+    assert graph.numbers == [20000, 20001, 20002, 20003, 20004]
+    assert 20003 in graph
+    assert 99999 not in graph
+    # Duplicates, self-links and links to unknown posts are left out
+    assert graph.edge_count == 5
+    assert graph.out_links(20000) == [20001, 20002]
+    assert graph.out_links(20002) == [20000]
+    assert graph.out_links(20004) == []
+    assert graph.in_links(20002) == [20000, 20001, 20003]
+    assert graph.in_links(20003) == []
+    with pytest.raises(KeyError):
+        graph.out_links(99999)
+
+
+def test_neighborhood_finds_posts_within_depth(graph):
+    assert graph.neighborhood(20003, depth=0) == {20003: 0}
+    assert graph.neighborhood(20003, direction="out") == {20003: 0, 20002: 1}
+    assert graph.neighborhood(20003, depth=3, direction="out") == {
+        20003: 0,
+        20002: 1,
+        20000: 2,
+        20001: 3,
+    }
+    assert graph.neighborhood(20001, direction="in") == {20001: 0, 20000: 1}
+    assert graph.neighborhood(20001, depth=2) == {
+        20001: 0,
+        20002: 1,
+        20000: 1,
+        20003: 2,
+    }
+    with pytest.raises(ValueError):
+        graph.neighborhood(20001, direction="sideways")
+    with pytest.raises(ValueError):
+        graph.neighborhood(20001, depth=-1)
+
+
+def reference_pagerank(graph, damping=0.85, iterations=200):
+    numbers = graph.numbers
+    ranks = dict.fromkeys(numbers, 1 / len(numbers))
+    for _ in range(iterations):
+        new_ranks = dict.fromkeys(numbers, (1 - damping) / len(numbers))
+        for number in numbers:
+            links = graph.out_links(number) or numbers
+            for target in links:
+                new_ranks[target] += damping * ranks[number] / len(links)
+        ranks = new_ranks
+    return ranks
+
+
+def test_pagerank_matches_reference(graph):
+    ranks = graph.pagerank()
+    assert sum(ranks.values()) == pytest.approx(1)
+    assert ranks == pytest.approx(reference_pagerank(graph))
+    assert max(ranks, key=ranks.get) == 20002
+    assert graph.pagerank() == ranks
+    with pytest.raises(ValueError):
+        graph.pagerank(damping=1.5)
+
+
+def test_empty_graph():
+    graph = _graph.LinkGraph.from_posts({})
+    assert len(graph) == 0
+    assert graph.edge_count == 0
+    assert graph.pagerank() == {}
@@ -0,0 +1,101 @@
+import httpx
+import pytest
+
+from obscraper import _httpcache
+
+URL = "https://www.overcomingbias.com/2006/11/introduction.html"
+
+
+class FakeServer:
+    """Serve a page with an ETag, recording the requests made."""
+
+    def __init__(self, body=b"<html>intro</html>", etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        headers = {"content-type": "text/html; charset=utf-8"}
+        if self.etag is not None:
+            headers["etag"] = self.etag
+            if request.headers.get("if-none-match") == self.etag:
+                return httpx.Response(304, headers=headers)
+        return httpx.Response(200, headers=headers, content=self.body)
+
+
+@pytest.fixture
+def server():
+    return FakeServer()
+
+
+@pytest.fixture
+async def async_client(server):
+    async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+        yield client
+
+
+@pytest.fixture
+async def http_cache(tmp_path):
+    http_cache = _httpcache.HTTPCache(tmp_path / "cache")
+    _httpcache.set_http_cache(http_cache)
+    return http_cache
+
+
+async def test_unchanged_response_is_served_from_cache(
+    async_client, server, http_cache
+):
+    first = await _httpcache.cached_get(async_client, URL, {})
+    second = await _httpcache.cached_get(async_client, URL, {})
+    assert "if-none-match" not in server.requests[0].headers
+    assert server.requests[1].headers["if-none-match"] == '"v1"'
+    assert second.status_code == 200
+    assert second.text == first.text == "<html>intro</html>"
+    assert second.url == URL
+
+
+async def test_changed_response_replaces_cached_response(
+    async_client, server, http_cache
+):
+    await _httpcache.cached_get(async_client, URL, {})
+    server.body, server.etag = b"<html>edited</html>", '"v2"'
+    response = await _httpcache.cached_get(async_client, URL, {})
+    assert response.text == "<html>edited</html>"
+    assert http_cache.load(URL).content == b"<html>edited</html>"
+
+
+async def test_cache_persists_between_instances(async_client, server, tmp_path):
+    _httpcache.set_http_cache(_httpcache.HTTPCache(tmp_path))
+    await _httpcache.cached_get(async_client, URL, {})
+    _httpcache.set_http_cache(_httpcache.HTTPCache(tmp_path))
+    await _httpcache.cached_get(async_client, URL, {})
+    assert server.requests[1].headers["if-none-match"] == '"v1"'
+
+
+async def test_params_are_part_of_cache_key(async_client, http_cache):
+    await _httpcache.cached_get(async_client, URL, {}, params={"p": "1"})
+    assert http_cache.load(URL, {"p": "1"}) is not None
+    assert http_cache.load(URL, {"p": "2"}) is None
+    assert http_cache.load(URL) is None
+
+
+async def test_responses_without_validators_are_not_cached(
+    async_client, server, http_cache
+):
+    server.etag = None
+    await _httpcache.cached_get(async_client, URL, {})
+    assert http_cache.load(URL) is None
+
+
+async def test_no_cache_is_used_by_default(async_client, server):
+    await _httpcache.cached_get(async_client, URL, {})
+    await _httpcache.cached_get(async_client, URL, {})
+    assert all("if-none-match" not in r.headers for r in server.requests)
+
+
+def test_corrupt_entries_are_ignored(tmp_path):
+    http_cache = _httpcache.HTTPCache(tmp_path)
+    path = http_cache.path(URL)
+    path.parent.mkdir()
+    path.write_bytes(b"{}\nnot compressed")
+    assert http_cache.load(URL) is None
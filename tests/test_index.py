@@ -0,0 +1,129 @@
+import dataclasses
+import pathlib
+
+import httpx
+import pytest
+
+from obscraper import _index, _tidy
+
+POST_PAGE = pathlib.Path(__file__).parent / "post_page.html"
+
+TEXTS = [
+    "Prediction markets aggregate information. Markets beat polls.",
+    "Futarchy: vote on values, but bet on beliefs with prediction markets.",
+    "Why do we believe what we do? Signaling explains much of it.",
+    "Medicine is mostly signaling, and health markets are odd.",
+    "Polls, prediction and forecasting: a survey of markets and pundits.",
+]
+
+
+@pytest.fixture(scope="module")
+def posts():
+    post = _tidy.tidy_post(httpx.Response(200, content=POST_PAGE.read_bytes()))
+    return {
+        f"2010/09/post-{i}": dataclasses.replace(
+            post,
+            name=f"2010/09/post-{i}",
+            number=20000 + i,
+            text_html=f"<p>{text}</p>",
+        )
+        for i, text in enumerate(TEXTS)
+    }
+
+
+@pytest.fixture
+def index(posts):
+    return _index.SearchIndex.from_posts({**posts, "2010/09/missing": None})
+
+
+def numbers(results):
+    return sorted(number - 20000 for number, _ in results)
+
+
+def test_search_matches_terms_ignoring_case_and_punctuation(index):
+    assert len(index) == 5
+    assert numbers(index.search("signaling")) == [2, 3]
+    assert numbers(index.search("FUTARCHY")) == [1]
+    assert numbers(index.search("beliefs.")) == [1]
+    assert numbers(index.search("nonexistent")) == []
+
+
+def test_search_supports_boolean_queries(index):
+    assert numbers(index.search("prediction markets")) == [0, 1, 4]
+    assert numbers(index.search("prediction AND polls")) == [0, 4]
+    assert numbers(index.search("futarchy OR medicine")) == [1, 3]
+    assert numbers(index.search("markets NOT prediction")) == [3]
+    assert numbers(index.search("NOT markets")) == [2]
+    assert numbers(index.search("(signaling OR futarchy) NOT health")) == [1, 2]
+
+
+def test_search_supports_phrase_queries(index):
+    assert numbers(index.search('"prediction markets"')) == [0, 1]
+    assert numbers(index.search('"markets prediction"')) == []
+    assert numbers(index.search('"prediction markets" NOT polls')) == [1]
+    assert numbers(index.search('"Markets, beat polls!"')) == [0]
+
+
+def test_search_ranks_results_by_bm25(index):
+    results = index.search("markets")
+    # Post 0 mentions markets twice, in a short post
+    assert results[0][0] == 20000
+    assert [score for _, score in results] == sorted(
+        (score for _, score in results), reverse=True
+    )
+    assert all(score > 0 for _, score in results)
+    assert index.search("markets", limit=2) == results[:2]
+
+
+@pytest.mark.parametrize(
+    "query", ["", "   ", "...", "(markets", "markets)", "markets AND", "NOT", "()"]
+)
+def test_invalid_queries_raise_value_error(index, query):
+    with pytest.raises(ValueError):
+        index.search(query)
+
+
+def test_index_can_be_saved_and_loaded(tmp_path, index):
+    path = tmp_path / "posts.obindex"
+    index.save(path)
+    with _index.SearchIndex.load(path) as loaded:
+        assert len(loaded) == 5
+        assert 20003 in loaded
+        for query in ["markets", '"prediction markets"', "signaling NOT health"]:
+            assert loaded.search(query) == pytest.approx(index.search(query))
+
+
+def test_loaded_index_can_be_updated(tmp_path, index, posts):
+    path = tmp_path / "posts.obindex"
+    index.save(path)
+    with _index.SearchIndex.load(path) as loaded:
+        edited = dataclasses.replace(
+            posts["2010/09/post-2"], text_html="<p>Now about prediction markets.</p>"
+        )
+        loaded.add_post(edited)
+        loaded.remove_post(20003)
+        assert len(loaded) == 4
+        assert numbers(loaded.search("signaling")) == []
+        assert numbers(loaded.search('"prediction markets"')) == [0, 1, 2]
+        with pytest.raises(KeyError):
+            loaded.remove_post(20003)
+        loaded.save(path)
+    with _index.SearchIndex.load(path) as reloaded:
+        assert numbers(reloaded.search('"prediction markets"')) == [0, 1, 2]
+        assert numbers(reloaded.search("medicine")) == []
+
+
+def test_posts_without_numbers_raise_value_error(posts):
+    post = dataclasses.replace(posts["2010/09/post-0"], number=None)
+    with pytest.raises(ValueError):
+        _index.SearchIndex.from_posts([post])
+
+
+def test_invalid_index_file_raises_value_error(tmp_path):
+    path = tmp_path / "posts.obindex"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        _index.SearchIndex.load(path)
+    path.write_bytes(b"not an index" * 10)
+    with pytest.raises(ValueError):
+        _index.SearchIndex.load(path)
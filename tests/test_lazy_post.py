@@ -0,0 +1,104 @@
+import json
+import pathlib
+import pickle
+import threading
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from obscraper import _parse_post, _post, _serialize, _tidy
+
+POST_PAGE = pathlib.Path(__file__).parent / "post_page.html"
+
+
+@pytest.fixture(scope="module")
+def response():
+    return httpx.Response(
+        200,
+        content=POST_PAGE.read_bytes(),
+        headers={"content-type": "text/html; charset=UTF-8"},
+    )
+
+
+@pytest.fixture
+def eager_post(response):
+    return _tidy.tidy_post(response)
+
+
+@pytest.fixture
+def lazy_post(response):
+    return _tidy.tidy_post(response, lazy=True)
+
+
+def test_content_fields_are_not_computed_until_accessed(lazy_post):
+    for name in _post.CONTENT_FIELDS:
+        assert lazy_post.__dict__[name] is _post.LAZY
+    assert lazy_post.title == "How To Join & Contribute"
+    assert lazy_post.__dict__["word_count"] is _post.LAZY
+
+
+def test_accessing_one_content_field_computes_all(lazy_post, eager_post):
+    assert lazy_post.word_count == eager_post.word_count
+    for name in _post.CONTENT_FIELDS:
+        assert lazy_post.__dict__[name] == getattr(eager_post, name)
+    assert "_content" not in lazy_post.__dict__
+
+
+def test_lazy_post_equals_eager_post(lazy_post, eager_post):
+    assert lazy_post == eager_post
+    assert lazy_post.plaintext == eager_post.plaintext
+
+
+def test_lazy_post_is_encoded_like_eager_post(lazy_post, eager_post):
+    lazy_json = json.dumps(lazy_post, cls=_serialize.PostEncoder)
+    assert lazy_json == json.dumps(eager_post, cls=_serialize.PostEncoder)
+
+
+def test_fields_set_before_access_are_kept(lazy_post):
+    lazy_post.word_count = 5
+    assert lazy_post.internal_links != _post.LAZY
+    assert lazy_post.word_count == 5
+
+
+def test_content_can_be_extracted_by_threads_at_once(lazy_post, eager_post):
+    # Both threads start extracting before either has finished
+    barrier = threading.Barrier(2, timeout=5)
+    parse_content = _parse_post.parse_content
+
+    def wait_then_parse(content):
+        barrier.wait()
+        return parse_content(content)
+
+    results = []
+    with patch("obscraper._parse_post.parse_content", wait_then_parse):
+        threads = [
+            threading.Thread(target=lambda: results.append(lazy_post.word_count))
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert results == [eager_post.word_count] * 2
+    assert lazy_post == eager_post
+    assert "_content" not in lazy_post.__dict__
+
+
+def test_lazy_post_can_be_pickled(lazy_post, eager_post):
+    unpickled = pickle.loads(pickle.dumps(lazy_post))
+    assert unpickled.__dict__["text_html"] is _post.LAZY
+    assert unpickled == eager_post
+
+
+def test_plaintext_is_memoized(eager_post):
+    with patch(
+        "obscraper._parse_post.convert_to_plaintext", return_value="text"
+    ) as mock_convert:
+        # Computed while the page was parsed
+        assert eager_post.plaintext.startswith("Overcoming Bias is a forum")
+        assert mock_convert.call_count == 0
+        eager_post.text_html = "<p>Edited</p>"
+        assert eager_post.plaintext == "text"
+        assert eager_post.plaintext == "text"
+        assert mock_convert.call_count == 1
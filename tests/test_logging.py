@@ -7,7 +7,7 @@ import obscraper
 
 @pytest.fixture
 def mock_assemble_post():
-    async def fake_assemble_post(async_client, name):
+    async def fake_assemble_post(async_client, name, fields=None):
         if name == "2020/01/raise-invalid-response":
             raise obscraper.InvalidResponseError
         elif name == "2020/01/raise-attribute-not-found":
@@ -1,6 +1,11 @@
+import gzip
+import json
 from unittest.mock import Mock, mock_open, patch
 
-from obscraper import __main__
+import pytest
+
+from obscraper import __main__, _serialize
+from obscraper._extract_post import name_to_url
 
 
 def test_main_returns_expected_result_for_urls():
@@ -77,3 +82,189 @@ def test_main_returns_expected_result_for_all():
                     ]
                 )
                 assert output_string == '[{"url":"all","post":"all"}]'
+
+
+def fake_iter_posts_by_names(names, session=None, fields=None):
+    for name in names:
+        yield name, {"title": name}
+
+
+def test_main_writes_jsonl_as_posts_are_fetched(tmp_path):
+    outfile = tmp_path / "posts.jsonl"
+    names = ["2006/11/introduction", "2007/10/a-rational-argu"]
+    with patch(
+        "obscraper._scrape.iter_posts_by_names", fake_iter_posts_by_names
+    ), patch(
+        "obscraper._scrape.get_edit_dates", Mock(return_value=dict.fromkeys(names))
+    ):
+        try:
+            __main__.main(["-a", "-o", str(outfile), "--format", "jsonl"])
+        except SystemExit as sysexit:
+            assert sysexit.code == 0
+    lines = outfile.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"url": name_to_url(name), "post": {"title": name}} for name in names
+    ]
+
+
+def test_main_compresses_output_ending_in_gz(tmp_path):
+    outfile = tmp_path / "posts.jsonl.gz"
+    urls = ["https://www.overcomingbias.com/2006/11/introduction.html"]
+    with patch("obscraper._scrape.iter_posts_by_names", fake_iter_posts_by_names):
+        try:
+            __main__.main(["-u", *urls, "-o", str(outfile), "--format", "jsonl"])
+        except SystemExit as sysexit:
+            assert sysexit.code == 0
+    with gzip.open(outfile, mode="rt", encoding="utf-8") as file:
+        lines = file.read().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"url": urls[0], "post": {"title": "2006/11/introduction"}}
+    ]
+
+
+def jsonl_record(name, retrieved=True):
+    post = {"title": name} if retrieved else None
+    return _serialize.dumps_posts({"url": name_to_url(name), "post": post}) + "\n"
+
+
+def run_main(cli_args, fetched_names):
+    """Run the CLI with fake posts, recording the names of posts fetched."""
+
+    def iter_posts_by_names(names, session=None, fields=None):
+        fetched_names.extend(names)
+        return fake_iter_posts_by_names(names)
+
+    names = ["2006/11/introduction", "2007/10/a-rational-argu", "2009/05/a-a-a"]
+    with patch("obscraper._scrape.iter_posts_by_names", iter_posts_by_names), patch(
+        "obscraper._scrape.get_edit_dates", Mock(return_value=dict.fromkeys(names))
+    ):
+        try:
+            __main__.main(cli_args)
+        except SystemExit as sysexit:
+            assert sysexit.code == 0
+
+
+def test_resume_skips_posts_already_written(tmp_path):
+    outfile = tmp_path / "posts.jsonl"
+    outfile.write_text(
+        jsonl_record("2006/11/introduction")
+        + jsonl_record("2007/10/a-rational-argu", retrieved=False)
+        + jsonl_record("2009/05/a-a-a")[:20],  # interrupted while writing
+        encoding="utf-8",
+    )
+    fetched_names = []
+    run_main(["-a", "-o", str(outfile), "--format", "jsonl", "--resume"], fetched_names)
+    assert fetched_names == ["2007/10/a-rational-argu", "2009/05/a-a-a"]
+    assert outfile.read_text(encoding="utf-8") == (
+        jsonl_record("2006/11/introduction")
+        + jsonl_record("2007/10/a-rational-argu", retrieved=False)
+        + jsonl_record("2007/10/a-rational-argu")
+        + jsonl_record("2009/05/a-a-a")
+    )
+
+
+def test_retry_failed_only_gets_failed_posts(tmp_path):
+    outfile = tmp_path / "posts.jsonl.gz"
+    with gzip.open(outfile, mode="wt", encoding="utf-8") as file:
+        file.write(jsonl_record("2006/11/introduction", retrieved=False))
+        file.write(jsonl_record("2007/10/a-rational-argu", retrieved=False))
+        file.write(jsonl_record("2006/11/introduction"))
+    fetched_names = []
+    run_main(["-o", str(outfile), "--format", "jsonl", "--retry-failed"], fetched_names)
+    assert fetched_names == ["2007/10/a-rational-argu"]
+    with gzip.open(outfile, mode="rt", encoding="utf-8") as file:
+        assert file.read().endswith(jsonl_record("2007/10/a-rational-argu"))
+
+
+def test_resume_recovers_truncated_gzip_file(tmp_path):
+    outfile = tmp_path / "posts.jsonl.gz"
+    with gzip.open(outfile, mode="wt", encoding="utf-8") as file:
+        file.write(jsonl_record("2006/11/introduction"))
+        file.flush()
+        truncated = outfile.read_bytes()
+    outfile.write_bytes(truncated)  # no end-of-stream marker
+    fetched_names = []
+    run_main(["-a", "-o", str(outfile), "--format", "jsonl", "--resume"], fetched_names)
+    assert fetched_names == ["2007/10/a-rational-argu", "2009/05/a-a-a"]
+    with gzip.open(outfile, mode="rt", encoding="utf-8") as file:
+        assert len(file.read().splitlines()) == 3
+
+
+def test_recover_jsonl_truncates_plain_file_in_place(tmp_path):
+    outfile = tmp_path / "posts.jsonl"
+    complete = jsonl_record("2006/11/introduction")
+    outfile.write_text(complete + jsonl_record("2009/05/a-a-a")[:20])
+    inode = outfile.stat().st_ino
+    progress = __main__.recover_jsonl(str(outfile))
+    assert list(progress) == [
+        "https://www.overcomingbias.com/2006/11/introduction.html"
+    ]
+    assert outfile.read_text() == complete
+    assert outfile.stat().st_ino == inode
+
+
+def test_recover_jsonl_leaves_intact_gzip_file_alone(tmp_path):
+    outfile = tmp_path / "posts.jsonl.gz"
+    with gzip.open(outfile, mode="wt", encoding="utf-8") as file:
+        file.write(jsonl_record("2006/11/introduction"))
+    inode = outfile.stat().st_ino
+    progress = __main__.recover_jsonl(str(outfile))
+    assert len(progress) == 1
+    assert outfile.stat().st_ino == inode
+
+
+@pytest.mark.parametrize("file_name", ["posts.jsonl", "posts.jsonl.gz"])
+def test_recover_jsonl_raises_error_for_corrupt_line_mid_file(tmp_path, file_name):
+    outfile = tmp_path / file_name
+    with __main__.open_outfile(str(outfile)) as file:
+        file.write(jsonl_record("2006/11/introduction"))
+        file.write(jsonl_record("2007/10/a-rational-argu")[:20] + "\n")
+        file.write(jsonl_record("2009/05/a-a-a"))
+    contents = outfile.read_bytes()
+    with pytest.raises(ValueError, match="line 2"):
+        __main__.recover_jsonl(str(outfile))
+    assert outfile.read_bytes() == contents
+    assert not (tmp_path / f".resume-{file_name}").exists()
+
+
+def test_resume_fails_for_corrupt_line_mid_file(tmp_path):
+    outfile = tmp_path / "posts.jsonl"
+    contents = (
+        jsonl_record("2006/11/introduction")[:20]
+        + "\n"
+        + jsonl_record("2007/10/a-rational-argu")
+    )
+    outfile.write_text(contents)
+    with pytest.raises(SystemExit) as sysexit:
+        __main__.main(["-a", "-o", str(outfile), "--format", "jsonl", "--resume"])
+    assert sysexit.value.code == 2
+    assert outfile.read_text() == contents
+
+
+def test_resume_requires_jsonl_format():
+    with pytest.raises(SystemExit) as sysexit:
+        __main__.main(["-a", "--resume"])
+    assert sysexit.value.code == 2
+
+
+def test_main_crawls_posts(tmp_path):
+    outfile = tmp_path / "posts.jsonl"
+    names = ["2006/11/introduction", "2007/10/a-rational-argu"]
+
+    def crawl_posts(session=None, fields=None):
+        return fake_iter_posts_by_names(names)
+
+    with patch("obscraper._scrape.crawl_posts", crawl_posts):
+        with pytest.raises(SystemExit) as sysexit:
+            __main__.main(["--crawl", "-o", str(outfile), "--format", "jsonl"])
+    assert sysexit.value.code == 0
+    lines = outfile.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["url"] for line in lines] == [
+        name_to_url(name) for name in names
+    ]
+
+
+def test_crawl_cannot_be_resumed():
+    with pytest.raises(SystemExit) as sysexit:
+        __main__.main(["--crawl", "--format", "jsonl", "--resume"])
+    assert sysexit.value.code == 2
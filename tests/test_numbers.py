@@ -0,0 +1,159 @@
+import pathlib
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+import trio
+from utils import mock_site_transport
+
+from obscraper import _assemble, _exceptions, _fetch, _numbers, _scrape, _tidy
+
+NAME = "2006/11/introduction"
+POST_PAGE = pathlib.Path(__file__).parent / "post_page.html"
+
+
+def test_number_index_maps_numbers_and_names_both_ways():
+    number_index = _numbers.NumberIndex()
+    number_index.add(18402, NAME)
+    assert number_index.get_name(18402) == NAME
+    assert number_index.get_number(NAME) == 18402
+    assert number_index.get_name(12345) is None
+    assert number_index.get_number("2006/11/other") is None
+
+
+def test_number_index_replaces_stale_entries():
+    number_index = _numbers.NumberIndex()
+    number_index.add(18402, NAME)
+    number_index.add(18402, "2006/11/renamed")
+    assert number_index.get_number(NAME) is None
+    assert number_index.get_number("2006/11/renamed") == 18402
+    assert len(number_index) == 1
+
+
+def test_number_index_persists_entries(tmp_path):
+    path = tmp_path / _numbers.INDEX_FILE_NAME
+    number_index = _numbers.NumberIndex(path)
+    number_index.add(18402, NAME)
+    number_index.add(18402, NAME)
+    number_index.add(12345, "2006/11/other")
+    assert not path.exists()
+    assert number_index.unsaved_count == 2
+    number_index.flush()
+    number_index.flush()
+    assert len(path.read_text().splitlines()) == 2
+    assert number_index.unsaved_count == 0
+
+    reloaded = _numbers.NumberIndex(path)
+    assert reloaded.get_name(18402) == NAME
+    assert reloaded.get_number("2006/11/other") == 12345
+
+
+def test_number_index_skips_truncated_lines(tmp_path):
+    path = tmp_path / _numbers.INDEX_FILE_NAME
+    path.write_text(f'[18402, "{NAME}"]\n[12345, "2006/1')
+    number_index = _numbers.NumberIndex(path)
+    assert number_index.get_name(18402) == NAME
+    assert len(number_index) == 1
+
+
+def test_tidy_post_adds_post_to_number_index():
+    number_index = _numbers.NumberIndex()
+    with patch("obscraper._numbers._default_number_index", number_index):
+        post = _tidy.tidy_post(httpx.Response(200, content=POST_PAGE.read_bytes()))
+    assert number_index.get_name(post.number) == post.name
+    assert number_index.get_number(post.name) == post.number
+
+
+async def test_run_number_index_overrides_default():
+    number_index = _numbers.NumberIndex()
+    _numbers.set_number_index(number_index)
+    assert _numbers.get_number_index() is number_index
+
+
+async def test_flush_number_index_waits_for_enough_entries(tmp_path):
+    path = tmp_path / _numbers.INDEX_FILE_NAME
+    number_index = _numbers.NumberIndex(path)
+    _numbers.set_number_index(number_index)
+    number_index.add(18402, NAME)
+    await _numbers.flush_number_index(min_count=2)
+    assert not path.exists()
+    await _numbers.flush_number_index()
+    assert path.read_text() == f'[18402, "{NAME}"]\n'
+
+
+def redirect_response(number):
+    location = f"https://www.overcomingbias.com/{NAME[:8]}post-{number}.html"
+    request = httpx.Request("HEAD", f"https://www.overcomingbias.com/?p={number}")
+    return httpx.Response(301, headers={"location": location}, request=request)
+
+
+@pytest.fixture
+def number_index():
+    number_index = _numbers.NumberIndex()
+    number_index.add(18402, NAME)
+    with patch("obscraper._numbers._default_number_index", number_index):
+        yield number_index
+    _assemble.assemble_post_name.cache_clear()
+
+
+def test_get_posts_by_numbers_only_requests_unknown_numbers(number_index):
+    async def download_post_redirect(async_client, number):
+        await trio.sleep(0)
+        return redirect_response(number)
+
+    async def assemble_post(async_client, name, **kwargs):
+        return SimpleNamespace(name=name)
+
+    download = AsyncMock(side_effect=download_post_redirect)
+    with patch("obscraper._download.download_post_redirect", download):
+        with patch("obscraper._assemble.assemble_post", assemble_post):
+            posts = _scrape.get_posts_by_numbers([18402, 12345], fields=["title"])
+    assert download.call_count == 1
+    assert download.call_args.args[1] == 12345
+    assert posts[18402].name == NAME
+    assert posts[12345].name == "2006/11/post-12345"
+    assert number_index.get_name(12345) == "2006/11/post-12345"
+
+
+async def test_fetch_posts_by_numbers_gets_posts_missing_from_sitemap(number_index):
+    number_index.add(18402, "2006/11/hidden-link")
+    transport = mock_site_transport([NAME])
+    fields = _scrape.tidy_fields(["title", "edit_date"])
+    try:
+        async with httpx.AsyncClient(transport=transport) as async_client:
+            posts = await _fetch.fetch_posts_by_numbers(
+                async_client, {18402: 18402}, fields
+            )
+    finally:
+        _scrape.clear_cache()
+    assert posts[18402].name == "2006/11/hidden-link"
+    assert posts[18402].edit_date is None
+
+
+def test_get_posts_by_numbers_returns_none_if_not_redirected(number_index):
+    request = httpx.Request("HEAD", "https://www.overcomingbias.com/?p=12345")
+    download = AsyncMock(return_value=httpx.Response(200, request=request))
+    with patch("obscraper._download.download_post_redirect", download):
+        posts = _scrape.get_posts_by_numbers([12345])
+    assert posts == {12345: None}
+    assert number_index.get_name(12345) is None
+
+
+def test_get_posts_by_numbers_validates_arguments():
+    assert _scrape.get_posts_by_numbers([]) == {}
+    with pytest.raises(TypeError):
+        _scrape.get_posts_by_numbers(18402)
+    with pytest.raises(ValueError):
+        _scrape.get_posts_by_numbers([123])
+    with pytest.raises(ValueError):
+        _scrape.get_posts_by_numbers([18402], fields=["not_a_field"])
+
+
+def test_tidy_post_redirect_raises_error_for_other_locations():
+    request = httpx.Request("HEAD", "https://www.overcomingbias.com/?p=12345")
+    response = httpx.Response(
+        302, headers={"location": "https://www.overcomingbias.com/"}, request=request
+    )
+    with pytest.raises(_exceptions.InvalidResponseError):
+        _tidy.tidy_post_redirect(response)
@@ -0,0 +1,86 @@
+import concurrent.futures
+import pathlib
+import time
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+import trio
+
+from obscraper import _assemble, _post, _session, _tidy
+
+POST_PAGE = pathlib.Path(__file__).parent / "post_page.html"
+
+
+@pytest.fixture(scope="module")
+def response():
+    return httpx.Response(
+        200,
+        content=POST_PAGE.read_bytes(),
+        headers={"content-type": "text/html; charset=UTF-8"},
+    )
+
+
+@pytest.fixture(scope="module")
+def process_pool():
+    with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+async def test_post_is_parsed_inline_by_default(response):
+    assert _tidy.get_parse_executor() is None
+    assert await _tidy.async_tidy_post(response) == _tidy.tidy_post(response)
+
+
+async def test_post_is_parsed_in_process_pool(response, process_pool):
+    _tidy.set_parse_executor(process_pool)
+    post = await _tidy.async_tidy_post(response)
+    assert post == _tidy.tidy_post(response)
+
+
+async def test_errors_in_executor_are_raised(process_pool):
+    _tidy.set_parse_executor(process_pool)
+    with pytest.raises(AssertionError):
+        await _tidy.async_tidy_post(httpx.Response(200, content=b"Fake HTML"))
+
+
+async def test_event_loop_is_not_blocked_while_parsing():
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await trio.sleep(0.001)
+
+        def slow_parse():
+            time.sleep(0.2)
+            return "parsed"
+
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(tick)
+            result = await _tidy.run_in_executor(executor, slow_parse)
+            nursery.cancel_scope.cancel()
+    assert result == "parsed"
+    assert ticks > 10
+
+
+def test_session_creates_and_shuts_down_process_pool(response):
+    session = _session.Session(parse_executor="process")
+    with patch(
+        "obscraper._download.download_post", AsyncMock(return_value=response)
+    ), patch("obscraper._assemble.assemble_edit_dates", AsyncMock(return_value={})):
+        with session:
+            assert isinstance(session._executor, concurrent.futures.ProcessPoolExecutor)
+            fields = tuple(_post.FIELDS[: _post.FIELDS.index("votes")])
+            post = session.run(
+                _assemble.assemble_post.__wrapped__, "2006/11/introduction", fields
+            )
+            assert post == _tidy.tidy_post(response)
+    assert session._executor is None
+
+
+def test_invalid_parse_executor_raises_value_error():
+    with pytest.raises(ValueError):
+        _session.Session(parse_executor="threads")
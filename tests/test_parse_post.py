@@ -0,0 +1,97 @@
+import pathlib
+
+import bs4
+import pytest
+
+from examples import STANDARD_EXAMPLES
+from obscraper import _exceptions, _extract_post, _parse_post
+
+POST_PAGE = pathlib.Path(__file__).parent / "post_page.html"
+
+
+def extract_post_with_bs4(page_html):
+    """Extract post attributes with the (slower) BeautifulSoup extractors."""
+    soup = bs4.BeautifulSoup(page_html, "lxml")
+    assert _extract_post.is_ob_post_html(soup)
+    text_html = _extract_post.extract_text_html(soup)
+    return {
+        "name": _extract_post.extract_name(soup),
+        "number": _extract_post.extract_number(soup),
+        "page_type": _extract_post.extract_page_type(soup),
+        "page_status": _extract_post.extract_page_status(soup),
+        "page_format": _extract_post.extract_page_format(soup),
+        "tags": _extract_post.extract_tags(soup),
+        "categories": _extract_post.extract_categories(soup),
+        "title": _extract_post.extract_title(soup),
+        "author": _extract_post.extract_author(soup),
+        "publish_date": _extract_post.extract_publish_date(soup),
+        "text_html": text_html,
+        "word_count": _extract_post.extract_word_count(soup),
+        "internal_links": _extract_post.extract_internal_links(soup),
+        "external_links": _extract_post.extract_external_links(soup),
+        "disqus_id": _extract_post.extract_disqus_id(soup),
+        "plaintext": _extract_post.convert_to_plaintext(text_html),
+    }
+
+
+@pytest.fixture(scope="module")
+def post_page():
+    return POST_PAGE.read_text(encoding="utf-8")
+
+
+def test_parse_post_matches_bs4_extractors(post_page):
+    assert _parse_post.parse_post(post_page) == extract_post_with_bs4(post_page)
+
+
+def test_convert_to_plaintext_matches_bs4(post_page):
+    text_html = extract_post_with_bs4(post_page)["text_html"]
+    for html in [text_html, post_page, "", "plain", "<p> a  <!-- b -->  c </p>"]:
+        plaintext = _parse_post.convert_to_plaintext(html)
+        assert plaintext == _extract_post.convert_to_plaintext(html)
+
+
+def test_parse_post_returns_expected_attributes(post_page):
+    attributes = _parse_post.parse_post(post_page)
+    assert attributes["name"] == "2006/11/introduction"
+    assert attributes["number"] == 18402
+    assert attributes["tags"] == ["meta", "about-this-blog"]
+    assert attributes["title"] == "How To Join & Contribute"
+    assert attributes["author"] == "Robin Hanson"
+    assert "gdsrcacheloader" not in attributes["text_html"]
+    assert "Text after the cache loader." in attributes["text_html"]
+    assert attributes["internal_links"][-1].endswith("2006/11/hidden-link.html")
+
+
+def test_plaintext_of_text_html_matches_word_count(post_page):
+    attributes = _parse_post.parse_post(post_page)
+    plaintext = _extract_post.convert_to_plaintext(attributes["text_html"])
+    assert "preformatted" in plaintext
+    assert "hidden" not in plaintext
+    assert attributes["word_count"] == extract_post_with_bs4(post_page)["word_count"]
+
+
+def test_parse_post_raises_assertion_error_if_not_post():
+    with pytest.raises(AssertionError):
+        _parse_post.parse_post("Fake HTML")
+    with pytest.raises(AssertionError):
+        _parse_post.parse_post("")
+
+
+def test_parse_post_raises_error_if_attribute_missing(post_page):
+    no_title = post_page.replace("entry-title", "title")
+    with pytest.raises(_exceptions.AttributeNotFoundError):
+        _parse_post.parse_post(no_title)
+    no_content = post_page.replace('class="entry-content"', 'class="content"')
+    with pytest.raises(_exceptions.AttributeNotFoundError):
+        _parse_post.parse_post(no_content)
+
+
+def test_missing_disqus_id_is_none(post_page):
+    page = post_page.replace('class="dsq-postid"', 'class="comment-count"')
+    assert _parse_post.parse_post(page)["disqus_id"] is None
+
+
+@pytest.mark.parametrize("name", list(STANDARD_EXAMPLES.keys()))
+def test_parse_post_matches_bs4_extractors_for_examples(http_client, name):
+    response = http_client.get(_extract_post.name_to_url(name))
+    assert _parse_post.parse_post(response.text) == extract_post_with_bs4(response.text)
@@ -48,9 +48,12 @@ def test_clears_grab_post_cache():
     # Ideally I could mock the wrapped function inside _assemble.assemble_vote_count
     # but there is no nice way to do it
     with patch(
-        "obscraper._download.download_vote_count", AsyncMock(side_effect=[123, 321])
+        "obscraper._download.download_vote_counts", AsyncMock(side_effect=[123, 321])
     ) as mock_download:
-        with patch("obscraper._tidy.tidy_vote_count", Mock(side_effect=lambda v: v)):
+        with patch(
+            "obscraper._tidy.tidy_vote_counts",
+            Mock(side_effect=lambda v, numbers: {n: v for n in numbers}),
+        ):
             _scrape.clear_cache()
 
             p1 = _scrape.get_vote_counts(fake_post_numbers)
@@ -0,0 +1,95 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+import trio
+
+from obscraper import _download, _ratelimit
+
+HOST = "www.overcomingbias.com"
+
+
+async def send_requests(rate_limiter, n, host=HOST):
+    """Acquire n tokens concurrently, returning the time each was acquired."""
+    times = []
+
+    async def fake_request():
+        await rate_limiter.acquire(host)
+        times.append(trio.current_time())
+
+    async with trio.open_nursery() as nursery:
+        for _ in range(n):
+            nursery.start_soon(fake_request)
+    return times
+
+
+async def test_burst_is_sent_immediately(autojump_clock):
+    rate_limiter = _ratelimit.RateLimiter(rate=1, burst=5)
+    start_time = trio.current_time()
+    times = await send_requests(rate_limiter, 5)
+    assert all(t == start_time for t in times)
+
+
+async def test_sustained_rate_is_limited(autojump_clock):
+    rate_limiter = _ratelimit.RateLimiter(rate=10, burst=1)
+    start_time = trio.current_time()
+    times = await send_requests(rate_limiter, 21)
+    assert max(times) - start_time == pytest.approx(2)
+
+
+async def test_hosts_are_limited_separately(autojump_clock):
+    rate_limiter = _ratelimit.RateLimiter(rate=1, burst=2)
+    start_time = trio.current_time()
+    await send_requests(rate_limiter, 2, "a.com")
+    await send_requests(rate_limiter, 2, "b.com")
+    assert trio.current_time() == start_time
+
+
+async def test_pause_stops_all_requests_to_host(autojump_clock):
+    rate_limiter = _ratelimit.RateLimiter(rate=None)
+    start_time = trio.current_time()
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(rate_limiter.pause, HOST, 3)
+        await trio.sleep(1)
+        other_host_times = await send_requests(rate_limiter, 10, "other.com")
+        times = await send_requests(rate_limiter, 10)
+    assert all(t - start_time == 1 for t in other_host_times)
+    assert all(t - start_time == 3 for t in times)
+
+
+async def test_current_rate_measures_recent_requests(autojump_clock):
+    rate_limiter = _ratelimit.RateLimiter(rate=5, burst=1)
+    assert rate_limiter.current_rate() == 0
+    await send_requests(rate_limiter, 50)
+    assert rate_limiter.current_rate(HOST) == pytest.approx(5, abs=0.2)
+    assert rate_limiter.current_rate() == rate_limiter.current_rate(HOST)
+    await trio.sleep(_ratelimit.RATE_WINDOW + 1)
+    assert rate_limiter.current_rate() == 0
+
+
+async def test_retry_pauses_other_requests_to_host(autojump_clock):
+    _ratelimit.set_rate_limiter(_ratelimit.RateLimiter(rate=None))
+    rate_limited = Mock(status_code=429, headers={"Retry-After": "2"})
+    rate_limited.url.host = HOST
+    success = Mock(status_code=200)
+
+    mock_method = AsyncMock(side_effect=[rate_limited, success])
+
+    @_download.async_retry(0.01)
+    async def get_rate_limited():
+        return await mock_method()
+
+    start_time = trio.current_time()
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(get_rate_limited)
+        await trio.sleep(1)
+        times = await send_requests(_ratelimit.get_rate_limiter(), 5)
+    assert all(t - start_time == 2 for t in times)
+
+
+def test_invalid_limits_raise_value_error():
+    with pytest.raises(ValueError):
+        _ratelimit.RateLimiter(rate=0)
+    with pytest.raises(ValueError):
+        _ratelimit.RateLimiter(rate=-1)
+    with pytest.raises(ValueError):
+        _ratelimit.RateLimiter(burst=0)
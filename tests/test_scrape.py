@@ -25,7 +25,7 @@ def mock_fetch_posts():
         "2014/07/limits-on-generality": "generality",
     }
 
-    async def fetch_posts(names_dict):
+    async def fetch_posts(async_client, names_dict, fields=None):
         results = {}
         for label, name in names_dict.items():
             results[label] = fake_posts.get(name, None)
@@ -92,6 +92,19 @@ class TestGetPostByName:
         assert mock_fetch_posts.call_count == 1
         assert fake_post == "rot"
 
+    def test_raises_value_error_if_fields_are_not_attributes(self):
+        names = ["2021/10/what-makes-stuff-rot"]
+        for fields in [["title", "not_a_field"], ["url"], ["plaintext"]]:
+            with pytest.raises(ValueError):
+                _scrape.get_posts_by_names(names, fields=fields)
+
+    def test_passes_tidy_fields_to_fetch_posts(self, mock_fetch_posts):
+        names = ["2021/10/what-makes-stuff-rot"]
+        with patch("obscraper._fetch.fetch_posts", mock_fetch_posts):
+            _scrape.get_posts_by_names(names, fields=["votes", "title", "title"])
+        fields = mock_fetch_posts.call_args.args[2]
+        assert fields == ("name", "title", "votes")
+
 
 class TestGetPostsByURLs:
     def test_returns_empty_dict_for_empty_list(self):
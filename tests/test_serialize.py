@@ -1,9 +1,16 @@
+import dataclasses
+import datetime
+import io
 import json
+import pathlib
+from unittest.mock import patch
 
+import dateutil.parser
+import httpx
 import pytest
 
 from examples import STANDARD_EXAMPLES
-from obscraper import _post, _serialize
+from obscraper import _post, _serialize, _tidy
 
 
 @pytest.mark.parametrize("name", STANDARD_EXAMPLES.keys())
@@ -28,3 +35,116 @@ def test_encode_and_decode_work_for_none_post():
 
     decoded = json.loads(encoded, cls=_serialize.PostDecoder)
     assert decoded is None
+
+
+@pytest.fixture(scope="module")
+def post():
+    page = (pathlib.Path(__file__).parent / "post_page.html").read_bytes()
+    post = _tidy.tidy_post(httpx.Response(200, content=page))
+    post.votes = 12
+    post.edit_date = datetime.datetime(
+        2010, 9, 8, 7, 6, 5, tzinfo=datetime.timezone.utc
+    )
+    return post
+
+
+def test_encoder_includes_all_attributes_and_properties(post):
+    expected = {
+        **dataclasses.asdict(post),
+        "plaintext": post.plaintext,
+        "url": post.url,
+    }
+    encoded = json.loads(json.dumps(post, cls=_serialize.PostEncoder))
+    assert list(encoded) == list(expected)
+    assert encoded["edit_date"] == "2010-09-08T07:06:05Z"
+    assert encoded["publish_date"] == "2006-11-20T11:00:00Z"
+    assert encoded["internal_links"] == expected["internal_links"]
+    assert encoded["plaintext"] == expected["plaintext"]
+
+
+def test_encoder_only_includes_given_fields(post):
+    fields = ["url", "title", "votes"]
+    encoded = json.dumps(post, cls=_serialize.PostEncoder, fields=fields)
+    assert encoded == (
+        '{"url": "https://www.overcomingbias.com/2006/11/introduction.html",'
+        ' "title": "How To Join & Contribute", "votes": 12}'
+    )
+    with pytest.raises(ValueError):
+        json.dumps(post, cls=_serialize.PostEncoder, fields=["not_a_field"])
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_matches_encoder(post, use_orjson):
+    if use_orjson:
+        pytest.importorskip("orjson")
+        encoded = _serialize.dumps_posts({"url": post.url, "post": post})
+    else:
+        with patch("obscraper._serialize.orjson", None):
+            encoded = _serialize.dumps_posts({"url": post.url, "post": post})
+    expected = json.dumps(
+        {"url": post.url, "post": post},
+        cls=_serialize.PostEncoder,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    assert encoded == expected
+
+
+def test_dumps_only_includes_given_fields(post):
+    assert _serialize.dumps_posts([post, None], fields=["word_count"]) == (
+        f'[{{"word_count":{post.word_count}}},null]'
+    )
+
+
+def post_records(post):
+    other_post = dataclasses.replace(post, name="2007/10/a-rational-argu", votes=None)
+    return [(post.url, post), (other_post.url, other_post), (post.url, None)]
+
+
+@pytest.mark.parametrize("read_size", [5, 64, 1 << 16])
+def test_iter_posts_reads_json_list(post, read_size):
+    records = post_records(post)
+    output = [{"url": url, "post": p} for url, p in records]
+    text = json.dumps(output, cls=_serialize.PostEncoder, indent=4)
+    with patch("obscraper._serialize.READ_SIZE", read_size):
+        assert list(_serialize.iter_posts(io.StringIO(text))) == records
+
+
+@pytest.mark.parametrize("read_size", [5, 1 << 16])
+def test_iter_posts_reads_binary_json_lines(post, read_size):
+    records = post_records(post)
+    lines = [_serialize.dumps_posts({"url": u, "post": p}) for u, p in records]
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+    assert "東京" in data.decode("utf-8")  # split across reads
+    with patch("obscraper._serialize.READ_SIZE", read_size):
+        assert list(_serialize.iter_posts(io.BytesIO(data))) == records
+
+
+def test_iter_posts_reads_list_of_posts(post):
+    text = json.dumps([post, post], cls=_serialize.PostEncoder)
+    assert list(_serialize.iter_posts(io.StringIO(text))) == [(post.url, post)] * 2
+
+
+def test_iter_posts_reads_empty_files():
+    assert list(_serialize.iter_posts(io.StringIO(""))) == []
+    assert list(_serialize.iter_posts(io.StringIO(" [ ] "))) == []
+
+
+def test_iter_posts_raises_error_for_invalid_json(post):
+    text = _serialize.dumps_posts({"url": post.url, "post": post})
+    with pytest.raises(json.JSONDecodeError):
+        list(_serialize.iter_posts(io.StringIO(text[:-1])))
+
+
+def test_posts_with_some_fields_are_decoded(post):
+    encoded = _serialize.dumps_posts(post, fields=["name", "title", "edit_date"])
+    decoded = json.loads(encoded, cls=_serialize.PostDecoder)
+    assert decoded.title == post.title
+    assert decoded.edit_date == post.edit_date
+    assert decoded.text_html is None
+
+
+def test_parse_datetime_matches_isoparse():
+    for text in ["2010-09-08T07:06:05Z", "2010-09-08T07:06:05+01:00", "2010-09-08"]:
+        expected = dateutil.parser.isoparse(text)
+        assert _serialize.parse_datetime(text) == expected
@@ -0,0 +1,74 @@
+import threading
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from obscraper import _scrape, _session
+
+
+@pytest.fixture
+def session():
+    with _session.Session() as session:
+        yield session
+
+
+def test_session_can_be_opened_and_closed():
+    session = _session.Session()
+    assert not session.is_open
+    session.open()
+    assert session.is_open
+    session.close()
+    assert not session.is_open
+    # Closing twice is fine
+    session.close()
+
+
+def test_run_passes_client_and_arguments(session):
+    async def echo(async_client, *args):
+        return async_client, args
+
+    async_client, args = session.run(echo, "a", "b")
+    assert isinstance(async_client, httpx.AsyncClient)
+    assert args == ("a", "b")
+
+
+def test_run_reuses_client_and_thread(session):
+    async def client_and_thread(async_client):
+        return async_client, threading.current_thread()
+
+    first_client, first_thread = session.run(client_and_thread)
+    second_client, second_thread = session.run(client_and_thread)
+    assert first_client is second_client
+    assert first_thread is second_thread
+    assert first_thread is not threading.current_thread()
+
+
+def test_run_propagates_exceptions(session):
+    async def fail(async_client):
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        session.run(fail)
+    # Session still usable afterwards
+    assert session.is_open
+
+
+def test_session_methods_use_session_client(session):
+    mock_fetch_posts = AsyncMock(return_value={"2006/11/introduction": "intro"})
+    with patch("obscraper._fetch.fetch_posts", mock_fetch_posts):
+        posts = session.get_posts_by_names(["2006/11/introduction"])
+    assert posts == {"2006/11/introduction": "intro"}
+    assert mock_fetch_posts.call_count == 1
+    assert mock_fetch_posts.call_args.args[0] is session._async_client
+
+
+def test_module_functions_use_default_session():
+    mock_fetch_posts = AsyncMock(return_value={"2006/11/introduction": "intro"})
+    with patch("obscraper._fetch.fetch_posts", mock_fetch_posts):
+        _scrape.get_posts_by_names(["2006/11/introduction"])
+        _scrape.get_posts_by_names(["2006/11/introduction"])
+    first_client = mock_fetch_posts.call_args_list[0].args[0]
+    second_client = mock_fetch_posts.call_args_list[1].args[0]
+    assert first_client is second_client
+    assert _session.get_default_session().is_open
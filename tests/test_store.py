@@ -0,0 +1,150 @@
+import dataclasses
+import datetime
+import json
+import pathlib
+from unittest.mock import Mock, patch
+
+import httpx
+import pytest
+
+from obscraper import __main__, _store, _sync, _tidy
+
+POST_PAGE = pathlib.Path(__file__).parent / "post_page.html"
+UTC = datetime.timezone.utc
+
+
+@pytest.fixture(scope="module")
+def posts():
+    post = _tidy.tidy_post(httpx.Response(200, content=POST_PAGE.read_bytes()))
+    return {
+        f"2010/09/post-{i}": dataclasses.replace(
+            post,
+            name=f"2010/09/post-{i}",
+            number=20000 + i,
+            author="Robin Hanson" if i % 2 else "Eliezer Yudkowsky",
+            tags=["meta", "books"] if i % 3 == 0 else ["books"],
+            publish_date=datetime.datetime(2010, 9, 1 + i, tzinfo=UTC),
+            edit_date=datetime.datetime(2011, 9, 1 + i, tzinfo=UTC),
+        )
+        for i in range(10)
+    }
+
+
+@pytest.fixture
+def store(tmp_path, posts):
+    with _store.SQLiteStore(tmp_path / "posts.sqlite") as store:
+        store.update(posts)
+        store["2010/09/missing"] = None
+        yield store
+
+
+def test_store_returns_posts_by_name(store, posts):
+    assert len(store) == 11
+    assert store["2010/09/post-4"] == posts["2010/09/post-4"]
+    assert store["2010/09/missing"] is None
+    assert "2010/09/post-9" in store
+    assert "2010/09/post-10" not in store
+    with pytest.raises(KeyError):
+        store["2010/09/post-10"]  # pylint: disable=pointless-statement
+    assert list(store) == sorted([*posts, "2010/09/missing"])
+
+
+def test_store_returns_posts_by_number(store, posts):
+    assert store.get_by_number(20003) == posts["2010/09/post-3"]
+    with pytest.raises(KeyError):
+        store.get_by_number(30000)
+
+
+def test_store_persists_posts(tmp_path, store, posts):
+    with _store.SQLiteStore(tmp_path / "posts.sqlite") as reopened:
+        assert dict(reopened) == {**posts, "2010/09/missing": None}
+
+
+def test_computed_properties_are_not_stored(store, posts):
+    (data,) = store._connection.execute(  # pylint: disable=protected-access
+        "SELECT data FROM posts WHERE name = ?", ("2010/09/post-4",)
+    ).fetchone()
+    assert "plaintext" not in json.loads(data)
+    assert "url" not in json.loads(data)
+    assert store["2010/09/post-4"].plaintext == posts["2010/09/post-4"].plaintext
+
+
+def test_updated_posts_replace_stored_posts(store, posts):
+    old_post = posts["2010/09/post-3"]
+    new_post = dataclasses.replace(old_post, title="New title", tags=["fiction"])
+    store.update([("2010/09/post-3", new_post)])
+    assert store["2010/09/post-3"] == new_post
+    assert len(store) == 11
+    assert "2010/09/post-3" in store.find(tag="fiction")
+    assert "2010/09/post-3" not in store.find(tag="meta")
+
+
+def test_deleted_posts_are_removed(store):
+    del store["2010/09/post-0"]
+    assert "2010/09/post-0" not in store
+    assert "2010/09/post-0" not in store.find(tag="books")
+    with pytest.raises(KeyError):
+        del store["2010/09/post-0"]
+
+
+def test_find_matches_all_conditions(store):
+    assert list(store.find(tag="meta")) == [
+        "2010/09/post-0",
+        "2010/09/post-3",
+        "2010/09/post-6",
+        "2010/09/post-9",
+    ]
+    assert list(store.find(author="Robin Hanson", tag="meta")) == [
+        "2010/09/post-3",
+        "2010/09/post-9",
+    ]
+    assert list(store.find(category="meta")) == [f"2010/09/post-{i}" for i in range(10)]
+    published = (
+        datetime.datetime(2010, 9, 3, tzinfo=UTC),
+        datetime.datetime(2010, 9, 5, tzinfo=UTC),
+    )
+    assert list(store.find(published_between=published)) == [
+        "2010/09/post-2",
+        "2010/09/post-3",
+    ]
+    edited = (
+        datetime.datetime(2011, 9, 8, tzinfo=UTC),
+        datetime.datetime(2012, 1, 1, tzinfo=UTC),
+    )
+    assert list(store.find(author="Robin Hanson", edited_between=edited)) == [
+        "2010/09/post-7",
+        "2010/09/post-9",
+    ]
+    assert store.find(author="Nobody") == {}
+
+
+def test_store_edit_dates_are_read_from_index(store, posts):
+    edit_dates = store.edit_dates()
+    assert edit_dates["2010/09/missing"] is None
+    del edit_dates["2010/09/missing"]
+    assert edit_dates == {name: post.edit_date for name, post in posts.items()}
+    assert _sync.stored_edit_dates(store) == store.edit_dates()
+
+
+def test_main_writes_sqlite_store(tmp_path, posts):
+    outfile = tmp_path / "posts.sqlite"
+    names = list(posts)[:3]
+
+    def iter_posts_by_names(names, session=None, fields=None):
+        return ((name, posts[name]) for name in names)
+
+    with patch("obscraper._scrape.iter_posts_by_names", iter_posts_by_names), patch(
+        "obscraper._scrape.get_edit_dates", Mock(return_value=dict.fromkeys(names))
+    ):
+        with pytest.raises(SystemExit) as sysexit:
+            __main__.main(["-a", "-o", str(outfile)])
+    assert sysexit.value.code == 0
+    with _store.SQLiteStore(outfile) as store:
+        assert dict(store) == {name: posts[name] for name in names}
+
+
+def test_write_store_writes_in_batches():
+    store = Mock()
+    posts = [(f"2010/09/post-{i}", None) for i in range(5)]
+    __main__.write_store(iter(posts), store, batch_size=2)
+    assert [len(call.args[0]) for call in store.update.call_args_list] == [2, 2, 1]
@@ -0,0 +1,119 @@
+import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from obscraper import _sync
+
+
+def date(day):
+    return datetime.datetime(2022, 1, day, tzinfo=datetime.timezone.utc)
+
+
+def make_post(name, edit_date):
+    """Make a fake post, with only the attributes used by sync."""
+    return SimpleNamespace(name=name, edit_date=edit_date)
+
+
+REMOTE_DATES = {
+    "2022/01/unchanged": date(1),
+    "2022/01/edited": date(5),
+    "2022/01/new": date(3),
+    "2022/01/broken": date(4),
+}
+
+
+@pytest.fixture
+def mock_scrape():
+    """Mock the sitemap and post downloads, counting the posts requested."""
+    requested = []
+
+    def get_posts_by_names(names, session=None):
+        requested.extend(names)
+        return {
+            name: (
+                None
+                if name == "2022/01/broken"
+                else make_post(name, REMOTE_DATES[name])
+            )
+            for name in names
+        }
+
+    with patch("obscraper._scrape.get_edit_dates", return_value=REMOTE_DATES), patch(
+        "obscraper._scrape.get_posts_by_names", side_effect=get_posts_by_names
+    ):
+        yield requested
+
+
+@pytest.fixture
+def store():
+    return {
+        "2022/01/unchanged": make_post("2022/01/unchanged", date(1)),
+        "2022/01/edited": make_post("2022/01/edited", date(2)),
+        "2022/01/removed": make_post("2022/01/removed", date(1)),
+    }
+
+
+def test_only_new_and_edited_posts_are_fetched(mock_scrape, store):
+    _sync.sync(store)
+    assert sorted(mock_scrape) == ["2022/01/broken", "2022/01/edited", "2022/01/new"]
+
+
+def test_store_is_updated(mock_scrape, store):
+    unchanged = store["2022/01/unchanged"]
+    report = _sync.sync(store)
+    assert report == _sync.SyncReport(
+        added=["2022/01/new"],
+        updated=["2022/01/edited"],
+        deleted=["2022/01/removed"],
+        failed=["2022/01/broken"],
+    )
+    assert report.changed
+    assert set(store) == {"2022/01/unchanged", "2022/01/edited", "2022/01/new"}
+    assert store["2022/01/unchanged"] is unchanged
+    assert store["2022/01/edited"].edit_date == date(5)
+
+
+def test_deleted_posts_can_be_kept(mock_scrape, store):
+    report = _sync.sync(store, delete=False)
+    assert report.deleted == ["2022/01/removed"]
+    assert "2022/01/removed" in store
+
+
+def test_second_sync_fetches_only_failed_posts(mock_scrape, store):
+    _sync.sync(store)
+    mock_scrape.clear()
+    report = _sync.sync(store)
+    assert mock_scrape == ["2022/01/broken"]
+    assert not report.changed
+
+
+def test_store_edit_dates_method_is_used(mock_scrape):
+    class Store(dict):
+        def edit_dates(self):
+            return dict(REMOTE_DATES)
+
+        def items(self):
+            raise AssertionError("posts should not be read")
+
+    _sync.sync(Store())
+    assert mock_scrape == []
+
+
+def test_posts_are_written_in_one_update(mock_scrape, store):
+    class Store(dict):
+        def __init__(self, *args):
+            super().__init__(*args)
+            self.updates = []
+
+        def update(self, other):
+            self.updates.append(sorted(other))
+            super().update(other)
+
+        def __setitem__(self, name, post):
+            raise AssertionError("posts should be written together")
+
+    tracked_store = Store(store)
+    _sync.sync(tracked_store)
+    assert tracked_store.updates == [["2022/01/edited", "2022/01/new"]]
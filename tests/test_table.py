@@ -0,0 +1,142 @@
+import dataclasses
+import datetime
+import pathlib
+
+import httpx
+import pytest
+
+from obscraper import _table, _tidy
+
+np = pytest.importorskip("numpy")
+
+POST_PAGE = pathlib.Path(__file__).parent / "post_page.html"
+UTC = datetime.timezone.utc
+
+
+@pytest.fixture(scope="module")
+def posts():
+    post = _tidy.tidy_post(httpx.Response(200, content=POST_PAGE.read_bytes()))
+    attributes = [
+        ("Robin Hanson", ["meta", "books"], 10, datetime.datetime(2006, 11, 20)),
+        ("Eliezer Yudkowsky", ["books"], 30, datetime.datetime(2007, 1, 5)),
+        ("Robin Hanson", [], None, datetime.datetime(2021, 4, 1)),
+        ("Robin Hanson", ["meta"], 5, None),
+        (None, ["books", "meta", "fiction"], 7, datetime.datetime(2008, 3, 2)),
+    ]
+    return {
+        f"2010/09/post-{i}": dataclasses.replace(
+            post,
+            name=f"2010/09/post-{i}",
+            number=20000 + i,
+            author=author,
+            tags=tags,
+            votes=votes,
+            edit_date=None if date is None else date.replace(tzinfo=UTC),
+        )
+        for i, (author, tags, votes, date) in enumerate(attributes)
+    }
+
+
+@pytest.fixture(scope="module")
+def table(posts):
+    return _table.PostTable.from_posts({**posts, "2010/09/missing": None})
+
+
+def test_table_stores_columns(table, posts):
+    assert len(table) == 5
+    assert table.column("votes").tolist() == [10, 30, -1, 5, 7]
+    assert table.column("author").tolist() == [p.author for p in posts.values()]
+    assert table.column("tags") == [p.tags for p in posts.values()]
+    edit_dates = table.column("edit_date")
+    assert edit_dates[0] == np.datetime64("2006-11-20T00:00:00")
+    assert np.isnat(edit_dates[3])
+    with pytest.raises(ValueError):
+        table.column("text_html")
+
+
+def test_table_converts_back_to_posts(table, posts):
+    assert table.to_posts() == list(posts.values())
+    assert table.to_posts()[0] is posts["2010/09/post-0"]
+
+
+def test_match_and_select_filter_posts(table):
+    by_robin = table.select(table.match("author", "Robin Hanson"))
+    assert by_robin.column("number").tolist() == [20000, 20002, 20003]
+    tagged_books = table.select(table.match("tags", "books"))
+    assert tagged_books.column("number").tolist() == [20000, 20001, 20004]
+    assert tagged_books.column("tags") == [
+        ["meta", "books"],
+        ["books"],
+        ["books", "meta", "fiction"],
+    ]
+    assert not table.match("tags", "not-a-tag").any()
+    both = table.select(table.match("tags", "meta") & (table.column("votes") > 6))
+    assert [p.name for p in both] == ["2010/09/post-0", "2010/09/post-4"]
+
+
+def test_select_with_no_rows_gives_empty_table(table):
+    for rows in [[], np.array([], dtype=np.int64), table.match("tags", "not-a-tag")]:
+        empty = table.select(rows)
+        assert len(empty) == 0
+        assert empty.to_posts() == []
+        assert empty.column("tags") == []
+        assert empty.group_by("author") == {}
+
+
+def test_sort_puts_missing_values_last(table):
+    assert table.sort("votes").column("votes").tolist() == [5, 7, 10, 30, -1]
+    descending = table.sort("votes", descending=True)
+    assert descending.column("votes").tolist() == [30, 10, 7, 5, -1]
+    by_date = table.sort("edit_date")
+    assert by_date.column("number").tolist() == [20000, 20001, 20004, 20002, 20003]
+    by_author = table.sort("author")
+    assert by_author.column("author").tolist() == [
+        "Eliezer Yudkowsky",
+        "Robin Hanson",
+        "Robin Hanson",
+        "Robin Hanson",
+        None,
+    ]
+    assert by_author.sort("number").to_posts() == table.to_posts()
+    with pytest.raises(ValueError):
+        table.sort("tags")
+
+
+def test_group_by_aggregates_values(table):
+    assert table.group_by("author") == {"Robin Hanson": 3, "Eliezer Yudkowsky": 1}
+    assert table.group_by("author", "votes", "sum") == {
+        "Robin Hanson": 15,
+        "Eliezer Yudkowsky": 30,
+    }
+    assert table.group_by("tags", "votes", "sum") == {
+        "meta": 22,
+        "books": 47,
+        "fiction": 7,
+    }
+    assert table.group_by("tags", "votes", "mean")["books"] == pytest.approx(47 / 3)
+    assert table.group_by("tags", "votes", "max") == {
+        "meta": 10,
+        "books": 30,
+        "fiction": 7,
+    }
+    assert table.group_by("author", "votes", "min") == {
+        "Robin Hanson": 5,
+        "Eliezer Yudkowsky": 30,
+    }
+    assert table.group_by("author", "votes", "count") == {
+        "Robin Hanson": 2,
+        "Eliezer Yudkowsky": 1,
+    }
+    with pytest.raises(ValueError):
+        table.group_by("votes")
+    with pytest.raises(ValueError):
+        table.group_by("author", "title", "sum")
+    with pytest.raises(ValueError):
+        table.group_by("author", "votes", "median")
+
+
+def test_empty_table(table):
+    empty = _table.PostTable.from_posts([])
+    assert len(empty) == 0
+    assert empty.group_by("tags", "votes", "sum") == {}
+    assert len(table.select(table.match("author", "Nobody"))) == 0
@@ -54,5 +54,15 @@ def test_count_words_works_for_example_strings():
     assert count("ignore some silly words", ignore=["silly"]) == 3
 
 
+def test_split_words_removes_punctuation():
+    split = _utils.split_words
+    assert split("Don't   split\nhyphenated-words!") == [
+        "Dont",
+        "split",
+        "hyphenatedwords",
+    ]
+    assert split(r"... @~¯\_(ツ)_/¯") == []
+
+
 def test_returns_valid_result_for_post():
     assert _utils.property_names(_post.Post) == ["plaintext", "url"]
@@ -1,19 +1,51 @@
 import datetime
+import pathlib
 import re
 
-from obscraper import _post, _utils
+import httpx
+
+from obscraper import _download, _post, _utils
 from obscraper._extract_post import (
     POST_NAME_PATTERN,
     is_valid_disqus_id,
     is_valid_post_long_url,
     is_valid_post_url,
+    name_to_url,
+    url_to_name,
 )
 
+POST_PAGE = pathlib.Path(__file__).parent / "post_page.html"
+
 
 def tidy_us_date(d):
     return _utils.tidy_date(d, "US/Eastern")
 
 
+def mock_site_transport(sitemap_names):
+    """Mock transport serving the example post page under any post name.
+
+    Only `sitemap_names` are listed in the edit dates sitemap.
+    """
+    page = POST_PAGE.read_text()
+    entries = "".join(
+        f"<url><loc>{name_to_url(name)}</loc>"
+        "<lastmod>2010-01-01T00:00:00+00:00</lastmod></url>"
+        for name in sitemap_names
+    )
+    sitemap = f'<?xml version="1.0"?><urlset>{entries}</urlset>'
+
+    def handler(request):
+        if str(request.url) == _download.EDIT_DATES_URL:
+            return httpx.Response(200, text=sitemap)
+        try:
+            name = url_to_name(str(request.url))
+        except ValueError:
+            return httpx.Response(404)
+        return httpx.Response(200, text=page.replace("2006/11/introduction", name))
+
+    return httpx.MockTransport(handler)
+
+
 def assert_is_valid_post(test_post, votes=True, comments=True, edit_date=True):
     assert_post_has_standard_attributes(test_post)
     assert_post_standard_attributes_have_correct_types(test_post)